@@ -0,0 +1,450 @@
+import os
+import sys
+import json
+import math
+import argparse
+import dataclasses
+import numpy as np
+
+from circuito import crearCircuito, POSE_INICIAL
+from simulacion import Simulacion
+from puntuacion import puntuacionDistanciaVectorizada, inTriangleVectorizado
+from fuzzyExpert import FuzzySystem
+from fuzzyTabla import FuzzyTablaSystem
+from configuracion import ConfiguracionFuzzy
+from cacheResultados import CacheResultados, simularEvaluacion
+
+TIPOS_SEGMENTO = ("normales", "triangulo") # Apartados del fichero de reglas
+TERMINOS_ERROR = ["NegativoGrande", "NegativoPequeno", "Cero", "PositivoPequeno", "PositivoGrande"]
+TERMINOS_SALIDA = ["FuerteIzquierda", "Izquierda", "Recto", "Derecha", "FuerteDerecha"] # De W negativa a positiva
+RUIDO_EXPLORACION = 0.1 # Desviacion del ruido que se suma a W al grabar, para ver el resultado de otras respuestas (rad/s)
+HORIZONTE_RESULTADO = 30 # Ticks siguientes con los que se mide el resultado de cada decision (medio segundo a 60 fps)
+ITERACIONES_REFINAMIENTO = 6 # Pasadas de ajuste de los puntos de corte
+CANDIDATOS_CORTE = 255 # Posiciones que se prueban para cada punto de corte
+SEMIANCHO_SALIDA = 0.05 # Semiancho de los terminos de salida, en fraccion de WMAX (ver aprenderConjunto)
+CELDAS_ERROR = 2048 # Celdas del histograma en el eje del error angular (unos 3 mrad)
+CELDAS_SALIDA = 512 # Celdas del histograma en el eje de W (unos 4 mrad/s)
+REGULARIZACION_SALIDA = 1e-4 # Peso, en fraccion de la traza de las ecuaciones, que atrae los centros de salida al reparto uniforme
+FACTOR_VENTAJA = 1.5 # Beta de los pesos exp(beta * z) de cada decision, con z el resultado tipificado (ver pesosResultado)
+EXPERTOS = {"fuzzy": FuzzySystem, "fuzzy-tabla": FuzzyTablaSystem}
+
+
+def grabarEjecucion(claseExperto=FuzzyTablaSystem, config=None, ruido=RUIDO_EXPLORACION, semilla=0):
+    """
+    Ejecuta un sistema difuso sumando ruido a su velocidad angular y graba cada decision.
+
+    Parámetros:
+        claseExperto: FuzzySystem o una clase derivada (se graba en su inferirVelocidadAngular)
+        config: Configuracion del experto
+        ruido: Desviacion del ruido gaussiano sumado a W (rad/s)
+        semilla: Semilla del ruido
+
+    Retorna:
+        dict: Arrays "error_angular", "W", "resultado" y "triangulo" con una fila por decision
+    """
+    generador = np.random.default_rng(semilla)
+    filas = []
+
+    class Grabador(claseExperto):
+        def inferirVelocidadAngular(self, error_angular, variables, poseRobot, tramo):
+            W = super().inferirVelocidadAngular(error_angular, variables, poseRobot, tramo)
+            W = float(np.clip(W + generador.normal(0.0, ruido), -self.config.WMAX, self.config.WMAX))
+            filas.append((error_angular, W, poseRobot[0], poseRobot[1], self.indiceObjetivo))
+            return W
+
+    objectiveSet = crearCircuito()
+    Simulacion(Grabador(config), objectiveSet, POSE_INICIAL).ejecutar()
+    datos = np.array(filas, dtype=float)
+    resultado, triangulo = medirResultado(objectiveSet, datos[:, 2], datos[:, 3], datos[:, 4].astype(int))
+    return {"error_angular": datos[:, 0], "W": datos[:, 1], "resultado": resultado, "triangulo": triangulo}
+
+
+def medirResultado(objectiveSet, x, y, indices, horizonte=HORIZONTE_RESULTADO):
+    """
+    Resultado de cada decision: la media de lo que puntuan las `horizonte` posiciones siguientes del
+    mismo objetivo. En los segmentos es la puntuacion de distancia de cada muestra y en los
+    triangulos -1 por cada muestra dentro del triangulo.
+
+    Retorna:
+        tuple: (resultado de cada decision, si su objetivo es un triangulo)
+    """
+    muestra = np.zeros(len(x))
+    triangulo = np.zeros(len(x), dtype=bool)
+    for indice in np.unique(indices):
+        objetivo = objectiveSet[indice]
+        filas = indices == indice
+        if objetivo.getType() == 2:
+            triangulo[filas] = True
+            dentro = inTriangleVectorizado(np.array(objetivo.getInicio()), np.array(objetivo.getMedio()),
+                                           np.array(objetivo.getFin()), x[filas], y[filas])
+            muestra[filas] = -dentro.astype(float)
+        else:
+            muestra[filas] = puntuacionDistanciaVectorizada(np.array(objetivo.getInicio()), np.array(objetivo.getFin()),
+                                                            x[filas], y[filas])
+
+    # Media movil hacia delante sin salir del objetivo: sumas acumuladas cortadas en cada cambio
+    acumulada = np.concatenate(([0.0], np.cumsum(muestra)))
+    limites = np.append(np.flatnonzero(np.diff(indices)) + 1, len(x)) # Fila en la que acaba cada objetivo
+    inicio = np.arange(len(x)) + 1
+    fin = np.minimum(inicio + horizonte, limites[np.searchsorted(limites, inicio - 1, side="right")])
+    # La ultima decision de cada objetivo no tiene posiciones siguientes y se queda con la suya
+    resultado = np.where(fin > inicio, (acumulada[np.maximum(fin, inicio)] - acumulada[np.minimum(inicio, fin)]) / np.maximum(fin - inicio, 1), muestra)
+    return resultado, triangulo
+
+
+def pesosResultado(resultado, factor=FACTOR_VENTAJA):
+    """
+    Convierte los resultados en pesos exp(factor * z), con z el resultado tipificado (restada la
+    media y dividido por la desviacion), normalizados para que el mayor sea 1.
+
+    Explicación:
+        El peso crece con lo que una decision acabo mejor que la media, no solo con su posicion en
+        el orden: con pesos por percentil la mejor decision solo contaba el doble que la mediana y
+        las reglas aprendidas apenas se apartaban de imitar todas las decisiones grabadas. Con las
+        cuatro grabaciones de `fuzzy-tabla` de las semillas 0 a 3, y un factor de 1.5, `fuzzy` pasa
+        de 51,8 a 63,4 puntos. Con un factor de 2.25 o mas casi todo el peso cae en las decisiones
+        que ya iban por la recta (con error angular casi 0), los cortes del error se juntan en 0 y
+        las reglas quedan en un todo o nada que no llega a 32 puntos.
+    """
+    desviacion = resultado.std()
+    if desviacion == 0:
+        return np.ones(len(resultado))
+    z = (resultado - resultado.mean()) / desviacion
+    return np.exp(factor * (z - z.max()))
+
+
+def tramos(centros, x):
+    """
+    Posicion de cada x en una particion de terminos triangulares, donde cada termino tiene su pico
+    en su centro y llega a 0 en los centros vecinos (los extremos son hombros). Cada x pertenece solo
+    a los terminos `tramo` y `tramo + 1`, con grados 1 - fraccion y fraccion, que suman 1.
+
+    Retorna:
+        tuple: (tramo, fraccion), arrays del tamaño de x
+    """
+    x = np.clip(x, centros[0], centros[-1])
+    tramo = np.clip(np.searchsorted(centros, x, side="right") - 1, 0, len(centros) - 2)
+    fraccion = (x - centros[tramo]) / (centros[tramo + 1] - centros[tramo])
+    return tramo, fraccion
+
+
+def terminoPrincipal(centros, x):
+    """
+    Termino con mas pertenencia de cada x y su grado de pertenencia.
+    """
+    tramo, fraccion = tramos(centros, x)
+    return tramo + (fraccion > 0.5), np.maximum(fraccion, 1 - fraccion)
+
+
+def extraerReglas(centrosError, centrosSalida, error, W, pesos):
+    """
+    Extraccion de reglas de Wang-Mendel: cada muestra propone la regla (termino de error con mas
+    pertenencia -> termino de salida con mas pertenencia) con un grado igual al producto de ambas
+    pertenencias por su peso. Para cada termino de error se queda el consecuente con mas grado
+    acumulado; si no hay muestras se mantiene el consecuente que ocupa su misma posicion.
+
+    Retorna:
+        np.array: Indice del termino de salida de cada termino de error
+    """
+    antecedente, gradoError = terminoPrincipal(centrosError, error)
+    consecuente, gradoSalida = terminoPrincipal(centrosSalida, W)
+    tabla = np.bincount(antecedente * len(centrosSalida) + consecuente, weights=gradoError * gradoSalida * pesos,
+                        minlength=len(centrosError) * len(centrosSalida)).reshape(len(centrosError), len(centrosSalida))
+    reglas = np.argmax(tabla, axis=1)
+    sinDatos = tabla.sum(axis=1) == 0
+    reglas[sinDatos] = np.arange(len(centrosError))[sinDatos]
+    return simetrizarReglas(reglas, len(centrosSalida))
+
+
+def simetrizarReglas(reglas, numSalidas):
+    """
+    Hace las reglas impares: la de cada termino de error negativo se refleja en su opuesto y el termino
+    central (Cero) va al termino de salida central (Recto). Con el histograma reflejado de `agrupar`
+    las reglas ya salen asi salvo empates, que argmax resuelve siempre hacia el primer termino.
+    """
+    reglas = reglas.copy()
+    centro = len(reglas) // 2
+    reglas[centro] = numSalidas // 2
+    reglas[len(reglas) - centro:] = numSalidas - 1 - reglas[:centro][::-1]
+    return reglas
+
+
+def simetrizar(centros):
+    """
+    Promedia unos centros ordenados con su reflejo, de forma que queden impares (el central en 0).
+    Con datos simetricos el ajuste deberia salir asi, pero `refinarCortes` y `ordenarCentros`
+    recorren los centros de izquierda a derecha y cada pasada acumula una desviacion hacia un lado.
+    """
+    return (centros - centros[::-1]) / 2
+
+
+def ajustarSalidas(centrosError, reglas, error, W, pesos, limite, separacion):
+    """
+    Centros de los terminos de salida que mejor reproducen W. Con pertenencias que suman 1, la salida
+    es la media de los centros de los consecuentes ponderada por la pertenencia del error, que es
+    lineal en los centros, asi que se resuelve por minimos cuadrados ponderados. Cada muestra solo
+    toca dos consecuentes, y las ecuaciones normales (5x5) se acumulan con bincount sin construir la
+    matriz de todas las muestras.
+
+    Las reglas y los cortes del error son impares, asi que los centros tambien: se resuelve solo la
+    mitad positiva (el central, Recto, queda en 0) y cada ecuacion suma las muestras de los dos
+    lados. Los terminos interiores solo los tocan las muestras de las zonas de transicion, y sin
+    juntar los dos lados su centro cambiaba de 0.84 a 0.59 entre dos y cuatro grabaciones; juntos
+    se queda entre 0.75 y 0.81. Una regularizacion de Tikhonov, con un peso de REGULARIZACION_SALIDA
+    de la traza de las ecuaciones, deja en el reparto uniforme los terminos sin muestras. Con pesos
+    de 1e-3 o mas arrastra a los cortes del error hacia 0 y las reglas acaban en un todo o nada.
+    """
+    tramo, fraccion = tramos(centrosError, error)
+    a, b = reglas[tramo], reglas[tramo + 1] # Consecuentes de los dos terminos de cada muestra
+    n = len(TERMINOS_SALIDA)
+    normal = np.zeros((n, n))
+    for i, gi in ((a, 1 - fraccion), (b, fraccion)):
+        for j, gj in ((a, 1 - fraccion), (b, fraccion)):
+            normal += np.bincount(i * n + j, weights=gi * gj * pesos, minlength=n * n).reshape(n, n)
+    independiente = (np.bincount(a, weights=(1 - fraccion) * W * pesos, minlength=n)
+                     + np.bincount(b, weights=fraccion * W * pesos, minlength=n))
+    # Centros = reflejo @ mitad positiva
+    centro = n // 2
+    reflejo = np.zeros((n, n - centro - 1))
+    for k in range(n - centro - 1):
+        reflejo[centro + 1 + k, k], reflejo[centro - 1 - k, k] = 1, -1
+    normal = reflejo.T @ normal @ reflejo
+    independiente = reflejo.T @ independiente
+    regularizacion = REGULARIZACION_SALIDA * np.trace(normal) / len(normal)
+    uniformes = np.linspace(-limite, limite, n)[centro + 1:]
+    mitad = np.linalg.solve(normal + regularizacion * np.eye(len(normal)), independiente + regularizacion * uniformes)
+    centros = reflejo @ mitad
+    return simetrizar(ordenarCentros(np.clip(centros, -limite, limite), limite, separacion))
+
+
+def ordenarCentros(centros, limite, separacion):
+    """
+    Ordena unos centros, fija los extremos en +-limite y separa los vecinos al menos `separacion`.
+    """
+    centros = np.sort(centros)
+    centros[0], centros[-1] = -limite, limite
+    for i in range(1, len(centros) - 1):
+        centros[i] = min(max(centros[i], centros[i - 1] + separacion), limite - separacion * (len(centros) - 1 - i))
+    return centros
+
+
+def refinarCortes(centrosError, salidaReglas, error, W, pesos):
+    """
+    Mueve cada punto de corte interior del error angular entre sus vecinos a la posicion, de entre
+    CANDIDATOS_CORTE, con menor error cuadratico ponderado. `error` tiene que estar ordenado.
+
+    Parámetros:
+        salidaReglas: Centro de salida del consecuente de cada termino de error
+
+    Explicación:
+        Mover el corte i solo cambia la prediccion de las muestras entre sus vecinos L y R. A la
+        izquierda del corte p la prediccion es a + b*u/(p - L) con u = x - L, y a la derecha
+        c - d*v/(R - p) con v = R - x, asi que el error de cada lado se desarrolla en sumas de
+        w*(a - W)^2, w*u*(a - W) y w*u^2 (y sus equivalentes a la derecha) que no dependen de p. Con
+        sumas acumuladas sobre las muestras ordenadas cada candidato se evalua en tiempo constante.
+    """
+    centrosError = centrosError.copy()
+    for i in range(1, len(centrosError) - 1):
+        izquierda, derecha = centrosError[i - 1], centrosError[i + 1]
+        desde, hasta = np.searchsorted(error, (izquierda, derecha))
+        if desde == hasta:
+            continue
+        x, w, p = error[desde:hasta], W[desde:hasta], pesos[desde:hasta]
+        a, b = salidaReglas[i - 1], salidaReglas[i] - salidaReglas[i - 1]
+        c, d = salidaReglas[i + 1], salidaReglas[i + 1] - salidaReglas[i]
+        u, v = x - izquierda, derecha - x
+        residuoIzq, residuoDer = a - w, c - w
+
+        def acumular(*terminos): # Sumas de las k primeras muestras, k = 0..n
+            return [np.concatenate(([0.0], np.cumsum(termino * p))) for termino in terminos]
+        izq0, izq1, izq2 = acumular(residuoIzq ** 2, u * residuoIzq, u ** 2)
+        der0, der1, der2 = acumular(residuoDer ** 2, v * residuoDer, v ** 2)
+
+        posiciones = np.linspace(izquierda, derecha, CANDIDATOS_CORTE + 2)[1:-1]
+        k = np.searchsorted(x, posiciones) # Muestras a la izquierda de cada candidato
+        m, q = b / (posiciones - izquierda), d / (derecha - posiciones)
+        errores = (izq0[k] + 2 * m * izq1[k] + m ** 2 * izq2[k]
+                   + (der0[-1] - der0[k]) - 2 * q * (der1[-1] - der1[k]) + q ** 2 * (der2[-1] - der2[k]))
+        centrosError[i] = posiciones[np.argmin(errores)]
+    return centrosError
+
+
+def agrupar(error, W, pesos, wmax):
+    """
+    Resume las decisiones en un histograma ponderado de CELDAS_ERROR x CELDAS_SALIDA celdas, de
+    forma que el ajuste trabaja sobre las celdas ocupadas en lugar de sobre cada muestra y su coste
+    no crece con las horas grabadas. Las celdas salen ordenadas por error angular.
+
+    El robot es simetrico: girar a la izquierda con error positivo vale lo mismo que a la derecha con
+    error negativo, asi que el histograma se suma con su reflejo. Sin el, un circuito con mas giros
+    hacia un lado desplaza el termino Cero y el robot gira aun yendo recto.
+
+    Retorna:
+        tuple: (error angular, W y peso de cada celda ocupada)
+    """
+    i = np.clip(((error + math.pi) / (2 * math.pi) * CELDAS_ERROR).astype(int), 0, CELDAS_ERROR - 1)
+    j = np.clip(((W + wmax) / (2 * wmax) * CELDAS_SALIDA).astype(int), 0, CELDAS_SALIDA - 1)
+    histograma = np.bincount(i * CELDAS_SALIDA + j, weights=pesos, minlength=CELDAS_ERROR * CELDAS_SALIDA)
+    histograma = histograma.reshape(CELDAS_ERROR, CELDAS_SALIDA)
+    histograma = histograma + histograma[::-1, ::-1]
+    filas, columnas = np.nonzero(histograma)
+    return ((filas + 0.5) / CELDAS_ERROR * 2 * math.pi - math.pi, (columnas + 0.5) / CELDAS_SALIDA * 2 * wmax - wmax,
+            histograma[filas, columnas])
+
+
+def aprenderConjunto(error, W, pesos, wmax):
+    """
+    Ajusta reglas y puntos de corte para un tipo de objetivo alternando la extraccion de reglas, el
+    ajuste de los centros de salida y el refinado de los cortes del error angular.
+
+    Parámetros:
+        error, W, pesos: Muestras ordenadas por error angular (las celdas de `agrupar`)
+
+    Retorna:
+        tuple: (centros del error angular, centros de la salida, consecuente de cada termino de error)
+
+    Explicación:
+        El ajuste supone que la salida es la media de los centros de los consecuentes ponderada por la
+        pertenencia del error, que es lo que calcula DecompositionalInference si los terminos de salida
+        son triangulos estrechos (mas que el paso del universo de FuzzyVariable): al recortarlos con
+        la pertenencia de la premisa su area es proporcional a ella. Con terminos de salida anchos el
+        centro de gravedad tiende a 0, la ganancia cerca de error 0 cae a una fraccion de la ajustada
+        y el robot no llega a girar lo suficiente. Por eso los centros de salida se mantienen a un
+        semiancho de los limites, para que los terminos extremos quepan enteros en el universo.
+    """
+    centrosError = np.linspace(-math.pi, math.pi, len(TERMINOS_ERROR))
+    semiancho = SEMIANCHO_SALIDA * wmax
+    centrosSalida = np.linspace(semiancho - wmax, wmax - semiancho, len(TERMINOS_SALIDA))
+    for _ in range(ITERACIONES_REFINAMIENTO):
+        reglas = extraerReglas(centrosError, centrosSalida, error, W, pesos)
+        centrosSalida = ajustarSalidas(centrosError, reglas, error, W, pesos, wmax - semiancho, 2 * semiancho)
+        centrosError = simetrizar(refinarCortes(centrosError, centrosSalida[reglas], error, W, pesos))
+    reglas = extraerReglas(centrosError, centrosSalida, error, W, pesos)
+    return centrosError, centrosSalida, reglas
+
+
+def describirVariable(centros, nombres, limite, semiancho=None):
+    """
+    Variable difusa con terminos trimf con picos en `centros`, en el formato del fichero de reglas
+    (argumentos de FuzzyVariable). Sin `semiancho` los terminos forman una particion (cada uno
+    llega a 0 en los centros vecinos); con el son triangulos estrechos de ese semiancho.
+    """
+    terminos = {}
+    for i, nombre in enumerate(nombres):
+        izquierda = centros[max(i - 1, 0)] if semiancho is None else centros[i] - semiancho
+        derecha = centros[min(i + 1, len(centros) - 1)] if semiancho is None else centros[i] + semiancho
+        terminos[nombre] = ["trimf", float(izquierda), float(centros[i]), float(derecha)]
+    return {"universe_range": [-limite, limite], "terms": terminos}
+
+
+def aprender(datos, wmax=ConfiguracionFuzzy.WMAX, tipos=("normales",)):
+    """
+    Aprende una configuracion de variables y reglas para FuzzySystem a partir de decisiones grabadas.
+
+    Parámetros:
+        datos: Diccionario con los arrays "error_angular", "W", "resultado" y "triangulo"
+        wmax: Velocidad angular maxima de la salida (rad/s)
+        tipos: Tipos de segmento que se aprenden ("normales", "triangulo"); los demas conservan las
+               reglas definidas a mano
+
+    Retorna:
+        dict: Configuracion para el JSON que se indica en ConfiguracionFuzzy.FICHERO_REGLAS
+    """
+    configuracion = {}
+    for tipo in tipos:
+        filas = datos["triangulo"] if tipo == "triangulo" else ~datos["triangulo"]
+        error = np.asarray(datos["error_angular"], dtype=float)[filas]
+        W = np.asarray(datos["W"], dtype=float)[filas]
+        if len(error) == 0:
+            raise ValueError(f"No hay decisiones grabadas en objetivos de tipo {tipo}")
+        pesos = pesosResultado(np.asarray(datos["resultado"], dtype=float)[filas])
+        centrosError, centrosSalida, reglas = aprenderConjunto(*agrupar(error, W, pesos, wmax), wmax)
+        configuracion[tipo] = {
+            "variables": {
+                "error_angular": describirVariable(centrosError, TERMINOS_ERROR, math.pi),
+                "velocidad_angular": describirVariable(centrosSalida, TERMINOS_SALIDA, wmax, SEMIANCHO_SALIDA * wmax),
+            },
+            "reglas": [[TERMINOS_ERROR[i], TERMINOS_SALIDA[j]] for i, j in enumerate(reglas)],
+        }
+    return configuracion
+
+
+def validar(ruta, clases=(FuzzySystem, FuzzyTablaSystem)):
+    """
+    Recorre el circuito con cada sistema usando las reglas de `ruta` y con las definidas a mano. Las
+    reglas se ajustan a las decisiones grabadas, no a la puntuacion, y con pocas grabaciones pueden
+    reproducir bien W y aun asi conducir peor o no terminar el circuito.
+
+    Las reglas de `ruta` se evaluan sin la cache de resultados: suele ser un fichero temporal con el
+    pid en el nombre y cada evaluacion dejaria en `cacheResultados/` una entrada que no se vuelve a
+    leer. Las definidas a mano si salen de la cache.
+
+    Retorna:
+        list: (nombre de la clase, resultado con las reglas aprendidas, resultado con las de a mano),
+              resultados de CacheResultados.evaluar
+    """
+    cache = CacheResultados()
+    comparacion = []
+    for clase in clases:
+        aprendidas = simularEvaluacion(clase(dataclasses.replace(clase().config, FICHERO_REGLAS=ruta)), crearCircuito())
+        comparacion.append((clase.__name__, aprendidas, cache.evaluar(clase)))
+    return comparacion
+
+
+def cargarDatos(rutas):
+    """
+    Junta los .npz grabados con `grabarEjecucion` en un solo diccionario de arrays.
+    """
+    partes = [np.load(ruta) for ruta in rutas]
+    return {campo: np.concatenate([parte[campo] for parte in partes]) for campo in ("error_angular", "W", "resultado", "triangulo")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="./aprendizajeFuzzy.py grabar RUTA.npz [--semilla N] [--experto fuzzy|fuzzy-tabla] | aprender DATOS.npz... --salida REGLAS.json [--tipos normales triangulo] [--validar fuzzy fuzzy-tabla] [--forzar]")
+    subparsers = parser.add_subparsers(dest="orden", required=True)
+    grabar = subparsers.add_parser("grabar", help="graba las decisiones de una ejecucion con ruido de exploracion")
+    grabar.add_argument("ruta")
+    grabar.add_argument("--semilla", type=int, default=0)
+    grabar.add_argument("--ruido", type=float, default=RUIDO_EXPLORACION)
+    grabar.add_argument("--experto", choices=tuple(EXPERTOS), default="fuzzy-tabla")
+    aprenderOrden = subparsers.add_parser("aprender", help="ajusta reglas y terminos a partir de grabaciones")
+    aprenderOrden.add_argument("rutas", nargs="+")
+    aprenderOrden.add_argument("--salida", required=True, help="JSON para ConfiguracionFuzzy.FICHERO_REGLAS")
+    aprenderOrden.add_argument("--tipos", nargs="+", choices=TIPOS_SEGMENTO, default=["normales"],
+                               help="tipos de segmento que se aprenden (por defecto normales)")
+    aprenderOrden.add_argument("--validar", nargs="+", choices=tuple(EXPERTOS), default=list(EXPERTOS),
+                               help="sistemas que van a usar las reglas y con los que se comparan (por defecto los dos)")
+    aprenderOrden.add_argument("--forzar", action="store_true",
+                               help="escribe las reglas aunque puntuen peor que las definidas a mano")
+    args = parser.parse_args()
+
+    if args.orden == "grabar":
+        datos = grabarEjecucion(EXPERTOS[args.experto], ruido=args.ruido, semilla=args.semilla)
+        np.savez(args.ruta, **datos)
+        print(f"{len(datos['W'])} decisiones grabadas en {args.ruta}")
+    else:
+        datos = cargarDatos(args.rutas)
+        configuracion = aprender(datos, tipos=args.tipos)
+        for tipo, conjunto in configuracion.items():
+            print(tipo, ", ".join(f"{antecedente} -> {consecuente}" for antecedente, consecuente in conjunto["reglas"]))
+        print(f"Reglas aprendidas de {len(datos['W'])} decisiones")
+
+        # Se valida con un fichero temporal y solo se renombra a --salida si el resultado es aceptable
+        temporal = f"{args.salida}.{os.getpid()}.tmp"
+        with open(temporal, "w") as fichero:
+            json.dump(configuracion, fichero, indent=2)
+        aceptable = True
+        for nombre, aprendidas, aMano in validar(temporal, [EXPERTOS[experto] for experto in args.validar]):
+            peor = not aprendidas["terminado"] or aprendidas["puntuacion"] < aMano["puntuacion"]
+            aceptable = aceptable and not peor
+            print(f"{nombre}: {aprendidas['puntuacion']:.3f} puntos con las reglas aprendidas "
+                  f"({'termina' if aprendidas['terminado'] else 'NO TERMINA'}), {aMano['puntuacion']:.3f} con las de a mano"
+                  + (" <- PEOR" if peor else ""))
+        if not aceptable and not args.forzar:
+            os.remove(temporal)
+            sys.exit(f"Las reglas aprendidas no mejoran las definidas a mano; no se escribe {args.salida} "
+                     f"(graba mas ejecuciones o usa --forzar)")
+        os.replace(temporal, args.salida)
+        if not aceptable:
+            print(f"AVISO: {args.salida} se escribe con --forzar aunque sus reglas puntuan peor que las definidas a mano")
+        print(f"Reglas escritas en {args.salida}")
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import random
+import hashlib
+import argparse
+import dataclasses
+import numpy as np
+
+from circuito import crearCircuito, POSE_INICIAL
+from simulacion import Simulacion, PASO_NOMINAL
+
+DIRECTORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cacheResultados") # Un JSON por evaluacion
+TAMANO_MAXIMO_CACHE = 64 * 1024 * 1024 # Bytes que puede ocupar la cache antes de borrar las entradas menos usadas
+TIEMPO_MAXIMO = 600 # Segundos simulados como maximo en cada evaluacion
+MODULOS_SIMULACION = ("simulacion", "robot", "puntuacion", "geometria") # Codigo que influye en cualquier evaluacion
+
+
+def huellaCodigo(claseExperto):
+    """
+    Resumen del codigo fuente que puede cambiar el resultado de una evaluacion: los modulos de la
+    clase del experto y de sus clases base, y los de la simulacion. Asi un cambio en el codigo
+    invalida las entradas de la cache en lugar de devolver resultados antiguos.
+    """
+    modulos = {sys.modules[clase.__module__] for clase in claseExperto.__mro__ if clase.__module__ in sys.modules}
+    modulos.update(sys.modules[nombre] for nombre in MODULOS_SIMULACION if nombre in sys.modules)
+    resumen = hashlib.sha256()
+    for ruta in sorted(filter(None, (getattr(modulo, "__file__", None) for modulo in modulos))):
+        if ruta.endswith(".py") and os.path.exists(ruta):
+            with open(ruta, "rb") as fichero:
+                resumen.update(fichero.read())
+    return resumen.hexdigest()
+
+
+def describirCircuito(objectiveSet):
+    """
+    Geometria del circuito como listas (tipo, inicio, fin, medio), que es todo lo que usa la simulacion.
+    """
+    return [[objetivo.getType(), list(objetivo.getInicio()), list(objetivo.getFin()),
+             list(objetivo.getMedio()) if objetivo.getType() == 2 else None] for objetivo in objectiveSet]
+
+
+def huellaFicheros(config):
+    """
+    Resumen del contenido de los ficheros a los que apunta la configuracion (campos de texto con la
+    ruta de un fichero existente, como FICHERO_REGLAS). La ruta sola no basta: al volver a aprender
+    las reglas en el mismo JSON la configuracion no cambia pero el resultado si.
+    """
+    huellas = {}
+    if not dataclasses.is_dataclass(config):
+        return huellas
+    for campo in dataclasses.fields(config):
+        valor = getattr(config, campo.name)
+        if isinstance(valor, str) and os.path.isfile(valor):
+            with open(valor, "rb") as fichero:
+                huellas[campo.name] = hashlib.sha256(fichero.read()).hexdigest()
+    return huellas
+
+
+def claveEvaluacion(claseExperto, config, objectiveSet, poseInicial=POSE_INICIAL, semilla=0,
+                    timeLapse=PASO_NOMINAL, tiempoMaximo=TIEMPO_MAXIMO):
+    """
+    Clave estable (sha256) de una evaluacion: clase y configuracion del experto, geometria del
+    circuito, pose inicial, semilla, paso de simulacion, codigo que interviene y contenido de los
+    ficheros que indica la configuracion.
+
+    La configuracion se serializa con `dataclasses.asdict`, asi que dos configuraciones iguales dan
+    la misma clave aunque sean objetos distintos.
+    """
+    descripcion = {
+        "experto": f"{claseExperto.__module__}.{claseExperto.__qualname__}",
+        "config": dataclasses.asdict(config) if dataclasses.is_dataclass(config) else repr(config),
+        "circuito": describirCircuito(objectiveSet),
+        "poseInicial": list(poseInicial),
+        "semilla": semilla,
+        "paso": timeLapse,
+        "tiempoMaximo": tiempoMaximo,
+        "codigo": huellaCodigo(claseExperto),
+        "ficheros": huellaFicheros(config),
+    }
+    texto = json.dumps(descripcion, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def simularEvaluacion(experto, objectiveSet, poseInicial=POSE_INICIAL, semilla=0, timeLapse=PASO_NOMINAL,
+                      tiempoMaximo=TIEMPO_MAXIMO):
+    """
+    Recorre el circuito con `experto` sin pasar por la cache, con random y numpy sembrados con
+    `semilla`. Sirve para evaluar configuraciones que no se quieren guardar, como las que leen un
+    fichero temporal.
+
+    Retorna:
+        dict: El resultado de `CacheResultados.evaluar` sin la "clave"
+    """
+    random.seed(semilla)
+    np.random.seed(semilla)
+    simulacion = Simulacion(experto, objectiveSet, poseInicial)
+    simulacion.ejecutar(timeLapse, tiempoMaximo)
+    return {
+        "puntuacion": float(simulacion.totalScore),
+        "puntuaciones": [[float(valor) for valor in puntuacion] for puntuacion in simulacion.puntuaciones],
+        "terminado": simulacion.terminado,
+        "tiempo": simulacion.tiempoSimulado,
+        "objetivos": len(simulacion.puntuaciones),
+    }
+
+
+class CacheResultados:
+    """
+    Cache en disco de los resultados de evaluar un sistema experto en un circuito.
+
+    Cada resultado se guarda en un JSON cuyo nombre es la clave de `claveEvaluacion`, con la
+    puntuacion de cada objetivo (la tupla de getSegmentScore o getTriangleScore) y un resumen del
+    recorrido. Al leer una entrada se actualiza su fecha de modificacion, y cuando la cache ocupa mas
+    de `tamanoMaximo` se borran las entradas que hace mas tiempo que no se usan.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_CACHE, tamanoMaximo=TAMANO_MAXIMO_CACHE):
+        self.directorio = directorio
+        self.tamanoMaximo = tamanoMaximo
+        self.aciertos = 0
+        self.fallos = 0
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.json")
+
+    def obtener(self, clave):
+        """
+        Devuelve el resultado guardado con `clave`, o None si no esta.
+        """
+        ruta = self.ruta(clave)
+        try:
+            with open(ruta) as fichero:
+                resultado = json.load(fichero)
+            os.utime(ruta) # Marca la entrada como usada para el desalojo
+        except (OSError, ValueError): # No existe, o la borro otro proceso, o esta a medio escribir
+            return None
+        return resultado
+
+    def guardar(self, clave, resultado):
+        """
+        Guarda un resultado. Se escribe en un fichero temporal y se renombra, de forma que otro
+        proceso nunca lee una entrada a medias.
+        """
+        ruta = self.ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w") as fichero:
+            json.dump(resultado, fichero)
+        os.replace(temporal, ruta)
+        self.recortar()
+
+    def entradas(self):
+        """
+        Lista de (fecha de ultimo uso, tamaño, ruta) de las entradas de la cache.
+        """
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(".json"):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            entradas.append((estado.st_mtime, estado.st_size, ruta))
+        return entradas
+
+    def recortar(self):
+        """
+        Borra las entradas menos usadas hasta que la cache ocupe como mucho `tamanoMaximo` bytes.
+        """
+        entradas = sorted(self.entradas())
+        tamano = sum(entrada[1] for entrada in entradas)
+        for _, tamanoEntrada, ruta in entradas:
+            if tamano <= self.tamanoMaximo:
+                break
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            tamano -= tamanoEntrada
+
+    def vaciar(self):
+        for _, _, ruta in self.entradas():
+            os.remove(ruta)
+
+    def evaluar(self, claseExperto, config=None, objectiveSet=None, poseInicial=POSE_INICIAL, semilla=0,
+                timeLapse=PASO_NOMINAL, tiempoMaximo=TIEMPO_MAXIMO):
+        """
+        Devuelve el resultado de ejecutar `claseExperto(config)` en el circuito, de la cache si ya se
+        habia evaluado y si no simulandolo y guardandolo.
+
+        Parámetros:
+            claseExperto: Clase del sistema experto (ExpertSystem, FuzzySystem...)
+            config: Configuracion del experto; por defecto la de la clase
+            objectiveSet: Circuito; por defecto el de circuito.py
+            poseInicial: Pose de salida del robot
+            semilla: Semilla de random y numpy antes de simular
+            timeLapse: Paso de simulacion (ms)
+            tiempoMaximo: Segundos simulados como maximo
+
+        Retorna:
+            dict: "puntuacion" total, "puntuaciones" (puntuacion, puntuacion de distancia, tiempo) de
+                  cada objetivo, "terminado", "tiempo" simulado, "objetivos" completados y "clave"
+        """
+        experto = None
+        if config is None: # Hace falta la configuracion por defecto de la clase para la clave
+            experto = claseExperto()
+            config = experto.config
+        if objectiveSet is None:
+            objectiveSet = crearCircuito()
+        clave = claveEvaluacion(claseExperto, config, objectiveSet, poseInicial, semilla, timeLapse, tiempoMaximo)
+        resultado = self.obtener(clave)
+        if resultado is not None:
+            self.aciertos += 1
+            return resultado
+
+        self.fallos += 1
+        resultado = simularEvaluacion(experto if experto is not None else claseExperto(config), objectiveSet, poseInicial,
+                                      semilla, timeLapse, tiempoMaximo)
+        resultado["clave"] = clave
+        self.guardar(clave, resultado)
+        return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="./cacheResultados.py [--vaciar]")
+    parser.add_argument("--directorio", default=DIRECTORIO_CACHE, help="directorio de la cache")
+    parser.add_argument("--vaciar", action="store_true", help="borra todas las entradas")
+    args = parser.parse_args()
+    cache = CacheResultados(args.directorio)
+    if args.vaciar:
+        cache.vaciar()
+    entradas = cache.entradas()
+    print(f"{len(entradas)} entradas, {sum(entrada[1] for entrada in entradas) / 1024:.1f} KiB en {cache.directorio}")
@@ -0,0 +1,170 @@
+import math
+import numpy as np
+import pygame
+
+ESCALA_INICIAL = 10.0 # Pixeles por metro de la vista original
+ESCALA_MINIMA = 1.0 # Con la ventana de 1024x720 se ven como mucho unas 7000 celdas del indice
+ESCALA_MAXIMA = 80.0
+FACTOR_ZOOM = 1.25 # Cambio de escala por cada paso de zoom
+DESPLAZAMIENTO = 40 # Pixeles que se mueve la vista con cada pulsacion de las flechas
+TAMANO_CELDA = 10.0 # Lado de las celdas del indice espacial (m)
+
+class Camara:
+    """
+    Transformacion entre coordenadas del mundo (metros, eje Y hacia arriba) y de la pantalla
+    (pixeles, eje Y hacia abajo), con desplazamiento, zoom y seguimiento del robot.
+
+    La vista inicial es la de siempre: escala ESCALA_INICIAL con el origen del mundo en la esquina
+    inferior izquierda de la ventana.
+    """
+
+    def __init__(self, tamano, escala=ESCALA_INICIAL, origen=(0.0, 0.0)):
+        """
+        Parámetros:
+            tamano: Tamaño de la ventana en pixeles (ancho, alto)
+            escala: Pixeles por metro
+            origen: Punto del mundo que queda en la esquina inferior izquierda de la ventana
+        """
+        self.ancho, self.alto = tamano
+        self.escala = escala
+        self.origen = [float(origen[0]), float(origen[1])]
+        self.siguiendo = False # Si es True la vista se centra en el robot en cada frame
+
+    def aPantalla(self, punto):
+        """
+        Convierte un punto (x, y) del mundo a pixeles de la ventana.
+        """
+        return ((punto[0] - self.origen[0]) * self.escala, self.alto - (punto[1] - self.origen[1]) * self.escala)
+
+    def aMundo(self, pixel):
+        """
+        Convierte un pixel de la ventana a un punto (x, y) del mundo.
+        """
+        return (pixel[0] / self.escala + self.origen[0], (self.alto - pixel[1]) / self.escala + self.origen[1])
+
+    def rectanguloVisible(self):
+        """
+        Devuelve la parte del mundo que se ve en la ventana como (xMin, yMin, xMax, yMax).
+        """
+        return (self.origen[0], self.origen[1],
+                self.origen[0] + self.ancho / self.escala, self.origen[1] + self.alto / self.escala)
+
+    def desplazar(self, dx, dy):
+        """
+        Mueve la vista `dx` pixeles a la derecha y `dy` pixeles hacia arriba. Desactiva el seguimiento.
+        """
+        self.siguiendo = False
+        self.origen[0] += dx / self.escala
+        self.origen[1] += dy / self.escala
+
+    def zoom(self, factor, pixel=None):
+        """
+        Multiplica la escala por `factor` manteniendo fijo el punto del mundo bajo `pixel`
+        (por defecto el centro de la ventana).
+        """
+        if pixel is None:
+            pixel = (self.ancho / 2, self.alto / 2)
+        fijo = self.aMundo(pixel)
+        self.escala = min(max(self.escala * factor, ESCALA_MINIMA), ESCALA_MAXIMA)
+        self.origen[0] = fijo[0] - pixel[0] / self.escala
+        self.origen[1] = fijo[1] - (self.alto - pixel[1]) / self.escala
+
+    def centrar(self, punto):
+        """
+        Coloca el punto (x, y) del mundo en el centro de la ventana.
+        """
+        self.origen[0] = punto[0] - self.ancho / (2 * self.escala)
+        self.origen[1] = punto[1] - self.alto / (2 * self.escala)
+
+    def actualizar(self, pose):
+        """
+        Se llama una vez por frame con la pose del robot; si el seguimiento esta activo centra la vista en el.
+        """
+        if self.siguiendo:
+            self.centrar(pose)
+
+    def procesarEvento(self, event):
+        """
+        Aplica los controles de la camara: flechas para desplazar, rueda del raton o z/x para el zoom,
+        f para seguir al robot y c para volver a la vista inicial.
+
+        Retorna:
+            bool: True si el evento era de la camara
+        """
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom(FACTOR_ZOOM ** event.y, pygame.mouse.get_pos())
+            return True
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == pygame.K_LEFT:
+            self.desplazar(-DESPLAZAMIENTO, 0)
+        elif event.key == pygame.K_RIGHT:
+            self.desplazar(DESPLAZAMIENTO, 0)
+        elif event.key == pygame.K_UP:
+            self.desplazar(0, DESPLAZAMIENTO)
+        elif event.key == pygame.K_DOWN:
+            self.desplazar(0, -DESPLAZAMIENTO)
+        elif event.key == pygame.K_z:
+            self.zoom(FACTOR_ZOOM)
+        elif event.key == pygame.K_x:
+            self.zoom(1 / FACTOR_ZOOM)
+        elif event.key == pygame.K_f:
+            self.siguiendo = not self.siguiendo
+        elif event.key == pygame.K_c:
+            self.siguiendo = False
+            self.escala = ESCALA_INICIAL
+            self.origen = [0.0, 0.0]
+        else:
+            return False
+        return True
+
+
+class IndiceEspacial:
+    """
+    Rejilla uniforme que guarda en que celdas cae la caja envolvente de cada elemento, para obtener
+    los elementos visibles sin recorrerlos todos.
+    """
+
+    def __init__(self, tamanoCelda=TAMANO_CELDA):
+        self.tamanoCelda = tamanoCelda
+        self.celdas = {} # (columna, fila) -> lista de identificadores
+
+    def rangoCeldas(self, caja):
+        xMin, yMin, xMax, yMax = caja
+        return (range(math.floor(xMin / self.tamanoCelda), math.floor(xMax / self.tamanoCelda) + 1),
+                range(math.floor(yMin / self.tamanoCelda), math.floor(yMax / self.tamanoCelda) + 1))
+
+    def insertar(self, identificador, caja):
+        """
+        Añade un elemento con su caja envolvente (xMin, yMin, xMax, yMax).
+        """
+        columnas, filas = self.rangoCeldas(caja)
+        for columna in columnas:
+            for fila in filas:
+                self.celdas.setdefault((columna, fila), []).append(identificador)
+
+    def consultar(self, caja):
+        """
+        Devuelve, ordenados, los identificadores de los elementos cuyas celdas tocan la caja.
+        """
+        columnas, filas = self.rangoCeldas(caja)
+        encontrados = set()
+        for columna in columnas:
+            for fila in filas:
+                encontrados.update(self.celdas.get((columna, fila), ()))
+        return sorted(encontrados)
+
+
+def crearIndiceObjetivos(objectiveSet):
+    """
+    Crea un IndiceEspacial con la caja envolvente de cada objetivo de `objectiveSet`, identificado
+    por su posicion en la lista.
+    """
+    indice = IndiceEspacial()
+    for numero, objetivo in enumerate(objectiveSet):
+        puntos = [objetivo.getInicio(), objetivo.getFin()]
+        if objetivo.getType() == 2:
+            puntos.append(objetivo.getMedio())
+        puntos = np.array(puntos, dtype=float)
+        indice.insertar(numero, (*puntos.min(axis=0), *puntos.max(axis=0)))
+    return indice
@@ -0,0 +1,100 @@
+import numpy as np
+from bisect import bisect_right
+
+VENTANA_BUSQUEDA = 10.0 # Longitud de camino alrededor de la ultima proyeccion en la que se busca el punto mas cercano (m)
+
+class CaminoReferencia:
+    """
+    Circuito completo compilado en una unica polilinea parametrizada por longitud de arco.
+
+    Une los segmentos y, en los triangulos, el desvio por el punto intermedio, y guarda la longitud
+    acumulada en cada vertice. Con esa tabla, obtener el punto a una distancia dada es una busqueda
+    binaria, y proyectar la posicion del robot solo mira los tramos cercanos a la proyeccion anterior,
+    asi que el coste por tick no depende del numero de objetivos. Como el camino es continuo, los
+    puntos adelantados pueden caer ya en el objetivo siguiente.
+    """
+
+    def __init__(self, objectiveSet, puntoTriangulo=None):
+        """
+        Parámetros:
+            objectiveSet: Lista de objetivos del circuito, en orden
+            puntoTriangulo: Funcion (indice, objetivo) -> punto de paso en los triangulos; por defecto el punto medio
+        """
+        if puntoTriangulo is None:
+            puntoTriangulo = lambda indice, objetivo: objetivo.getMedio()
+
+        puntos = [objectiveSet[0].getInicio()]
+        inicioObjetivo = [] # Indice del vertice en el que empieza cada objetivo
+        finObjetivo = [] # Indice del vertice en el que termina cada objetivo
+        for indice, objetivo in enumerate(objectiveSet):
+            if tuple(objetivo.getInicio()) != tuple(puntos[-1]):
+                puntos.append(objetivo.getInicio())
+            inicioObjetivo.append(len(puntos) - 1)
+            if objetivo.getType() == 2:
+                puntos.append(puntoTriangulo(indice, objetivo))
+            puntos.append(objetivo.getFin())
+            finObjetivo.append(len(puntos) - 1)
+
+        self.puntos = np.array(puntos, dtype=float)
+        tramos = np.diff(self.puntos, axis=0)
+        self.longitudes = np.hypot(tramos[:, 0], tramos[:, 1])
+        self.tangentes = tramos / np.maximum(self.longitudes, 1e-12)[:, None]
+        self.s = np.concatenate(([0.0], np.cumsum(self.longitudes))) # Longitud acumulada en cada vertice
+        self.sLista = self.s.tolist()
+        self.sInicioObjetivo = self.s[inicioObjetivo]
+        self.sFinObjetivo = self.s[finObjetivo]
+        self.longitud = float(self.s[-1])
+
+    def tramoEn(self, s):
+        """
+        Indice del tramo que contiene la longitud de arco `s` (busqueda binaria).
+        """
+        return min(max(bisect_right(self.sLista, s) - 1, 0), len(self.longitudes) - 1)
+
+    def puntoEn(self, s):
+        """
+        Punto del camino a una longitud de arco `s` (limitada al camino).
+        """
+        s = min(max(s, 0.0), self.longitud)
+        tramo = self.tramoEn(s)
+        return self.puntos[tramo] + (s - self.s[tramo]) * self.tangentes[tramo]
+
+    def proyectar(self, punto, sPista=None, ventana=VENTANA_BUSQUEDA):
+        """
+        Proyecta `punto` sobre el camino.
+
+        Parámetros:
+            punto: Posicion (x, y)
+            sPista: Longitud de arco de la proyeccion anterior; si se indica solo se buscan los tramos a
+                    menos de `ventana` de ella, si no se recorre todo el camino (solo para inicializar)
+            ventana: Longitud de camino que se explora a cada lado de `sPista`
+
+        Retorna:
+            tuple: (longitud de arco del punto mas cercano, distancia al camino)
+        """
+        if sPista is None:
+            primero, ultimo = 0, len(self.longitudes)
+        else:
+            primero = self.tramoEn(sPista - ventana)
+            ultimo = self.tramoEn(sPista + ventana) + 1
+
+        origenes = self.puntos[primero:ultimo]
+        tangentes = self.tangentes[primero:ultimo]
+        dx = punto[0] - origenes[:, 0]
+        dy = punto[1] - origenes[:, 1]
+        avance = np.clip(dx * tangentes[:, 0] + dy * tangentes[:, 1], 0.0, self.longitudes[primero:ultimo])
+        distancias = np.hypot(dx - avance * tangentes[:, 0], dy - avance * tangentes[:, 1])
+        mejor = int(np.argmin(distancias))
+        return float(self.s[primero + mejor] + avance[mejor]), float(distancias[mejor])
+
+    def inicioObjetivo(self, indice):
+        """
+        Longitud de arco en la que empieza el objetivo `indice`.
+        """
+        return float(self.sInicioObjetivo[indice])
+
+    def finObjetivo(self, indice):
+        """
+        Longitud de arco en la que termina el objetivo `indice`.
+        """
+        return float(self.sFinObjetivo[indice])
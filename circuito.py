@@ -0,0 +1,70 @@
+import json
+
+from segmento import *
+
+POSE_INICIAL = (1, 10, -10) # Pose inicial del robot (x, y, heading en grados)
+
+def crearCircuito():
+    """
+    Crea la lista de objetivos (segmentos y triangulos) del circuito de la practica.
+    El circuito es cerrado: el ultimo triangulo termina en el inicio del primer segmento.
+    """
+    objectiveSet = []
+    segmento = Objetivo()
+    segmento.setInicio((12, 34))
+    segmento.setFin((85,62))
+    objectiveSet.append(segmento)
+    triangulo = Objetivo()
+    triangulo.setInicio((85, 62)) #(95, 62))
+    triangulo.setFin((98, 55))
+    triangulo.setMedio((96, 64))
+    objectiveSet.append(triangulo)
+    segmento = Objetivo()
+    segmento.setInicio((98, 55))
+    segmento.setFin((70,15))
+    objectiveSet.append(segmento)
+    triangulo = Objetivo()
+    triangulo.setInicio((70, 15)) #(95, 62))
+    triangulo.setFin((55, 7))
+    triangulo.setMedio((62, 7))
+    objectiveSet.append(triangulo)
+    segmento = Objetivo()
+    segmento.setInicio((55, 7))
+    segmento.setFin((15, 20))
+    objectiveSet.append(segmento)
+    triangulo = Objetivo()
+    triangulo.setInicio((15, 20)) #(95, 62))
+    triangulo.setFin((12, 34))
+    triangulo.setMedio((8, 26))
+    objectiveSet.append(triangulo)
+    return objectiveSet
+
+def guardarCircuito(objectiveSet, ruta):
+    """
+    Guarda la geometria de un circuito en un JSON {"objetivos": [{"inicio": [x, y], "fin": [x, y],
+    "medio": [x, y]}, ...]}, en el que los segmentos no llevan "medio".
+    """
+    objetivos = []
+    for objetivo in objectiveSet:
+        datos = {"inicio": list(map(float, objetivo.getInicio())), "fin": list(map(float, objetivo.getFin()))}
+        if objetivo.getType() == 2:
+            datos["medio"] = list(map(float, objetivo.getMedio()))
+        objetivos.append(datos)
+    with open(ruta, "w") as fichero:
+        json.dump({"objetivos": objetivos}, fichero)
+
+def cargarCircuito(ruta):
+    """
+    Lee un circuito guardado con `guardarCircuito`.
+    """
+    with open(ruta) as fichero:
+        datos = json.load(fichero)
+    objectiveSet = []
+    for datosObjetivo in datos["objetivos"]:
+        objetivo = Objetivo()
+        objetivo.setInicio(tuple(datosObjetivo["inicio"]))
+        objetivo.setFin(tuple(datosObjetivo["fin"]))
+        if "medio" in datosObjetivo:
+            objetivo.setMedio(tuple(datosObjetivo["medio"]))
+        objectiveSet.append(objetivo)
+    return objectiveSet
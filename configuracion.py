@@ -0,0 +1,108 @@
+"""
+Parametros de ajuste de los sistemas expertos.
+
+Cada sistema recibe su configuracion al construirse y la guarda en `self.config`. Las configuraciones
+son inmutables (frozen), asi que varios sistemas con parametros distintos pueden ejecutarse a la vez
+en el mismo proceso o en hilos sin pisarse. Para variar un parametro se crea una copia con
+`dataclasses.replace(config, VMAX=2.5)`.
+"""
+
+from dataclasses import dataclass
+
+import robot
+
+@dataclass(frozen=True)
+class ConfiguracionExperto:
+    VMAX: float = 3.0  # Velocidad lineal máxima (m/s)
+    VMAX_TRIANGULO: float = 2.9
+    WMAX: float = 1.0  # Velocidad angular máxima (rad/s)
+    VACC: float = 1.0  # Aceleración lineal máxima (m/s²)
+    WACC: float = 0.5  # Aceleración angular máxima (rad/s²)
+    FACT_ANTICIPACION_GIRO: float = 1.4  # Parámetro que regula la anticipación al giro del robot
+    FACTORES_ANTICIPACION: tuple = ((0.5, 1.4), (1, 1.7), (2.5, 1.61), (3, 1.7))  # (segmento, factor) con MAXIMIZACION_DE_ESTE_EJERCICIO
+    FACT_ANTICIPACION_OTROS: float = 1.2  # Factor del resto de segmentos con MAXIMIZACION_DE_ESTE_EJERCICIO
+    TOLERACION_FIN_SEGMENTO: float = 0.5  # Tolerancia para considerar que se alcanzó el final del segmento (m)
+    TOLERANCIA_MEDIO: float = 1  # Tolerancia para considerar que se alcanzó el punto medio del triángulo (m)
+    MARGEN_CRUCE_OBJETIVO: float = 1.0  # Distancia que el punto adelantado puede pasar del final del objetivo con un camino de referencia (m)
+    ANGULO_GIRO_CERRADO: float = 75.0  # Angulo hasta el punto de llegada (grados) a partir del cual el robot se aleja de el y se comprueba si queda dentro del giro
+    LOGS_TIEMPO_REAL: bool = False  # Activar los logs en tiempo real solamente si se desea corregir algun error,
+                                    # se escriben por lotes desde un hilo de fondo (ver registro.py)
+    MAXIMIZACION_DE_ESTE_EJERCICIO: bool = True
+    """
+    MAXIMIZACION_DE_ESTE_EJERCICIO:
+
+    Si esta opcion se encuentra en False se trataran todos los segmentos de la
+    misma forma y todos los segmentos usaran el mismo factor de anticipacion al giro.
+    Puntuacion media de 41.
+
+    Si esta opcion se encuentra en True  se  modificaran los factores de anticipacion para
+    cada segmento de forma en la que den mas puntos (FACTORES_ANTICIPACION).
+    Puntuacion media de 44.
+    """
+
+
+@dataclass(frozen=True)
+class ConfiguracionFuzzy:
+    VMAX: float = 3.0  # Velocidad lineal máxima (m/s)
+    VMAX_TRIANGULO: float = 3  # Velocidad lineal máxima en segmentos triangulares (m/s)
+    WMAX: float = 1.0  # Velocidad angular máxima (rad/s)
+    VACC: float = 1.0  # Aceleración lineal máxima (m/s²)
+    WACC: float = 0.5  # Aceleración angular máxima (rad/s²)
+    TOLERACION_FIN_SEGMENTO: float = 0.5  # Tolerancia para considerar que se alcanzó el final del segmento (m)
+    TOLERANCIA_MEDIO: float = 3  # Tolerancia para considerar que se alcanzó el punto medio del triángulo (m)
+    MARGEN_CRUCE_OBJETIVO: float = 1.0  # Distancia que el punto adelantado puede pasar del final del objetivo con un camino de referencia (m)
+    ANGULO_GIRO_CERRADO: float = 75.0  # Angulo hasta el punto de llegada (grados) a partir del cual el robot se aleja de el y se comprueba si queda dentro del giro
+    LOGS_TIEMPO_REAL: bool = False # Activar los logs en tiempo real solamente si se desea corregir algun error,
+                                   # se escriben por lotes desde un hilo de fondo (ver registro.py)
+    MAXIMIZACION_DE_ESTE_EJERCICIO: bool = True
+    FICHERO_REGLAS: str = None  # JSON con variables y reglas aprendidas (aprendizajeFuzzy.py); None usa las definidas a mano
+
+
+@dataclass(frozen=True)
+class ConfiguracionFuzzyTabla(ConfiguracionFuzzy):
+    DISTANCIA_LATERAL_MAX: float = 4.0  # Distancia lateral a partir de la cual la entrada satura (m), con 2 m el robot oscila
+    PUNTOS_ERROR: int = 73  # Nodos de la rejilla en el eje del error angular (cada 5 grados)
+    PUNTOS_LATERAL: int = 17  # Nodos de la rejilla en el eje de la distancia lateral (cada 0.5 m)
+
+
+@dataclass(frozen=True)
+class ConfiguracionRollout:
+    VMAX: float = 3.0  # Velocidad lineal máxima (m/s)
+    VMAX_TRIANGULO: float = 2.9  # Velocidad lineal máxima en segmentos triangulares (m/s)
+    WMAX: float = 1.0  # Velocidad angular máxima (rad/s)
+    TOLERACION_FIN_SEGMENTO: float = 0.5  # Tolerancia para considerar que se alcanzó el final del segmento (m)
+    TOLERANCIA_MEDIO: float = 1  # Tolerancia para considerar que se alcanzó el punto medio del triángulo (m)
+    ANGULO_GIRO_CERRADO: float = 75.0  # Angulo hasta el punto de llegada (grados) a partir del cual el robot se aleja de el y se comprueba si queda dentro del giro
+    HORIZONTE: int = 19  # Numero de pasos simulados por cada candidato; con 30 se quedaba en 34 puntos (ver readme)
+    PASO_ROLLOUT: float = 100  # Duracion de cada paso simulado (ms), 19 pasos = 1.9 segundos de anticipacion
+    NUM_W_INICIAL: int = 21  # Valores de W probados en la primera mitad del horizonte
+    NUM_W_FINAL: int = 11  # Valores de W probados en la segunda mitad del horizonte
+    REDUCCION_V: float = 0.5  # Ademas de la V maxima se prueba V - REDUCCION_V
+    PESO_PROGRESO: float = 2000.0  # Valor de cada metro de avance en un segmento, en unidades de la metrica de distancia
+    PESO_PROGRESO_TRIANGULO: float = 40.0  # Valor de cada metro de avance en un triangulo, en muestras de penalizacion
+    PESO_LATERAL: float = 0.12  # Metros de avance que cuesta cada metro de distancia lateral en cada paso simulado
+    PESO_TRIANGULO: float = 1.0  # Penalizacion por cada muestra dentro del triangulo
+    LOGS_TIEMPO_REAL: bool = False  # Activar los logs en tiempo real solamente si se desea corregir algun error,
+                                    # se escriben por lotes desde un hilo de fondo (ver registro.py)
+
+
+@dataclass(frozen=True)
+class ConfiguracionPlanificador:
+    VMAX: float = robot.VMAX  # Limites del robot con los que se planifica el perfil (robot.py)
+    WMAX: float = robot.WMAX
+    VACC: float = robot.VACC
+    WACC: float = robot.WACC
+    PASO: float = 0.25  # Separacion entre muestras del perfil a lo largo del camino (m)
+    ANTICIPACION_MINIMA: float = 1.4  # Anticipacion minima (s), la de FACT_ANTICIPACION_GIRO; con 1 s se pierden mas de 10 puntos
+    MUESTRAS_GIRO: int = 400  # Pasos con los que se integra la forma de cada giro
+
+
+@dataclass(frozen=True)
+class ConfiguracionSupervisor:
+    PRESUPUESTO_MS: float = 8.0  # Tiempo maximo por decision (ms), la mitad de un frame a 60 fps
+    ALFA_LATENCIA: float = 0.2  # Peso de la ultima medida en la media movil de la latencia
+    FACTOR_DESVIACION: float = 2.0  # Desviaciones que se suman a la media para estimar el peor caso
+    FACTOR_RECUPERACION: float = 0.7  # Fraccion del presupuesto por debajo de la que un sondeo cuenta para volver al experto principal
+    INTERVALO_SONDEO: int = 10  # Ticks degradados entre dos pruebas del experto principal
+    SONDEOS_RECUPERACION: int = 3  # Sondeos seguidos por debajo del presupuesto necesarios para recuperarse
+    TICKS_MINIMOS_DEGRADADO: int = 60  # Ticks que se pasan como minimo en modo degradado (un segundo a 60 fps)
@@ -0,0 +1,90 @@
+import pygame
+import numpy as np
+
+from camara import Camara, ESCALA_INICIAL
+
+RADIUS = 8 # Radio de dibujo para los puntos objetivo
+SIZE = (1024, 720) # Tamaño de la ventana
+sizeY = SIZE[1] #Necesario para adaptar las coordenadas del entorno a las de la pantalla de pygame
+TAMANO_TRAMO = 64 # Puntos de la trayectoria que se descartan o dibujan juntos al recortar con la camara
+
+camaraFija = Camara(SIZE) # Vista original: escala 10 y origen del mundo en la esquina inferior izquierda
+
+def cargarImagenRobot():
+    # Necesita la ventana ya creada para poder convertir la imagen
+    return pygame.image.load('robot1.png').convert_alpha()
+
+def drawRobot(screen, robotIimage, pose, camara=camaraFija):
+    #from Aleksandar haber
+    # over here we rotate an image and create a copy of the rotated image
+    if camara.escala == ESCALA_INICIAL:
+        image1 = pygame.transform.rotate(robotIimage, pose[2])
+    else:
+        image1 = pygame.transform.rotozoom(robotIimage, pose[2], camara.escala / ESCALA_INICIAL)
+    # then we return a rectangle corresponding to the rotated copy
+    # the rectangle center is specified as an argument
+    image1_rect = image1.get_rect(center=camara.aPantalla(pose))
+    # then we plot the rotated image copy with boundaries specified by
+    # the rectangle
+    screen.blit(image1, image1_rect)
+
+def drawObjective(screen, objetivo, activo=True, camara=camaraFija):
+    pInicio = camara.aPantalla(objetivo.getInicio())
+    pFin = camara.aPantalla(objetivo.getFin())
+    if activo is True:
+        colorInicio = "green"
+        colorFin = "red"
+        colorLinea = "darkgray"
+        radio = RADIUS
+    else:
+        colorInicio = "lightgray"
+        colorFin = "darkgray"
+        colorLinea = "gray"
+        radio = RADIUS * 0.8
+    if objetivo.getType() == 1:
+        pygame.draw.line(screen, colorLinea, pInicio, pFin, 5)
+    else:
+        pMedio = camara.aPantalla(objetivo.getMedio())
+        pygame.draw.polygon(screen, colorLinea, [pInicio, pFin, pMedio])
+        pygame.draw.circle(screen, colorFin, pMedio, RADIUS)
+    pygame.draw.circle(screen, colorInicio, pInicio, radio)
+    pygame.draw.circle(screen, colorFin, pFin, radio)
+
+def drawObjectives(screen, objectiveSet, indice, activo=None, camara=camaraFija):
+    """
+    Dibuja solo los objetivos que se ven con la camara, buscandolos en `indice` (un IndiceEspacial
+    de crearIndiceObjetivos). `activo` es la posicion del objetivo que se resalta, o None.
+    """
+    margen = RADIUS / camara.escala # Para no cortar los circulos de los extremos en el borde
+    xMin, yMin, xMax, yMax = camara.rectanguloVisible()
+    for numero in indice.consultar((xMin - margen, yMin - margen, xMax + margen, yMax + margen)):
+        drawObjective(screen, objectiveSet[numero], numero == activo, camara)
+
+def drawTrayectoria(screen, puntos, camara=camaraFija):
+    """
+    Dibuja la polilinea `puntos`. Se parte en tramos de TAMANO_TRAMO puntos y los tramos cuya caja
+    envolvente queda fuera de la vista no se envian a pygame.
+    """
+    if len(puntos) < 2:
+        return
+    puntos = np.array([(p[0], p[1]) for p in puntos], dtype=float)
+    xMin, yMin, xMax, yMax = camara.rectanguloVisible()
+    # Los tramos comparten su ultimo punto con el siguiente para que la linea no tenga huecos
+    inicios = np.arange(0, len(puntos) - 1, TAMANO_TRAMO)
+    minimos = np.minimum.reduceat(puntos, inicios)
+    maximos = np.maximum.reduceat(puntos, inicios)
+    finales = np.minimum(inicios + TAMANO_TRAMO, len(puntos) - 1)
+    minimos = np.minimum(minimos, puntos[finales])
+    maximos = np.maximum(maximos, puntos[finales])
+    visibles = (maximos[:, 0] >= xMin) & (minimos[:, 0] <= xMax) & (maximos[:, 1] >= yMin) & (minimos[:, 1] <= yMax)
+    for inicio, final in zip(inicios[visibles], finales[visibles]):
+        pygame.draw.lines(screen, "red", False, [camara.aPantalla(p) for p in puntos[inicio:final + 1]], 2)
+
+def drawObstaculos(screen, mapa, camara=camaraFija):
+    """
+    Dibuja los obstaculos de un MapaObstaculos con sus formas originales, no con la rejilla.
+    """
+    for centro, radio in mapa.circulos:
+        pygame.draw.circle(screen, "black", camara.aPantalla(centro), radio * camara.escala)
+    for vertices in mapa.poligonos:
+        pygame.draw.polygon(screen, "black", [camara.aPantalla(v) for v in vertices])
@@ -1,66 +1,92 @@
 import math
 import numpy as np
-import datetime
 
-class ExpertSystem:
+from seguimiento import SeguimientoObjetivos
+from registro import obtenerRegistro
+from configuracion import ConfiguracionExperto
+
+class ExpertSystem(SeguimientoObjetivos):
     """
     Sistema experto para el control de un robot que navega a través de segmentos.
     Calcula velocidades de control, puntúa la trayectoria y registra logs de desempeño.
     """
 
-    # Definición de constantes de clase
-    VMAX = 3.0  # Velocidad lineal máxima (m/s)
-    VMAX_TRIANGULO = 2.9
-    WMAX = 1.0  # Velocidad angular máxima (rad/s)
-    VACC = 1.0  # Aceleración lineal máxima (m/s²)
-    WACC = 0.5  # Aceleración angular máxima (rad/s²)
-    FACT_ANTICIPACION_GIRO = 1.4  # Parámetro que regula la anticipación al giro del robot
-    TOLERACION_FIN_SEGMENTO = 0.5  # Tolerancia para considerar que se alcanzó el final del segmento (m)
-    LOGS_TIEMPO_REAL = False  # Activar los logs en tiempo real solamente si se desea corregir algun error, 
-                              # baja una media de 2 puntos el rendimiento
-    MAXIMIZACION_DE_ESTE_EJERCICIO = True 
-    """
-    MAXIMIZACION_DE_ESTE_EJERCICIO:
-    
-    Si esta opcion se encuentra en False se trataran todos los segmentos de la 
-    misma forma y todos los segmentos usaran el mismo factor de anticipacion al giro. 
-    Puntuacion media de 41.
-
-    Si esta opcion se encuentra en True  se  modificaran los factores de anticipacion para 
-    cada segmento de forma en la que den mas puntos.
-    Puntuacion media de 44.
-    """        
-
-    def __init__(self):
+    def __init__(self, config=None):
         """
         Inicializa los atributos del sistema experto.
+
+        Parámetros:
+            config: ConfiguracionExperto con los parametros de ajuste; por defecto la de configuracion.py
         """
+        self.config = config if config is not None else ConfiguracionExperto()
+        self.factorAnticipacion = self.config.FACT_ANTICIPACION_GIRO # Factor de anticipacion al giro del segmento actual
         self.objetivoAlcanzado = False  
         self.segmentoObjetivo = None  
         self.velocidad_lineal_previa = 0.0  # Velocidad lineal previa
         self.velocidad_angular_previa = 0.0  # Velocidad angular previa
         self.medioAlcanzado = False # Indica si el robot alcanza el punto medio del segmento triangulo
         self.segmento = 0 # Indica en que segmento se hubica, 0,5 ; 1,5 y 2,5 segmentos lineales -- 1;2;3 triangulos
+        self.indiceObjetivo = None # Posicion del objetivo actual en el circuito, la que indica Simulacion
+        self.posePrevia = None # Posicion (x, y) en la decision anterior, para comprobar las tolerancias sobre el tramo recorrido
+        self.fraccionCruce = None # Fraccion del ultimo tramo en la que se entro en la tolerancia del punto final
+        self.fraccionCruceMedio = None # Igual para el punto medio del triangulo
+        self.camino = None # CaminoReferencia opcional del circuito completo
+        self.sCamino = None # Longitud de arco de la ultima proyeccion sobre el camino
+        self.perfil = None # PerfilVelocidad opcional con la velocidad y la anticipacion planificadas
+        self.sPerfil = None # Longitud de arco de la ultima proyeccion sobre el camino del perfil
+
+    def setCamino(self, camino):
+        """
+        Usa un `CaminoReferencia` del circuito completo para calcular el punto adelantado en lugar del
+        segmento del objetivo actual.
+        """
+        self.camino = camino
+        self.sCamino = None
+
+    def setPerfil(self, perfil):
+        """
+        Usa un `PerfilVelocidad` planificado para el circuito en lugar de VMAX_TRIANGULO y de los
+        factores de anticipacion de cada segmento.
+        """
+        self.perfil = perfil
+        self.sPerfil = None
 
-    def setObjetivo(self, segmento):
+    def consultarPerfil(self, poseRobot):
+        """
+        Proyecta la posicion del robot sobre el camino del perfil y toma de el el factor de anticipacion.
+        """
+        if self.sPerfil is None:
+            self.sPerfil = self.perfil.camino.inicioObjetivo(self.indiceObjetivo)
+        self.sPerfil, _ = self.perfil.camino.proyectar(poseRobot[0:2], self.sPerfil)
+        self.factorAnticipacion = self.perfil.anticipacionEn(self.sPerfil)
+
+    def puntoTriangulo(self, indice, objetivo):
+        """
+        Punto de paso del triangulo `objetivo` para construir un `CaminoReferencia`: su punto medio.
+        """
+        return objetivo.getMedio()
+
+    def setObjetivo(self, segmento, indice=None):
         """
         Establece un nuevo objetivo para el robot.
+
+        Parámetros:
+            segmento: Objetivo (segmento o triangulo)
+            indice: Posicion del objetivo en el circuito. Si no se indica se supone que los objetivos se
+                    fijan en orden y sin saltarse ninguno, y se deduce del numero de llamadas
         """
         self.objetivoAlcanzado = False
         self.segmentoObjetivo = segmento
         self.medioAlcanzado = False # Al volver a settear el objetivo el medio vuelve a False por si el siguinte triangulo tiene que usarlo
-        self.segmento += 0.5 # Aumenta cada vez que se genera un objetivo para usar la MAXIMIZACION_DE_ESTE_EJERCICIO si es necesario
+        if indice is None:
+            indice = int(self.segmento * 2)
+        self.indiceObjetivo = indice
+        self.segmento = (indice + 1) / 2 # 0.5, 1, 1.5... segun la posicion en el circuito, para la MAXIMIZACION_DE_ESTE_EJERCICIO
+        self.fraccionCruce = None
+        self.fraccionCruceMedio = None
         
-        if ExpertSystem.MAXIMIZACION_DE_ESTE_EJERCICIO:
-            if self.segmento == 0.5:
-                ExpertSystem.FACT_ANTICIPACION_GIRO = 1.4
-            elif self.segmento == 2.5:
-                ExpertSystem.FACT_ANTICIPACION_GIRO = 1.61
-                
-            elif self.segmento == 1 or self.segmento == 3:
-                ExpertSystem.FACT_ANTICIPACION_GIRO = 1.7
-            else:
-                ExpertSystem.FACT_ANTICIPACION_GIRO = 1.2
+        if self.config.MAXIMIZACION_DE_ESTE_EJERCICIO:
+            self.factorAnticipacion = dict(self.config.FACTORES_ANTICIPACION).get(self.segmento, self.config.FACT_ANTICIPACION_OTROS)
 
 
     @staticmethod
@@ -106,17 +132,6 @@ class ExpertSystem:
         return (1 - k) * np.array(start_point) + k * np.array(end_point)
 
 
-    def actualizarEstado(self, poseRobot, puntoFin):
-        """
-        Actualiza el estado del robot basado en la distancia al punto final del segmento.
-        """
-        # Cálculo de la distancia al punto final del segmento
-        distancia_punto_final = np.linalg.norm(puntoFin - np.array(poseRobot[0:2]))
-
-        if distancia_punto_final <= ExpertSystem.TOLERACION_FIN_SEGMENTO:
-            self.objetivoAlcanzado = True
-
-
     def calcularPuntoObjetivo(self, inicio, fin, poseRobot):
         """
         Calcula el punto objetivo adelantado basado en la posición actual del robot.
@@ -148,8 +163,8 @@ class ExpertSystem:
 
             """
         # Parámetros para anticipación
-        velocidad_promedio = (self.velocidad_lineal_previa + self.VMAX) / 2
-        distancia_anticipacion = velocidad_promedio * self.FACT_ANTICIPACION_GIRO
+        velocidad_promedio = (self.velocidad_lineal_previa + self.config.VMAX) / 2
+        distancia_anticipacion = velocidad_promedio * self.factorAnticipacion
 
         # Cálculo de la distancia total del segmento
         longitud_segmento = np.linalg.norm(fin - inicio)
@@ -170,7 +185,30 @@ class ExpertSystem:
 
         return target_point
 
+    def calcularPuntoObjetivoCamino(self, poseRobot):
+        """
+        Calcula el punto objetivo adelantado sobre el camino de referencia del circuito completo.
+
+        La posicion del robot se proyecta sobre el camino partiendo de la proyeccion anterior y el punto
+        se adelanta la misma distancia que en `calcularPuntoObjetivo`. Como el camino sigue tras el final
+        del objetivo, el punto puede doblar ya la esquina siguiente, pero nunca pasa mas de
+        MARGEN_CRUCE_OBJETIVO del final para que el robot siga entrando en su tolerancia.
+
+        Parámetros:
+            poseRobot: Coordenadas actuales del robot en el espacio
+
+        Retorna:
+            np.array: Coordenadas del punto objetivo calculado en el camino
+        """
+        velocidad_promedio = (self.velocidad_lineal_previa + self.config.VMAX) / 2
+        distancia_anticipacion = velocidad_promedio * self.factorAnticipacion
 
+        indice = self.indiceObjetivo
+        if self.sCamino is None:
+            self.sCamino = self.camino.inicioObjetivo(indice)
+        self.sCamino, _ = self.camino.proyectar(poseRobot[0:2], self.sCamino)
+        sFin = self.camino.finObjetivo(indice)
+        return self.camino.puntoEn(min(self.sCamino + distancia_anticipacion, sFin + self.config.MARGEN_CRUCE_OBJETIVO))
 
     def calcularControl(self, target_point, poseRobot):
         """
@@ -241,21 +279,23 @@ class ExpertSystem:
         k_w = 2.0  # Ganancia proporcional para la velocidad angular
 
         # Velocidades deseadas
-        velocidad_angular_deseada = self.WMAX * math.tanh(k_w * error_angular)
-        if self.segmentoObjetivo.getType() == 2:
-            velocidad_lineal_deseada = self.VMAX_TRIANGULO
+        velocidad_angular_deseada = self.config.WMAX * math.tanh(k_w * error_angular)
+        if self.perfil is not None:
+            velocidad_lineal_deseada = self.perfil.velocidadEn(self.sPerfil)
+        elif self.segmentoObjetivo.getType() == 2:
+            velocidad_lineal_deseada = self.config.VMAX_TRIANGULO
         else:
-            velocidad_lineal_deseada = self.VMAX  # Mantener la velocidad máxima siempre
+            velocidad_lineal_deseada = self.config.VMAX  # Mantener la velocidad máxima siempre
 
         # Limitación de velocidades máximas para angular
-        velocidad_angular_deseada = max(min(velocidad_angular_deseada, self.WMAX), -self.WMAX)
+        velocidad_angular_deseada = max(min(velocidad_angular_deseada, self.config.WMAX), -self.config.WMAX)
 
         # Cálculo de las variaciones de velocidad
         delta_v = velocidad_lineal_deseada - self.velocidad_lineal_previa
-        delta_v = max(min(delta_v, self.VACC), -self.VACC)
+        delta_v = max(min(delta_v, self.config.VACC), -self.config.VACC)
 
         delta_w = velocidad_angular_deseada - self.velocidad_angular_previa
-        delta_w = max(min(delta_w, self.WACC), -self.WACC)
+        delta_w = max(min(delta_w, self.config.WACC), -self.config.WACC)
 
         # Actualización de velocidades
         velocidad_lineal = self.velocidad_lineal_previa + delta_v
@@ -290,12 +330,18 @@ class ExpertSystem:
 
         self.actualizarEstado(poseRobot, fin)
 
-        
-        if self.segmentoObjetivo.getType() == 2 and not self.medioAlcanzado:
-            dist_a_medio = np.linalg.norm(medio - np.array(poseRobot[:2]))
+        if self.perfil is not None:
+            self.consultarPerfil(poseRobot)
 
-            if dist_a_medio > 1 and (ExpertSystem.MAXIMIZACION_DE_ESTE_EJERCICIO or not ExpertSystem.MAXIMIZACION_DE_ESTE_EJERCICIO):
+        llegada, tolerancia = fin, self.config.TOLERACION_FIN_SEGMENTO # Punto que hay que alcanzar y su tolerancia
+        if self.camino is not None:
+            target_point = self.calcularPuntoObjetivoCamino(poseRobot)
+        elif self.segmentoObjetivo.getType() == 2 and not self.medioAlcanzado:
+            self.fraccionCruceMedio = self.comprobarCruce(poseRobot, medio, self.config.TOLERANCIA_MEDIO)
+
+            if self.fraccionCruceMedio is None and (self.config.MAXIMIZACION_DE_ESTE_EJERCICIO or not self.config.MAXIMIZACION_DE_ESTE_EJERCICIO):
                 target_point = self.calcularPuntoObjetivo(inicio, medio, poseRobot)
+                llegada, tolerancia = medio, self.config.TOLERANCIA_MEDIO
 
             else:
                 self.medioAlcanzado = True
@@ -305,8 +351,12 @@ class ExpertSystem:
 
 
         velocidad_lineal, velocidad_angular = self.calcularControl(target_point, poseRobot)
+        velocidad_lineal, velocidad_angular = self.limitarGiro(velocidad_lineal, velocidad_angular, poseRobot, llegada, tolerancia,
+                                                               self.config.WMAX)
+        self.velocidad_lineal_previa = velocidad_lineal # La aceleracion del siguiente tick parte de la V frenada
+        self.posePrevia = (poseRobot[0], poseRobot[1])
 
-        if self.LOGS_TIEMPO_REAL:
+        if self.config.LOGS_TIEMPO_REAL:
             self.imprimirPuntuacion(dist, velocidad_lineal, velocidad_angular)
 
         return velocidad_lineal, velocidad_angular
@@ -314,14 +364,41 @@ class ExpertSystem:
 
     def imprimirPuntuacion(self, dist, velocidad_lineal, velocidad_angular):
         """
-        Imprime la distancia a la que esta el robot del segmento, anteriormente tambien imprimia la puntuacion a tiempo real
+        Registra la distancia a la que esta el robot del segmento, anteriormente tambien imprimia la puntuacion a tiempo real.
+        El formato y la escritura se hacen en el hilo de fondo de `registro.py` para no frenar el bucle de control.
+        """
+        obtenerRegistro().registrar(dist, velocidad_lineal, velocidad_angular)
+
+    def sincronizar(self, poseRobot, comando, medioAlcanzado=False):
+        """
+        Registra la pose y el comando de un tick que ha decidido otro experto (ver
+        SupervisorTiempoReal), para que la limitacion de aceleracion y la comprobacion de cruce
+        partan de lo que el robot ha hecho de verdad. `medioAlcanzado` indica si ese experto ya ha
+        pasado por el punto medio del triangulo (ver `sincronizarMedio`).
+        """
+        if self.segmentoObjetivo.getType() == 2:
+            self.sincronizarMedio(poseRobot, self.segmentoObjetivo.getMedio(), medioAlcanzado)
+        self.posePrevia = (poseRobot[0], poseRobot[1])
+        self.velocidad_lineal_previa, self.velocidad_angular_previa = comando
+
+    def getEstado(self):
+        """
+        Devuelve una tupla con todo el estado mutable del sistema experto, incluido el factor de
+        anticipacion al giro del segmento actual, para poder restaurarlo con `setEstado`.
+        """
+        return (self.objetivoAlcanzado, self.segmentoObjetivo, self.velocidad_lineal_previa,
+                self.velocidad_angular_previa, self.medioAlcanzado, self.segmento,
+                self.factorAnticipacion, self.posePrevia, self.fraccionCruce, self.fraccionCruceMedio,
+                self.sCamino, self.sPerfil, self.indiceObjetivo)
+
+    def setEstado(self, estado):
+        """
+        Restaura un estado obtenido con `getEstado`.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(
-            f"[{timestamp}] Distancia al segmento: {dist:.4f} m, "
-            f"Velocidad Lineal: {velocidad_lineal:.4f} m/s, "
-            f"Velocidad Angular: {velocidad_angular:.4f} rad/s, "
-        )
+        (self.objetivoAlcanzado, self.segmentoObjetivo, self.velocidad_lineal_previa,
+         self.velocidad_angular_previa, self.medioAlcanzado, self.segmento,
+         self.factorAnticipacion, self.posePrevia, self.fraccionCruce, self.fraccionCruceMedio,
+         self.sCamino, self.sPerfil, self.indiceObjetivo) = estado
 
     def esObjetivoAlcanzado(self):
         """
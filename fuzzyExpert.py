@@ -1,42 +1,46 @@
+import json
 import math
 import numpy as np
-import datetime
+
+from seguimiento import SeguimientoObjetivos
+from registro import obtenerRegistro
+from configuracion import ConfiguracionFuzzy
 
 from fuzzy_expert.variable import FuzzyVariable
 from fuzzy_expert.rule import FuzzyRule
 from fuzzy_expert.inference import DecompositionalInference
 
-class FuzzySystem:
+class FuzzySystem(SeguimientoObjetivos):
     """
     Sistema experto difuso para el control de un robot que navega a través de segmentos.
     Utiliza lógica difusa para determinar la velocidad angular basada en el error angular.
     La velocidad lineal se mantiene constante en VMAX, con ajustes en segmentos triangulares.
     """
 
-    # Definición de constantes de clase
-    VMAX = 3.0  # Velocidad lineal máxima (m/s)
-    VMAX_TRIANGULO = 3  # Velocidad lineal máxima en segmentos triangulares (m/s)
-    WMAX = 1.0  # Velocidad angular máxima (rad/s)
-    VACC = 1.0  # Aceleración lineal máxima (m/s²)
-    WACC = 0.5  # Aceleración angular máxima (rad/s²)
-    TOLERACION_FIN_SEGMENTO = 0.5  # Tolerancia para considerar que se alcanzó el final del segmento (m)
-    TOLERANCIA_MEDIO = 3  # Tolerancia para considerar que se alcanzó el punto medio del triángulo (m)
-    LOGS_TIEMPO_REAL = False # Activar los logs en tiempo real solamente si se desea corregir algun error, 
-                            # baja una media de 2 puntos el rendimiento
-    MAXIMIZACION_DE_ESTE_EJERCICIO = True 
 
-    def __init__(self):
+    def __init__(self, config=None):
         """
         Inicializa el sistema experto difuso, definiendo las variables no difususas, las difusas y las reglas.
         También inicializa el sistema experto que usaremos, el DecompositionalInference
+
+        Parámetros:
+            config: ConfiguracionFuzzy con los parametros de ajuste; por defecto la de configuracion.py
         """
+        self.config = config if config is not None else ConfiguracionFuzzy()
         self.objetivoAlcanzado = False  
         self.segmentoObjetivo = None  
         self.velocidad_lineal_previa = 0.0  
         self.velocidad_angular_previa = 0.0  
         self.medioAlcanzado = False # Indica si el robot alcanza el punto medio del segmento triangulo
         self.segmento = 0 # Indica en que segmento se hubica, 0,5 ; 1,5 y 2,5 segmentos lineales -- 1;2;3 triangulos
-
+        self.indiceObjetivo = None # Posicion del objetivo actual en el circuito, la que indica Simulacion
+        self.posePrevia = None # Posicion (x, y) en la decision anterior, para comprobar las tolerancias sobre el tramo recorrido
+        self.fraccionCruce = None # Fraccion del ultimo tramo en la que se entro en la tolerancia del punto final
+        self.fraccionCruceMedio = None # Igual para el punto medio del triangulo
+        self.camino = None # CaminoReferencia opcional del circuito completo
+        self.sCamino = None # Longitud de arco de la ultima proyeccion sobre el camino
+        self.perfil = None # PerfilVelocidad opcional con la velocidad y la anticipacion planificadas
+        self.sPerfil = None # Longitud de arco de la ultima proyeccion sobre el camino del perfil
 
         # Variables difusas
         self.variables_normales = self.definir_variables_normales()
@@ -44,6 +48,9 @@ class FuzzySystem:
 
         # Reglas difusas
         self.rules = self.definir_reglas()
+        self.reglas_triangulo = self.rules # Las mismas salvo que se carguen reglas aprendidas
+        if self.config.FICHERO_REGLAS is not None:
+            self.cargarReglasAprendidas(self.config.FICHERO_REGLAS)
 
         # Configuracion del modelo
         self.modelo = DecompositionalInference(
@@ -56,15 +63,66 @@ class FuzzySystem:
         )
 
     
-    def setObjetivo(self, segmento):
+    def setObjetivo(self, segmento, indice=None):
         """
         Establece un nuevo objetivo para el robot.
+
+        Parámetros:
+            segmento: Objetivo (segmento o triangulo)
+            indice: Posicion del objetivo en el circuito. Si no se indica se supone que los objetivos se
+                    fijan en orden y sin saltarse ninguno, y se deduce del numero de llamadas
         """
         self.objetivoAlcanzado = False
         self.segmentoObjetivo = segmento
         self.medioAlcanzado = False  
-        self.segmento += 0.5 # Aumenta cada vez que se genera un objetivo para usar la MAXIMIZACION_DE_ESTE_EJERCICIO si es necesario
+        if indice is None:
+            indice = int(self.segmento * 2)
+        self.indiceObjetivo = indice
+        self.segmento = (indice + 1) / 2 # 0.5, 1, 1.5... segun la posicion en el circuito, para la MAXIMIZACION_DE_ESTE_EJERCICIO
+        self.fraccionCruce = None
+        self.fraccionCruceMedio = None
+
+    def setCamino(self, camino):
+        """
+        Usa un `CaminoReferencia` del circuito completo para calcular el punto adelantado en lugar del
+        segmento del objetivo actual. El camino deberia construirse con `puntoTriangulo` para pasar por
+        los mismos puntos medios extendidos.
+        """
+        self.camino = camino
+        self.sCamino = None
 
+    def setPerfil(self, perfil):
+        """
+        Usa un `PerfilVelocidad` planificado para el circuito en lugar de VMAX_TRIANGULO y de los
+        factores de anticipacion de cada segmento.
+        """
+        self.perfil = perfil
+        self.sPerfil = None
+
+    def consultarPerfil(self, poseRobot):
+        """
+        Proyecta la posicion del robot sobre el camino del perfil.
+        """
+        if self.sPerfil is None:
+            self.sPerfil = self.perfil.camino.inicioObjetivo(self.indiceObjetivo)
+        self.sPerfil, _ = self.perfil.camino.proyectar(poseRobot[0:2], self.sPerfil)
+
+    def factorAnticipacion(self):
+        """
+        Factor que multiplicado por VMAX da la distancia de anticipacion: el del perfil si lo hay y si no
+        el ajustado a mano (si esta activado se trataran el segmento 2 y el 2.5 con un target mas extendido).
+        """
+        if self.perfil is not None:
+            return self.perfil.anticipacionEn(self.sPerfil)
+        return (2.2 if (self.segmento == 2 or self.segmento == 2.5 or self.segmento == 1) else 1.4) if self.config.MAXIMIZACION_DE_ESTE_EJERCICIO else 2
+
+    def puntoTriangulo(self, indice, objetivo):
+        """
+        Punto de paso del triangulo `objetivo`, que ocupa la posicion `indice` del circuito, para construir
+        un `CaminoReferencia`: el punto medio extendido que se usaria al llegar a ese objetivo.
+        """
+        return self.calcularPuntoMedioTrianguloExtendido(np.array(objetivo.getInicio()), np.array(objetivo.getFin()),
+                                                         np.array(objetivo.getMedio()), (indice + 1) * 0.5)
 
 
     def definir_variables_normales(self):
@@ -93,13 +151,13 @@ class FuzzySystem:
             ),
             # Salida: velocidad angular
             "velocidad_angular": FuzzyVariable(
-                universe_range=(-self.WMAX, self.WMAX),
+                universe_range=(-self.config.WMAX, self.config.WMAX),
                 terms={
-                    "FuerteIzquierda": ('trimf', -self.WMAX, -self.WMAX, -self.WMAX/2),
-                    "Izquierda": ('trimf', -self.WMAX, -self.WMAX/2, 0),
-                    "Recto": ('trimf', -self.WMAX/10, 0, self.WMAX/10),
-                    "Derecha": ('trimf', 0, self.WMAX/2, self.WMAX),
-                    "FuerteDerecha": ('trimf', self.WMAX/2, self.WMAX, self.WMAX),
+                    "FuerteIzquierda": ('trimf', -self.config.WMAX, -self.config.WMAX, -self.config.WMAX/2),
+                    "Izquierda": ('trimf', -self.config.WMAX, -self.config.WMAX/2, 0),
+                    "Recto": ('trimf', -self.config.WMAX/10, 0, self.config.WMAX/10),
+                    "Derecha": ('trimf', 0, self.config.WMAX/2, self.config.WMAX),
+                    "FuerteDerecha": ('trimf', self.config.WMAX/2, self.config.WMAX, self.config.WMAX),
                 },
             ),
         }
@@ -132,13 +190,13 @@ class FuzzySystem:
             ),
             # Salida: velocidad angular
             "velocidad_angular": FuzzyVariable(
-                universe_range=(-self.WMAX, self.WMAX),
+                universe_range=(-self.config.WMAX, self.config.WMAX),
                 terms={
-                    "FuerteIzquierda": ('trimf', -self.WMAX, -self.WMAX, -self.WMAX/2),
-                    "Izquierda": ('trimf', -self.WMAX, -self.WMAX/2, 0),
-                    "Recto": ('trimf', -self.WMAX/4 if self.segmento == 1 else -self.WMAX/5, 0, self.WMAX/4 if self.segmento == 1 else self.WMAX/5), # en el segmento triangulo (1) el mantenerse recto obtendrá mas peso en el sistema
-                    "Derecha": ('trimf', 0, self.WMAX/2, self.WMAX),
-                    "FuerteDerecha": ('trimf', self.WMAX/2, self.WMAX, self.WMAX),
+                    "FuerteIzquierda": ('trimf', -self.config.WMAX, -self.config.WMAX, -self.config.WMAX/2),
+                    "Izquierda": ('trimf', -self.config.WMAX, -self.config.WMAX/2, 0),
+                    "Recto": ('trimf', -self.config.WMAX/4 if self.segmento == 1 else -self.config.WMAX/5, 0, self.config.WMAX/4 if self.segmento == 1 else self.config.WMAX/5), # en el segmento triangulo (1) el mantenerse recto obtendrá mas peso en el sistema
+                    "Derecha": ('trimf', 0, self.config.WMAX/2, self.config.WMAX),
+                    "FuerteDerecha": ('trimf', self.config.WMAX/2, self.config.WMAX, self.config.WMAX),
                 },
             ),
         }
@@ -209,6 +267,32 @@ class FuzzySystem:
         return rules
 
 
+    def cargarReglasAprendidas(self, ruta):
+        """
+        Sustituye las variables y reglas definidas a mano por las de un JSON generado con
+        aprendizajeFuzzy.py, que puede tener un apartado "normales" y otro "triangulo" con sus
+        "variables" (argumentos de FuzzyVariable) y sus "reglas" (pares [termino de error, termino de
+        salida]). El tipo de segmento que no este en el fichero conserva las definidas a mano.
+        """
+        with open(ruta) as fichero:
+            datos = json.load(fichero)
+
+        def leerVariables(apartado):
+            return {nombre: FuzzyVariable(universe_range=tuple(variable["universe_range"]),
+                                          terms={termino: tuple(forma) for termino, forma in variable["terms"].items()})
+                    for nombre, variable in apartado["variables"].items()}
+
+        def leerReglas(apartado):
+            return [FuzzyRule(premise=[("error_angular", antecedente)], consequence=[("velocidad_angular", consecuente)])
+                    for antecedente, consecuente in apartado["reglas"]]
+
+        if "normales" in datos:
+            self.variables_normales = leerVariables(datos["normales"])
+            self.rules = leerReglas(datos["normales"])
+        if "triangulo" in datos:
+            self.variables_triangulo = leerVariables(datos["triangulo"])
+            self.reglas_triangulo = leerReglas(datos["triangulo"])
+
     @staticmethod
     def straightToPointDistance(p1, p2, p3):
         """
@@ -253,14 +337,6 @@ class FuzzySystem:
         """
         return (1 - k) * np.array(start_point) + k * np.array(end_point)
 
-    def actualizarEstado(self, poseRobot, puntoFin):
-        """
-        Actualiza el estado del robot basado en la distancia al punto final del segmento.
-        """
-        distancia_punto_final = np.linalg.norm(puntoFin - np.array(poseRobot[0:2]))
-        if distancia_punto_final <= FuzzySystem.TOLERACION_FIN_SEGMENTO:
-            self.objetivoAlcanzado = True
-
     def calcularPuntoObjetivo(self, inicio, fin, poseRobot):
         """
         Calcula el punto objetivo adelantado basado en la posición actual del robot.
@@ -292,7 +368,7 @@ class FuzzySystem:
 
             """
         # Aumentar la distancia de anticipación para empezar a girar antes
-        distancia_anticipacion = self.VMAX * ((2.2 if (self.segmento == 2 or self.segmento == 2.5 or self.segmento == 1) else 1.4) if self.MAXIMIZACION_DE_ESTE_EJERCICIO else 2) # si esta activado se trataran el segmento 2 y el 2.5 con un target mas extendido
+        distancia_anticipacion = self.config.VMAX * self.factorAnticipacion()
         longitud_segmento = np.linalg.norm(fin - inicio)
 
         x, y = poseRobot[0], poseRobot[1]
@@ -307,12 +383,31 @@ class FuzzySystem:
         
         return target_point
 
-    def calcularPuntoMedioTrianguloExtendido(self, inicio, fin, medio):
+    def calcularPuntoObjetivoCamino(self, poseRobot):
+        """
+        Calcula el punto objetivo adelantado sobre el camino de referencia del circuito completo, con la
+        misma distancia de anticipacion que `calcularPuntoObjetivo`. El punto puede pasar del final del
+        objetivo actual como mucho MARGEN_CRUCE_OBJETIVO, para que el robot siga entrando en su tolerancia.
+        """
+        distancia_anticipacion = self.config.VMAX * self.factorAnticipacion()
+
+        indice = self.indiceObjetivo
+        if self.sCamino is None:
+            self.sCamino = self.camino.inicioObjetivo(indice)
+        self.sCamino, _ = self.camino.proyectar(poseRobot[0:2], self.sCamino)
+        sFin = self.camino.finObjetivo(indice)
+        return self.camino.puntoEn(min(self.sCamino + distancia_anticipacion, sFin + self.config.MARGEN_CRUCE_OBJETIVO))
+
+    def calcularPuntoMedioTrianguloExtendido(self, inicio, fin, medio, segmento=None):
         """
         Calcula el punto medio extendido del triángulo, desplazando el punto medio original
         'x' unidades en la dirección perpendicular al segmento inicio-fin y 'y' unidades en la 
-        direccion paralela al segmento inicio-fin
+        direccion paralela al segmento inicio-fin. Las extensiones dependen de `segmento`
+        (por defecto el segmento actual).
         """
+        if segmento is None:
+            segmento = self.segmento
+
         # Vector director del segmento inicio-fin
         vector_segmento = fin - inicio
         norm_segmento = np.linalg.norm(vector_segmento)
@@ -322,10 +417,10 @@ class FuzzySystem:
         # Vector perpendicular al segmento (rotación de 90 grados)
         vector_perpendicular = np.array([-vector_segmento_unitario[1], vector_segmento_unitario[0]])
 
-        extension_perpendicular = (2.3 if self.segmento == 1 else 1.9 if self.segmento == 2 else 0.8)
+        extension_perpendicular = (2.3 if segmento == 1 else 1.9 if segmento == 2 else 0.8)
 
         # Extender el punto medio x unidades en la dirección del vector perpendicular
-        extension_perpendicular = (2.3 if self.segmento == 1 else 1.9 if self.segmento == 2 else 0.8)
+        extension_perpendicular = (2.3 if segmento == 1 else 1.9 if segmento == 2 else 0.8)
         punto_medio_extendido_perpendicular = medio + extension_perpendicular * vector_perpendicular
 
         # Vector dirección desde el medio hacia el inicio
@@ -336,7 +431,7 @@ class FuzzySystem:
 
     
         # Extender el punto medio x unidades en la dirección del inicio
-        extension_paralela = (2.4 if self.segmento == 1 else 3 if self.segmento == 2 else 1.5)
+        extension_paralela = (2.4 if segmento == 1 else 3 if segmento == 2 else 1.5)
         punto_medio_final = punto_medio_extendido_perpendicular +  extension_paralela * direccion_hacia_inicio_unitario
 
         return punto_medio_final
@@ -349,11 +444,11 @@ class FuzzySystem:
 
         # Limitar aceleración angular
         delta_w = W - self.velocidad_angular_previa
-        delta_w = max(min(delta_w, self.WACC), -self.WACC)
+        delta_w = max(min(delta_w, self.config.WACC), -self.config.WACC)
         velocidad_angular = self.velocidad_angular_previa + delta_w
 
         # Asegurar que la velocidad angular no exceda los límites
-        velocidad_angular = max(min(velocidad_angular, self.WMAX), -self.WMAX)
+        velocidad_angular = max(min(velocidad_angular, self.config.WMAX), -self.config.WMAX)
 
         # Actualizar velocidades previas
         self.velocidad_angular_previa = velocidad_angular
@@ -386,22 +481,34 @@ class FuzzySystem:
         
         # Actualizar estado del robot respecto al punto final
         self.actualizarEstado(poseRobot, fin)
+        if self.perfil is not None:
+            self.consultarPerfil(poseRobot)
 
         # Implementar lógica para segmentos de tipo 2 (triángulos)
-        if self.segmentoObjetivo.getType() == 2 and not self.medioAlcanzado:
+        tramo = (inicio, fin) # Tramo que se esta siguiendo
+        llegada, tolerancia = fin, self.config.TOLERACION_FIN_SEGMENTO # Punto que hay que alcanzar y su tolerancia
+        if self.camino is not None:
+            # El camino de referencia ya pasa por los puntos medios extendidos
+            target_point = self.calcularPuntoObjetivoCamino(poseRobot)
+            indiceTramo = self.camino.tramoEn(self.sCamino)
+            tramo = (self.camino.puntos[indiceTramo], self.camino.puntos[indiceTramo + 1])
+        elif self.segmentoObjetivo.getType() == 2 and not self.medioAlcanzado:
             medio = np.array(self.segmentoObjetivo.getMedio())  # Obtener el punto medio del triángulo
 
             # Calcular el punto medio extendido
             medio_extendido = self.calcularPuntoMedioTrianguloExtendido(inicio, fin, medio)
-            dist_a_medio = np.linalg.norm(medio_extendido - np.array(poseRobot[:2]))
+            self.fraccionCruceMedio = self.comprobarCruce(poseRobot, medio_extendido, self.config.TOLERANCIA_MEDIO)
 
-            if dist_a_medio > self.TOLERANCIA_MEDIO:
+            if self.fraccionCruceMedio is None:
                 # Dirigirse al punto medio extendido
                 target_point = self.calcularPuntoObjetivo(inicio, medio_extendido, poseRobot)
+                tramo = (inicio, medio_extendido)
+                llegada, tolerancia = medio_extendido, self.config.TOLERANCIA_MEDIO
             else:
                 # Cambiar objetivo al punto final
                 self.medioAlcanzado = True
                 target_point = self.calcularPuntoObjetivo(medio_extendido, fin, poseRobot)
+                tramo = (medio_extendido, fin)
         else:
             # Para otros segmentos o si ya se alcanzó el punto medio, dirigirse al final
             target_point = self.calcularPuntoObjetivo(inicio, fin, poseRobot)
@@ -415,53 +522,99 @@ class FuzzySystem:
         error_angular = angulo_a_target - theta
         error_angular = (error_angular + math.pi) % (2 * math.pi) - math.pi
 
-        # Preparar entradas difusas
-        inputs = {
-            "error_angular": error_angular,
-        }
-
         # Determinar si estamos en un segmento triangular
         if self.segmentoObjetivo.getType() == 2:
             variables = self.variables_triangulo
-            V = self.VMAX_TRIANGULO
+            V = self.config.VMAX_TRIANGULO
 
 
         else:
             variables = self.variables_normales
-            V = self.VMAX
+            V = self.config.VMAX
+        if self.perfil is not None:
+            V = self.perfil.velocidadEn(self.sPerfil)
 
-        # Ejecutar inferencia difusa
-        resultado, cf = self.modelo(
-            variables=variables,
-            rules=self.rules,
-            error_angular=inputs["error_angular"],
-        )
-
-        # Obtener valor de salida difuso
-        W_fuzzy = resultado.get("velocidad_angular", 0)
+        W_fuzzy = self.inferirVelocidadAngular(error_angular, variables, poseRobot, tramo)
+        V, W_fuzzy = self.limitarGiro(V, W_fuzzy, poseRobot, llegada, tolerancia)
+        self.posePrevia = (x, y)
 
 
         # Aplicar restricciones de aceleración y velocidad
         velocidad_angular = self.calcularControl(W_fuzzy)
 
-        if self.LOGS_TIEMPO_REAL:
+        if self.config.LOGS_TIEMPO_REAL:
             self.imprimirPuntuacion(dist, V, velocidad_angular)
 
 
         return V, velocidad_angular
 
 
-    def imprimirPuntuacion(self, dist, velocidad_lineal, velocidad_angular):
+    def inferirVelocidadAngular(self, error_angular, variables, poseRobot, tramo):
         """
-        Imprime la distancia a la que esta el robot del segmento, anteriormente tambien imprimia la puntuacion a tiempo real
+        Ejecuta la inferencia difusa y devuelve la velocidad angular deseada.
+
+        Parámetros:
+            error_angular: Error angular normalizado hacia el punto objetivo (rad)
+            variables: Variables difusas del tipo de segmento actual
+            poseRobot: Pose actual del robot
+            tramo: Puntos (inicio, fin) del tramo que se esta siguiendo; aqui no se usa, pero los
+                   sistemas derivados pueden medir con el la distancia lateral
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(
-            f"[{timestamp}] Distancia al segmento: {dist:.4f} m, "
-            f"Velocidad Lineal: {velocidad_lineal:.4f} m/s, "
-            f"Velocidad Angular: {velocidad_angular:.4f} rad/s, "
+        # Preparar entradas difusas
+        inputs = {
+            "error_angular": error_angular,
+        }
+
+        # Ejecutar inferencia difusa
+        resultado, cf = self.modelo(
+            variables=variables,
+            rules=self.reglas_triangulo if variables is self.variables_triangulo else self.rules,
+            error_angular=inputs["error_angular"],
         )
 
+        # Obtener valor de salida difuso
+        return resultado.get("velocidad_angular", 0)
+
+    def imprimirPuntuacion(self, dist, velocidad_lineal, velocidad_angular):
+        """
+        Registra la distancia a la que esta el robot del segmento, anteriormente tambien imprimia la puntuacion a tiempo real.
+        El formato y la escritura se hacen en el hilo de fondo de `registro.py` para no frenar el bucle de control.
+        """
+        obtenerRegistro().registrar(dist, velocidad_lineal, velocidad_angular)
+
+    def sincronizar(self, poseRobot, comando, medioAlcanzado=False):
+        """
+        Registra la pose y el comando de un tick que ha decidido otro experto (ver
+        SupervisorTiempoReal), para que la limitacion de aceleracion y la comprobacion de cruce
+        partan de lo que el robot ha hecho de verdad. `medioAlcanzado` indica si ese experto ya ha
+        pasado por el punto medio del triangulo (ver `sincronizarMedio`).
+        """
+        if self.segmentoObjetivo.getType() == 2:
+            inicio, fin = np.array(self.segmentoObjetivo.getInicio()), np.array(self.segmentoObjetivo.getFin())
+            medio = self.calcularPuntoMedioTrianguloExtendido(inicio, fin, np.array(self.segmentoObjetivo.getMedio()))
+            self.sincronizarMedio(poseRobot, medio, medioAlcanzado)
+        self.posePrevia = (poseRobot[0], poseRobot[1])
+        self.velocidad_lineal_previa, self.velocidad_angular_previa = comando
+
+    def getEstado(self):
+        """
+        Devuelve una tupla con todo el estado mutable del sistema difuso para poder restaurarlo con `setEstado`.
+        Las variables, reglas y el modelo de inferencia no cambian durante la ejecucion y no se incluyen.
+        """
+        return (self.objetivoAlcanzado, self.segmentoObjetivo, self.velocidad_lineal_previa,
+                self.velocidad_angular_previa, self.medioAlcanzado, self.segmento,
+                self.posePrevia, self.fraccionCruce, self.fraccionCruceMedio,
+                self.sCamino, self.sPerfil, self.indiceObjetivo)
+
+    def setEstado(self, estado):
+        """
+        Restaura un estado obtenido con `getEstado`.
+        """
+        (self.objetivoAlcanzado, self.segmentoObjetivo, self.velocidad_lineal_previa,
+         self.velocidad_angular_previa, self.medioAlcanzado, self.segmento,
+         self.posePrevia, self.fraccionCruce, self.fraccionCruceMedio,
+         self.sCamino, self.sPerfil, self.indiceObjetivo) = estado
+
     def esObjetivoAlcanzado(self):
         """
         Devuelve si se ha alcanzado el objetivo.
@@ -0,0 +1,234 @@
+import os
+import math
+import hashlib
+import zipfile
+import numpy as np
+
+from fuzzyExpert import FuzzySystem
+from configuracion import ConfiguracionFuzzyTabla
+
+from fuzzy_expert.variable import FuzzyVariable
+from fuzzy_expert.rule import FuzzyRule
+
+DIRECTORIO_TABLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablasFuzzy") # Cache de tablas compiladas
+# Atributos de DecompositionalInference que cambian su resultado; el resto los rellena cada inferencia
+OPERADORES_INFERENCIA = ("and_operator", "or_operator", "implication_operator", "composition_operator",
+                         "production_link", "defuzzification_operator")
+
+
+def interpolarBilineal(tabla, minimos, pasos, x, y):
+    """
+    Interpola en una rejilla uniforme.
+
+    Parámetros:
+        tabla: Array (nx, ny) con los valores en los nodos
+        minimos: Coordenadas (x, y) del primer nodo
+        pasos: Separacion (dx, dy) entre nodos
+        x, y: Punto en el que se interpola; fuera de la rejilla se usa el borde
+
+    Retorna:
+        float: Valor interpolado
+    """
+    u = min(max((x - minimos[0]) / pasos[0], 0.0), tabla.shape[0] - 1.0)
+    v = min(max((y - minimos[1]) / pasos[1], 0.0), tabla.shape[1] - 1.0)
+    i = min(int(u), tabla.shape[0] - 2)
+    j = min(int(v), tabla.shape[1] - 2)
+    fu = u - i
+    fv = v - j
+    return ((1 - fu) * ((1 - fv) * tabla[i, j] + fv * tabla[i, j + 1])
+            + fu * ((1 - fv) * tabla[i + 1, j] + fv * tabla[i + 1, j + 1]))
+
+
+class FuzzyTablaSystem(FuzzySystem):
+    """
+    Sistema experto difuso con dos entradas: el error angular y la distancia lateral (con signo) al
+    tramo que se esta siguiendo.
+
+    Evaluar una base de reglas de dos entradas con DecompositionalInference en cada tick es demasiado
+    lento, asi que al crear el sistema se evalua una vez en una rejilla (error angular x distancia
+    lateral) y en cada tick solo se interpola bilinealmente en ella. Las tablas se guardan en
+    DIRECTORIO_TABLAS con un nombre que depende de las variables, las reglas y la rejilla, y se
+    vuelven a calcular si alguna de ellas cambia. La cota de error de la interpolacion se mide
+    comparando con la inferencia exacta en el centro de cada celda.
+
+    La distancia lateral solo se usa en los segmentos, que puntuan la cercania a la recta. En los
+    triangulos se consulta la tabla con distancia lateral 0, que equivale a las reglas del sistema base.
+    """
+
+    def __init__(self, config=None, directorioTablas=DIRECTORIO_TABLAS):
+        """
+        Inicializa el sistema difuso base, añade la distancia lateral y carga o compila las tablas.
+
+        Parámetros:
+            config: ConfiguracionFuzzyTabla con los parametros de ajuste; por defecto la de configuracion.py
+            directorioTablas: Directorio de la cache de tablas compiladas
+        """
+        super().__init__(config if config is not None else ConfiguracionFuzzyTabla())
+        self.directorioTablas = directorioTablas
+        for variables in (self.variables_normales, self.variables_triangulo):
+            variables["distancia_lateral"] = self.definir_variable_lateral()
+        self.reglas_laterales = self.definir_reglas_laterales(self.rules)
+        self.reglas_laterales_triangulo = self.definir_reglas_laterales(self.reglas_triangulo)
+
+        self.ejeError = np.linspace(-math.pi, math.pi, self.config.PUNTOS_ERROR)
+        self.ejeLateral = np.linspace(-self.config.DISTANCIA_LATERAL_MAX, self.config.DISTANCIA_LATERAL_MAX, self.config.PUNTOS_LATERAL)
+        self.minimos = (self.ejeError[0], self.ejeLateral[0])
+        self.pasos = (self.ejeError[1] - self.ejeError[0], self.ejeLateral[1] - self.ejeLateral[0])
+
+        self.tablaNormal, self.cotaNormal, estadoNormal = self.cargarTabla(self.variables_normales)
+        self.tablaTriangulo, self.cotaTriangulo, estadoTriangulo = self.cargarTabla(self.variables_triangulo)
+        # "cargada" de la cache, "nueva" si se ha compilado o "ilegible" si se ha recompilado porque la guardada no se podia leer
+        self.estadoTablas = {"normales": estadoNormal, "triangulo": estadoTriangulo}
+
+    def definir_variable_lateral(self):
+        """
+        Define la distancia lateral al tramo: positiva si el robot esta a la izquierda del tramo
+        (mirando de su inicio a su fin) y negativa si esta a la derecha.
+        """
+        d = self.config.DISTANCIA_LATERAL_MAX
+        return FuzzyVariable(
+            universe_range=(-d, d),
+            terms={
+                "Derecha": ('trimf', -d, -d, 0),
+                "Centro": ('trimf', -d/4, 0, d/4),
+                "Izquierda": ('trimf', 0, d, d),
+            },
+        )
+
+    def definir_reglas_laterales(self, reglasBase):
+        """
+        Define las reglas de dos entradas a partir de las reglas de una entrada `reglasBase` (las
+        definidas a mano o las aprendidas con aprendizajeFuzzy.py).
+
+        Explicación:
+            Con el robot centrado en el tramo las reglas son las del sistema base. Si esta desplazado a
+            un lado, la respuesta se corre un termino hacia el giro que lo devuelve al tramo: a la
+            izquierda del tramo se gira mas hacia la derecha (velocidad angular negativa) y al reves. La
+            correccion solo se aplica con el error angular Cero: con errores mayores el punto adelantado
+            ya esta devolviendo al robot al tramo y corregir mas le hace dar vueltas.
+        """
+        salidas = ["FuerteIzquierda", "Izquierda", "Recto", "Derecha", "FuerteDerecha"] # De W negativa a positiva
+        errores = ["NegativoGrande", "NegativoPequeno", "Cero", "PositivoPequeno", "PositivoGrande"]
+        desplazamientos = {"Izquierda": -1, "Centro": 0, "Derecha": 1}
+        consecuentes = {regla.premise[0][1]: regla.consequence[0][1] for regla in reglasBase}
+
+        rules = []
+        for error in errores:
+            base = salidas.index(consecuentes[error])
+            for lateral, desplazamiento in desplazamientos.items():
+                # Solo se corrige el desplazamiento cuando el robot ya va casi recto hacia el punto
+                # objetivo; con errores mayores se deja actuar a las reglas del sistema base
+                salida = salidas[min(max(base + desplazamiento, 0), len(salidas) - 1) if error == "Cero" else base]
+                rules.append(
+                    FuzzyRule(
+                        premise=[
+                            ("error_angular", error),
+                            ("AND", "distancia_lateral", lateral),
+                        ],
+                        consequence=[
+                            ("velocidad_angular", salida),
+                        ],
+                    )
+                )
+        return rules
+
+    def reglasLaterales(self, variables):
+        """
+        Reglas de dos entradas del tipo de segmento de `variables`.
+        """
+        return self.reglas_laterales_triangulo if variables is self.variables_triangulo else self.reglas_laterales
+
+    def inferenciaExacta(self, variables, error_angular, distancia_lateral):
+        """
+        Evalua la base de reglas con DecompositionalInference; solo se usa al compilar las tablas.
+        """
+        resultado, cf = self.modelo(
+            variables=variables,
+            rules=self.reglasLaterales(variables),
+            error_angular=error_angular,
+            distancia_lateral=distancia_lateral,
+        )
+        return resultado.get("velocidad_angular", 0)
+
+    def claveTabla(self, variables):
+        """
+        Resumen sha256 de todo lo que determina una tabla: funciones de pertenencia, reglas, operadores
+        de la inferencia y rejilla.
+        """
+        resumen = hashlib.sha256()
+        for nombre in sorted(variables):
+            variable = variables[nombre]
+            resumen.update(f"{nombre}{variable.universe_range}".encode())
+            for termino in sorted(variable.terms):
+                resumen.update(termino.encode())
+                resumen.update(np.asarray(variable.terms[termino], dtype=float).tobytes())
+        for regla in self.reglasLaterales(variables):
+            resumen.update(repr((regla.premise, regla.consequence)).encode())
+        resumen.update(repr([getattr(self.modelo, operador) for operador in OPERADORES_INFERENCIA]).encode())
+        resumen.update(repr((self.config.PUNTOS_ERROR, self.config.PUNTOS_LATERAL, self.config.DISTANCIA_LATERAL_MAX)).encode())
+        return resumen.hexdigest()[:16]
+
+    def compilarTabla(self, variables):
+        """
+        Evalua la base de reglas en los nodos de la rejilla y mide el mayor error de la interpolacion
+        en los centros de las celdas, que es donde la interpolacion bilineal se aleja mas de los nodos.
+
+        Retorna:
+            tuple: (tabla, cota de error en rad/s)
+        """
+        tabla = np.array([[self.inferenciaExacta(variables, e, d) for d in self.ejeLateral] for e in self.ejeError])
+        cota = 0.0
+        for e in (self.ejeError[:-1] + self.ejeError[1:]) / 2:
+            for d in (self.ejeLateral[:-1] + self.ejeLateral[1:]) / 2:
+                error = abs(interpolarBilineal(tabla, self.minimos, self.pasos, e, d) - self.inferenciaExacta(variables, e, d))
+                cota = max(cota, error)
+        return tabla, cota
+
+    def cargarTabla(self, variables):
+        """
+        Carga la tabla de `variables` de la cache o la compila y la guarda. Se escribe en un fichero
+        temporal y se renombra, de forma que otro proceso nunca lee una tabla a medias; si aun asi
+        el fichero no se puede leer (por ejemplo, lo dejo truncado una version anterior) se vuelve
+        a compilar. No escribe nada por pantalla: quien crea el sistema decide si avisar con el estado.
+
+        Retorna:
+            tuple: (tabla, cota de error en rad/s, estado: "cargada", "nueva" o "ilegible")
+        """
+        ruta = os.path.join(self.directorioTablas, f"tabla_{self.claveTabla(variables)}.npz")
+        try:
+            with np.load(ruta) as datos:
+                return datos["tabla"], float(datos["cota"]), "cargada"
+        except FileNotFoundError:
+            estado = "nueva"
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile): # Fichero corrupto o incompleto
+            estado = "ilegible"
+
+        tabla, cota = self.compilarTabla(variables)
+        os.makedirs(self.directorioTablas, exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as fichero:
+            np.savez(fichero, tabla=tabla, cota=cota)
+        os.replace(temporal, ruta)
+        return tabla, cota, estado
+
+    @staticmethod
+    def distanciaLateral(tramo, poseRobot):
+        """
+        Distancia con signo de la posicion del robot a la recta del tramo (positiva a la izquierda).
+        """
+        inicio, fin = tramo
+        dx, dy = fin[0] - inicio[0], fin[1] - inicio[1]
+        longitud = math.hypot(dx, dy)
+        if longitud == 0:
+            return 0.0
+        return (dx * (poseRobot[1] - inicio[1]) - dy * (poseRobot[0] - inicio[0])) / longitud
+
+    def inferirVelocidadAngular(self, error_angular, variables, poseRobot, tramo):
+        """
+        Sustituye la inferencia difusa por una interpolacion en la tabla del tipo de segmento actual.
+        En los triangulos no se corrige la distancia lateral al tramo: lo que puntua es no entrar en
+        el triangulo, y corregirla hace que el robot se pase del punto final.
+        """
+        if variables is self.variables_triangulo:
+            return interpolarBilineal(self.tablaTriangulo, self.minimos, self.pasos, error_angular, 0.0)
+        return interpolarBilineal(self.tablaNormal, self.minimos, self.pasos, error_angular, self.distanciaLateral(tramo, poseRobot))
@@ -0,0 +1,42 @@
+import math
+
+
+def cruceSegmentoCirculo(p0, p1, centro, radio):
+    """
+    Comprueba si el segmento recorrido entre `p0` y `p1` entra en el circulo de centro `centro` y radio `radio`.
+
+    Parámetros:
+        p0: Posicion (x, y) al inicio del paso
+        p1: Posicion (x, y) al final del paso
+        centro: Centro del circulo
+        radio: Radio del circulo (la tolerancia)
+
+    Retorna:
+        float: Fraccion del paso (entre 0 y 1) en la que el segmento entra en el circulo, o None si no lo toca.
+        Si `p0` ya esta dentro devuelve 0.
+
+    Explicación:
+        Se resuelve |p0 + t*(p1 - p0) - centro| = radio, una ecuacion de segundo grado en t, y se toma la
+        primera raiz. Asi un paso largo que atraviesa el circulo sin dejar ninguna de sus dos poses dentro
+        tambien cuenta como alcanzado.
+    """
+    fx = p0[0] - centro[0]
+    fy = p0[1] - centro[1]
+    c = fx * fx + fy * fy - radio * radio
+    if c <= 0:
+        return 0.0
+
+    dx = p1[0] - p0[0]
+    dy = p1[1] - p0[1]
+    a = dx * dx + dy * dy
+    if a == 0:
+        return None
+    b = 2 * (fx * dx + fy * dy)
+    discriminante = b * b - 4 * a * c
+    if discriminante < 0:
+        return None
+
+    t = (-b - math.sqrt(discriminante)) / (2 * a)
+    if 0 <= t <= 1:
+        return t
+    return None
@@ -1,175 +1,162 @@
 import pygame
 import time
-import numpy as np
 import sys
+import argparse
+import subprocess
 from robot import *
 from segmento import *
 from expertSystem import *
 from fuzzyExpert import *
+from fuzzyTabla import FuzzyTablaSystem
+from rolloutExpert import *
+from puntuacion import *
+from circuito import *
+from simulacion import *
+from simplificacion import *
+from supervisor import *
+from dibujo import *
+from camara import *
+from memoriaCompartida import *
+from caminoReferencia import CaminoReferencia
+from planificador import PerfilVelocidad
+from registro import configurarRegistro
+from telemetria import EmisorTelemetria, leerDireccion
+from obstaculos import MapaObstaculos
+from configuracion import *
 AppTitle = "RRDC P1 2024"
 
-RADIUS = 8 # Radio de dibujo para los puntos objetivo
+VELOCIDAD_MAXIMA = 128 # Multiplicador maximo de la velocidad de simulacion
 
 # Verificar argumentos de la línea de comandos
-if len(sys.argv) > 1 and sys.argv[1] == "fuzzy":
-    useFuzzySystem = True
-elif len(sys.argv) > 1 and sys.argv[1] == "expert":
-    useFuzzySystem = False
+parser = argparse.ArgumentParser(usage="./main.py [fuzzy|fuzzy-tabla|expert|rollout] [--velocidad K] [--exportar RUTA] [--presupuesto MS [--respaldo previo|expert]] [--camino] [--perfil] [--vueltas N] [--puntuacion-continua] [--obstaculos RUTA] [--visor-externo] [--telemetria [HOST:]PUERTO] [--logs [--muestreo-logs N] [--max-logs R]]")
+parser.add_argument("modo", choices=("fuzzy", "fuzzy-tabla", "expert", "rollout"))
+parser.add_argument("--velocidad", type=int, default=1,
+                    help="pasos de control y fisica por frame dibujado (se cambia en vivo con + y -)")
+parser.add_argument("--exportar", metavar="RUTA",
+                    help="guarda la trayectoria simplificada en un CSV al terminar el recorrido")
+parser.add_argument("--presupuesto", type=float, metavar="MS",
+                    help="tiempo maximo por decision; si se supera se usa la politica de respaldo")
+parser.add_argument("--respaldo", choices=("previo", "expert"), default="previo",
+                    help="politica de respaldo: repetir el comando anterior o usar el sistema experto simple")
+parser.add_argument("--camino", action="store_true",
+                    help="sigue un camino de referencia del circuito completo (no disponible con rollout)")
+parser.add_argument("--perfil", action="store_true",
+                    help="usa la velocidad y la anticipacion al giro planificadas para el circuito (solo con fuzzy)")
+parser.add_argument("--vueltas", type=int, default=1, metavar="N",
+                    help="vueltas al circuito (para pruebas largas sin ventana: python resistencia.py)")
+parser.add_argument("--puntuacion-continua", action="store_true",
+                    help="puntua integrando a lo largo del camino, igual con cualquier paso de simulacion")
+parser.add_argument("--obstaculos", metavar="RUTA",
+                    help="JSON con obstaculos estaticos con los que el robot puede chocar")
+parser.add_argument("--visor-externo", action="store_true",
+                    help="simula sin ventana y dibuja en un proceso aparte que lee de memoria compartida")
+parser.add_argument("--telemetria", type=leerDireccion, metavar="[HOST:]PUERTO",
+                    help="publica la telemetria de cada paso por UDP (se ve con python telemetria.py)")
+parser.add_argument("--logs", action="store_true",
+                    help="activa los logs en tiempo real (LOGS_TIEMPO_REAL), escritos desde un hilo de fondo")
+parser.add_argument("--muestreo-logs", type=int, default=1, metavar="N",
+                    help="registra solo uno de cada N ticks")
+parser.add_argument("--max-logs", type=float, metavar="R",
+                    help="maximo de registros por segundo")
+args = parser.parse_args()
+if args.camino and args.modo == "rollout":
+    parser.error("--camino no se puede usar con rollout")
+if args.perfil and args.modo != "fuzzy":
+    # Con expert y fuzzy-tabla el perfil puntua menos que sus factores ajustados a mano (ver readme.txt)
+    parser.error("--perfil solo se puede usar con fuzzy")
+if args.muestreo_logs < 1:
+    parser.error("--muestreo-logs tiene que ser al menos 1")
+if args.max_logs is not None and args.max_logs <= 0:
+    parser.error("--max-logs tiene que ser positivo")
+modo = args.modo
+velocidad = min(max(args.velocidad, 1), VELOCIDAD_MAXIMA)
+
+objectiveSet = crearCircuito()
+
+if modo == "fuzzy":
+    experto = FuzzySystem(ConfiguracionFuzzy(LOGS_TIEMPO_REAL=args.logs))
+elif modo == "fuzzy-tabla":
+    experto = FuzzyTablaSystem(ConfiguracionFuzzyTabla(LOGS_TIEMPO_REAL=args.logs))
+    for tipo, cota in (("normales", experto.cotaNormal), ("triangulo", experto.cotaTriangulo)):
+        if experto.estadoTablas[tipo] != "cargada":
+            ilegible = " (la guardada estaba ilegible)" if experto.estadoTablas[tipo] == "ilegible" else ""
+            print(f"Tabla difusa de {tipo} compilada{ilegible}, error maximo de interpolacion {cota:.4f} rad/s")
+elif modo == "rollout":
+    experto = RolloutSystem(ConfiguracionRollout(LOGS_TIEMPO_REAL=args.logs))
 else:
-    print("Uso: ./main.py [fuzzy|expert]")
-    sys.exit(1)
+    experto = ExpertSystem(ConfiguracionExperto(LOGS_TIEMPO_REAL=args.logs))
+if args.camino or args.perfil:
+    camino = CaminoReferencia(objectiveSet, experto.puntoTriangulo)
+if args.camino:
+    experto.setCamino(camino)
+if args.perfil:
+    perfil = PerfilVelocidad(camino)
+    if perfil.estado == "ilegible":
+        print("El perfil de velocidad guardado estaba ilegible, se ha vuelto a planificar")
+    experto.setPerfil(perfil)
+if args.logs:
+    configurarRegistro(muestreo=args.muestreo_logs, maxPorSegundo=args.max_logs)
+if args.presupuesto is not None:
+    experto = SupervisorTiempoReal(experto, ExpertSystem() if args.respaldo == "expert" else None, args.presupuesto)
+
+telemetria = EmisorTelemetria(args.telemetria) if args.telemetria is not None else None
+simulacion = Simulacion(experto, objectiveSet, POSE_INICIAL, telemetria, vueltas=max(args.vueltas, 1),
+                        puntuacionContinua=args.puntuacion_continua)
+miRobot = simulacion.robot
+mapa = MapaObstaculos.cargar(args.obstaculos) if args.obstaculos else None
+miRobot.setMapa(mapa)
+simplificador = SimplificadorTrayectoria()
+
+def imprimirResultados():
+    if len(simulacion.vueltasCompletadas) > 1:
+        for numero, (puntuacion, tiempo) in enumerate(simulacion.vueltasCompletadas, start=1):
+            print(f'Vuelta {numero}: {puntuacion} puntos en {tiempo:.2f} segundos')
+    print(f'Puntuación total: {simulacion.totalScore}')
+    if args.presupuesto is not None:
+        resumen = experto.resumen()
+        print(f'Degradaciones: {resumen["degradaciones"]} ({resumen["ticksDegradados"]} de {resumen["ticks"]} ticks con respaldo), '
+              f'latencia media: {resumen["latenciaMediaMs"]:.2f} ms de {resumen["presupuestoMs"]:.2f} ms')
+    if args.exportar:
+        simplificador.exportar(args.exportar, objectiveSet)
+    if mapa is not None:
+        print(f'Colisiones: {miRobot.colisiones}')
+    if telemetria is not None:
+        telemetria.cerrar()
+        print(f'Telemetria: {telemetria.enviados} registros enviados, {telemetria.descartados} descartados')
+
+if args.visor_externo:
+    # La simulacion escribe cada paso en memoria compartida y el dibujado va en otro proceso,
+    # asi que su coste no frena la simulacion. Se puede conectar otro visor con el mismo nombre.
+    buffer = BufferPoses.crear(objectiveSet)
+    visor = subprocess.Popen([sys.executable, "visor.py", buffer.nombre])
+    print(f'Memoria compartida: {buffer.nombre} (otro visor: python visor.py {buffer.nombre})')
+    inicio = time.perf_counter()
+    while not simulacion.terminado:
+        segmentScore = simulacion.paso(PASO_NOMINAL)
+        simplificador.agregar(simulacion.trayectoriaTotal[-1])
+        buffer.escribir(miRobot.getPose(), simulacion.numPath, simulacion.tiempoSimulado)
+        if segmentScore is not None:
+            print(f'Puntuación del objetivo: {segmentScore[0]}. Puntuación de distancia: {segmentScore[1]} en {segmentScore[2]} segundos')
+        # Se mantiene el ritmo del reloj simulado (multiplicado por la velocidad)
+        espera = inicio + simulacion.tiempoSimulado / velocidad - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+    buffer.marcarTerminado()
+    imprimirResultados()
+    visor.wait()
+    buffer.cerrar()
+    sys.exit(0)
 
 # pygame setup
 pygame.init()
-sizeY = 720 #Necesario para adaptar las coordenadas del entorno a las de la pantalla de pygame
-screen = pygame.display.set_mode((1024, sizeY))
+screen = pygame.display.set_mode(SIZE)
 clock = pygame.time.Clock()
 running = True
 programQuit = False
 
-robotIimage = pygame.image.load('robot1.png').convert_alpha();
-
-def drawRobot(pose):
-    #from Aleksandar haber
-    # over here we rotate an image and create a copy of the rotated image 
-    image1 = pygame.transform.rotate(robotIimage, pose[2])
-    # then we return a rectangle corresponding to the rotated copy
-    # the rectangle center is specified as an argument
-    image1_rect = image1.get_rect(center=(10.0*pose[0], sizeY - 10.0*pose[1]))
-    # then we plot the rotated image copy with boundaries specified by 
-    # the rectangle
-    screen.blit(image1, image1_rect)
-
-def drawObjective(objetivo, activo=True):
-    pInicio = (objetivo.getInicio()[0]*10.0, sizeY-objetivo.getInicio()[1]*10.0)
-    pFin = (objetivo.getFin()[0]*10.0, sizeY-objetivo.getFin()[1]*10.0)
-    if activo is True:
-        colorInicio = "green"
-        colorFin = "red"
-        colorLinea = "darkgray"
-        radio = RADIUS
-    else:
-        colorInicio = "lightgray"
-        colorFin = "darkgray"
-        colorLinea = "gray"
-        radio = RADIUS * 0.8
-    if objetivo.getType() == 1:
-        pygame.draw.line(screen, colorLinea, pInicio, pFin, 5)
-    else:
-        pMedio = (objetivo.getMedio()[0]*10.0, sizeY-objetivo.getMedio()[1]*10.0)
-        pygame.draw.polygon(screen, colorLinea, [pInicio, pFin, pMedio])
-        pygame.draw.circle(screen, colorFin, pMedio, RADIUS)
-    pygame.draw.circle(screen, colorInicio, pInicio, radio)
-    pygame.draw.circle(screen, colorFin, pFin, radio)
-
-def straightToPointDistance(p1, p2, p3):
-    m1 = p2[1]-p1[1]
-    m2 = p2[0]-p1[0]
-    return m1*p3[0] - m2*p3[1] - p1[0]*m1 + p1[1]*m2
-
-def straightToPointDistanceNorm(p1, p2, p3):
-    m1 = p2[1]-p1[1]
-    m2 = p2[0]-p1[0]
-    norm = math.sqrt(m1*m1+m2*m2)
-    return (m1*p3[0] - m2*p3[1] - p1[0]*m1 + p1[1]*m2)/norm
-
-def inTriangle(triangulo, punto):
-    inicio = np.array(triangulo.getInicio())
-    medio = np.array(triangulo.getMedio())
-    fin = np.array(triangulo.getFin())
-
-    d1 =straightToPointDistance(inicio, medio, np.array(punto))
-    d2 =straightToPointDistance(medio, fin, np.array(punto))
-    d3 =straightToPointDistance(fin, inicio, np.array(punto))
-
-    tieneNegativo =  d1<0 or d2<0 or d3<0
-    tienePositivo = d1>0 or d2>0 or d3>0
-
-    return not(tieneNegativo and tienePositivo)
-
-    
-
-def getSegmentScore(segmento, posiciones, tiempo=1):
-    inicio = np.array(segmento.getInicio())
-    fin = np.array(segmento.getFin())
-    score = 0
-    for pos in posiciones:
-        dist = np.abs(straightToPointDistanceNorm(inicio, fin, np.array(pos[0:2])))
-        if dist<3:
-            if dist < 0.01:
-                score += 100
-            else:
-                score += 1 / dist
-    return (score/((1+tiempo)*(1+tiempo)*(1+tiempo)), score, tiempo)
-
-def getTriangleScore(triangulo, posiciones, tiempo=1):
-    inicio = np.array(triangulo.getInicio())
-    medio = np.array(triangulo.getMedio())
-    fin = np.array(triangulo.getFin())
-    score = 500
-    penalizacion = 0
-    factor = -1
-    altura = np.abs(straightToPointDistanceNorm(inicio, fin, medio))
-    for pos in posiciones:
-        if inTriangle(triangulo, pos[0:2]):
-            penalizacion += 1
-        m1 = medio[0]-pos[0]
-        m2 = medio[1]-pos[1]
-        norm = math.sqrt(m1*m1+m2*m2)
-        if factor<1 and norm<altura:
-            factor = 1
-    score = (score-penalizacion)*factor
-    return (score/((1+tiempo)*(1+tiempo)), score, tiempo)
-
-miRobot = Robot()
-
-objectiveSet = []
-segmento = Objetivo()
-segmento.setInicio((12, 34))
-segmento.setFin((85,62))
-objectiveSet.append(segmento)
-triangulo = Objetivo()
-triangulo.setInicio((85, 62)) #(95, 62))
-triangulo.setFin((98, 55))
-triangulo.setMedio((96, 64))
-objectiveSet.append(triangulo)
-segmento = Objetivo()
-segmento.setInicio((98, 55))
-segmento.setFin((70,15))
-objectiveSet.append(segmento)
-triangulo = Objetivo()
-triangulo.setInicio((70, 15)) #(95, 62))
-triangulo.setFin((55, 7))
-triangulo.setMedio((62, 7))
-objectiveSet.append(triangulo)
-segmento = Objetivo()
-segmento.setInicio((55, 7))
-segmento.setFin((15, 20))
-objectiveSet.append(segmento)
-triangulo = Objetivo()
-triangulo.setInicio((15, 20)) #(95, 62))
-triangulo.setFin((12, 34))
-triangulo.setMedio((8, 26))
-objectiveSet.append(triangulo)
-
-numPath = 0
-
-if useFuzzySystem:
-    experto = FuzzySystem()
-else:
-    experto = ExpertSystem()
-experto.setObjetivo(objectiveSet[numPath])
-optativo = experto.hayParteOptativa()
-
-miRobot.setPose((1,10,-10))
-
-elapsedTime = 0
-tinicio = time.time()
-trayectoria = []
-trayectoriaTotal = []
-poseActual = ()
-segmentScore = ()
-totalScore = 0
+robotIimage = cargarImagenRobot()
+camara = Camara(SIZE)
+indiceObjetivos = crearIndiceObjetivos(objectiveSet)
 
 timePerFrame = []
 
@@ -181,50 +168,49 @@ while running:
         if event.type == pygame.QUIT:
             running = False
             programQuit = True
+        elif camara.procesarEvento(event):
+            pass
+        elif event.type == pygame.KEYDOWN:
+            # + y - duplican o dividen a la mitad los pasos simulados por frame
+            if event.key in (pygame.K_PLUS, pygame.K_KP_PLUS, pygame.K_EQUALS):
+                velocidad = min(velocidad * 2, VELOCIDAD_MAXIMA)
+            elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                velocidad = max(velocidad // 2, 1)
+    pygame.display.set_caption(f"{AppTitle} - x{velocidad}")
 
     # fill the screen with a color to wipe away anything from last frame
+    inicioDibujo = time.perf_counter()
     screen.fill("blue")
 
     # RENDER YOUR GAME HERE
-    for trajCont in range(len(objectiveSet)):
-        path = objectiveSet[trajCont]
-        drawObjective(path, trajCont==numPath)
-    poseActual = miRobot.getPose()
-    drawRobot(poseActual)
-    trayectoria.append(poseActual)
-    trayectoriaTotal.append(poseActual)
-
-    timeLapse = clock.tick(60)  
-    miRobot.updateDynamics(timeLapse)
+    # Solo se dibujan los objetivos que caen dentro de la vista de la camara
+    camara.actualizar(miRobot.getPose())
+    drawObjectives(screen, objectiveSet, indiceObjetivos, simulacion.numPath, camara)
+    if mapa is not None:
+        drawObstaculos(screen, mapa, camara)
+    drawRobot(screen, robotIimage, miRobot.getPose(), camara)
+    if telemetria is not None:
+        telemetria.setTiempoDibujo((time.perf_counter() - inicioDibujo) * 1000.0)
+
+    timeLapse = clock.tick(60)
     timePerFrame.append(timeLapse)
-    if experto.esObjetivoAlcanzado():
-        elapsedTime = time.time() - tinicio
-        if numPath>=len(objectiveSet):
-            miRobot.setVel((0,0))
-            running = False
-        else:
-            if objectiveSet[numPath].getType()==1:
-                segmentScore = getSegmentScore(objectiveSet[numPath], trayectoria, elapsedTime)
-            else:
-                segmentScore = getTriangleScore(objectiveSet[numPath], trayectoria, elapsedTime)
-            trayectoria.clear()
-            totalScore += segmentScore[0]
+    # A x1 se simula el tiempo real transcurrido; acelerado, cada frame dibujado avanza
+    # `velocidad` pasos de 1/60 s y solo se dibuja el ultimo
+    pasos = [timeLapse] if velocidad == 1 else [PASO_NOMINAL] * velocidad
+    for paso in pasos:
+        segmentScore = simulacion.paso(paso)
+        simplificador.agregar(simulacion.trayectoriaTotal[-1])
+        if segmentScore is not None:
             print(f'Puntuación del objetivo: {segmentScore[0]}. Puntuación de distancia: {segmentScore[1]} en {segmentScore[2]} segundos')
-            tinicio = time.time()
-            numPath += 1
-            if numPath<len(objectiveSet) and objectiveSet[numPath].getType()==2 and not optativo:
-                numPath += 1
-            if numPath<len(objectiveSet):
-                experto.setObjetivo(objectiveSet[numPath])
-
-    else:
-        velocidades = experto.tomarDecision(miRobot.getPose())
-        miRobot.setVel(velocidades)
+        if simulacion.terminado:
+            running = False
+            break
     # flip() the display to put your work on screen
     pygame.display.flip()
 
 
-print(f'Puntuación total: {totalScore}')
+trayectoriaTotal = simulacion.trayectoriaTotal
+imprimirResultados()
 
 trajCont = 1
 while not programQuit:
@@ -233,26 +219,24 @@ while not programQuit:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             programQuit = True
+        else:
+            camara.procesarEvento(event)
 
     # fill the screen with a color to wipe away anything from last frame
     screen.fill("blue")
-    for cont in range(len(objectiveSet)):
-        path = objectiveSet[cont]
-        drawObjective(path, False)
     poseActual = miRobot.getPose()
-    drawRobot(poseActual)
+    camara.actualizar(poseActual)
+    drawObjectives(screen, objectiveSet, indiceObjetivos, None, camara)
+    if mapa is not None:
+        drawObstaculos(screen, mapa, camara)
+    drawRobot(screen, robotIimage, poseActual, camara)
 
+    # Se dibuja la trayectoria simplificada (error maximo TOLERANCIA_TRAYECTORIA) con una sola llamada
     if trajCont < len(trayectoriaTotal):
-        for cont in range(1, trajCont):
-            p1 = (trayectoriaTotal[cont-1][0]*10, sizeY-trayectoriaTotal[cont-1][1]*10)
-            p2 = (trayectoriaTotal[cont][0]*10, sizeY-trayectoriaTotal[cont][1]*10)
-            pygame.draw.line(screen, "red", p1, p2, 2)
+        drawTrayectoria(screen, simplificador.getPuntos(trajCont) + [trayectoriaTotal[trajCont-1]], camara)
         trajCont += 2
     else:
-        for cont in range(1, len(trayectoriaTotal)):
-            p1 = (trayectoriaTotal[cont-1][0]*10, sizeY-trayectoriaTotal[cont-1][1]*10)
-            p2 = (trayectoriaTotal[cont][0]*10, sizeY-trayectoriaTotal[cont][1]*10)
-            pygame.draw.line(screen, "red", p1, p2, 2)
+        drawTrayectoria(screen, simplificador.getPuntos(), camara)
     pygame.display.flip()
 
     timeLapse = clock.tick(60)  
@@ -0,0 +1,118 @@
+import os
+import sys
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+from segmento import Objetivo
+
+CAPACIDAD_POSES = 1024 # Registros del buffer circular
+CAMPOS_CABECERA = 4 # contador de escrituras, capacidad, numero de objetivos, terminado
+CAMPOS_OBJETIVO = 7 # tipo, inicio (x, y), fin (x, y), medio (x, y)
+CAMPOS_REGISTRO = 6 # secuencia, x, y, heading, numPath, tiempo simulado
+
+class BufferPoses:
+    """
+    Buffer circular en memoria compartida con las poses del robot y el objetivo activo.
+
+    El proceso de simulacion lo crea y escribe un registro por paso; cualquier otro proceso (por
+    ejemplo el visor) se conecta con el nombre del bloque y lee el ultimo registro sin copiar ni
+    serializar nada mas que esos pocos numeros. Al crearlo tambien se guarda la geometria del
+    circuito, de forma que un lector no necesita nada mas que el nombre para dibujarlo.
+
+    Hay un solo escritor. Cada registro lleva su numero de secuencia y el contador de la cabecera
+    se incrementa despues de escribir el registro; el lector comprueba que la secuencia del registro
+    coincide con el contador para descartar registros que se estan sobrescribiendo.
+    """
+
+    def __init__(self, memoria, creador):
+        self.memoria = memoria
+        self.creador = creador
+        self.nombre = memoria.name
+        self.cabecera = np.ndarray((CAMPOS_CABECERA,), dtype=np.int64, buffer=memoria.buf)
+        capacidad, numObjetivos = int(self.cabecera[1]), int(self.cabecera[2])
+        desplazamiento = self.cabecera.nbytes
+        self.objetivos = np.ndarray((numObjetivos, CAMPOS_OBJETIVO), dtype=np.float64,
+                                    buffer=memoria.buf, offset=desplazamiento)
+        desplazamiento += self.objetivos.nbytes
+        self.registros = np.ndarray((capacidad, CAMPOS_REGISTRO), dtype=np.float64,
+                                    buffer=memoria.buf, offset=desplazamiento)
+
+    @classmethod
+    def crear(cls, objectiveSet, capacidad=CAPACIDAD_POSES, nombre=None):
+        """
+        Crea el bloque de memoria compartida (lo usa el proceso de simulacion).
+        """
+        tamano = 8 * (CAMPOS_CABECERA + len(objectiveSet) * CAMPOS_OBJETIVO + capacidad * CAMPOS_REGISTRO)
+        memoria = shared_memory.SharedMemory(name=nombre, create=True, size=tamano)
+        cabecera = np.ndarray((CAMPOS_CABECERA,), dtype=np.int64, buffer=memoria.buf)
+        cabecera[:] = (0, capacidad, len(objectiveSet), 0)
+        buffer = cls(memoria, True)
+        for i, objetivo in enumerate(objectiveSet):
+            buffer.objetivos[i] = (objetivo.getType(), *objetivo.getInicio(), *objetivo.getFin(), *objetivo.getMedio())
+        return buffer
+
+    @classmethod
+    def conectar(cls, nombre):
+        """
+        Se conecta a un bloque ya creado (lo usa el visor).
+        """
+        # El lector no es el dueño del bloque: si el resource_tracker lo registra, lo borraria al salir el visor
+        if sys.version_info >= (3, 13):
+            memoria = shared_memory.SharedMemory(name=nombre, track=False)
+        else:
+            memoria = shared_memory.SharedMemory(name=nombre)
+            if os.name == "posix": # Solo se registra en POSIX, con el nombre con la barra inicial de shm_open
+                resource_tracker.unregister("/" + memoria.name, "shared_memory")
+        return cls(memoria, False)
+
+    def escribir(self, pose, numPath, tiempo):
+        """
+        Escribe un registro con la pose (x, y, heading), el indice del objetivo activo y el tiempo simulado.
+        """
+        contador = int(self.cabecera[0])
+        self.registros[contador % len(self.registros)] = (contador + 1, pose[0], pose[1], pose[2], numPath, tiempo)
+        self.cabecera[0] = contador + 1
+
+    def leerUltimo(self):
+        """
+        Devuelve el ultimo registro escrito como (x, y, heading, numPath, tiempo), o None si todavia no hay ninguno.
+        """
+        while True:
+            contador = int(self.cabecera[0])
+            if contador == 0:
+                return None
+            registro = self.registros[(contador - 1) % len(self.registros)].copy()
+            # Si durante la copia el escritor ha dado la vuelta al buffer el registro puede estar a medias.
+            # El hueco se empieza a sobrescribir con la cabecera en contador - 1 + N (se incrementa despues
+            # de escribir), asi que la copia solo es valida si la cabecera no ha llegado a ese valor
+            if int(registro[0]) == contador and int(self.cabecera[0]) - contador < len(self.registros) - 1:
+                return (registro[1], registro[2], registro[3], int(registro[4]), registro[5])
+
+    def getObjetivos(self):
+        """
+        Reconstruye la lista de objetivos del circuito guardada en el bloque.
+        """
+        objectiveSet = []
+        for tipo, xi, yi, xf, yf, xm, ym in self.objetivos:
+            objetivo = Objetivo()
+            objetivo.setInicio((xi, yi))
+            objetivo.setFin((xf, yf))
+            if int(tipo) == 2:
+                objetivo.setMedio((xm, ym))
+            objectiveSet.append(objetivo)
+        return objectiveSet
+
+    def marcarTerminado(self):
+        self.cabecera[3] = 1
+
+    def estaTerminado(self):
+        return bool(self.cabecera[3])
+
+    def cerrar(self):
+        """
+        Libera las vistas y el bloque; si es el proceso que lo creo, tambien lo borra.
+        """
+        del self.cabecera, self.objetivos, self.registros
+        self.memoria.close()
+        if self.creador:
+            self.memoria.unlink()
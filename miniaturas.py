@@ -0,0 +1,259 @@
+import os
+import math
+import argparse
+import numpy as np
+from multiprocessing import Pool
+
+from circuito import crearCircuito, cargarCircuito, POSE_INICIAL
+from puntuacion import inTriangleVectorizado
+from simulacion import Simulacion, PASO_NOMINAL
+from simplificacion import SimplificadorTrayectoria, rutaCircuito
+from expertSystem import ExpertSystem
+from fuzzyExpert import FuzzySystem
+from fuzzyTabla import FuzzyTablaSystem
+from rolloutExpert import RolloutSystem
+
+MUNDO = (102.4, 72.0) # Zona del mundo que se dibuja (m), la misma que se ve en la ventana de main.py
+ANCHO_MINIATURA = 256 # Ancho en pixeles de cada miniatura; el alto mantiene la proporcion de MUNDO
+COLUMNAS_HOJA = 8 # Miniaturas por fila en la hoja de contactos
+SEPARACION_HOJA = 4 # Pixeles entre miniaturas en la hoja de contactos
+
+COLOR_FONDO = (0, 0, 255)
+COLOR_SEGMENTO = (190, 190, 190)
+COLOR_TRIANGULO = (169, 169, 169)
+COLOR_INICIO = (0, 255, 0)
+COLOR_FIN = (255, 0, 0)
+COLOR_TRAYECTORIA = (255, 0, 0)
+
+SISTEMAS = {"expert": ExpertSystem, "fuzzy": FuzzySystem, "fuzzy-tabla": FuzzyTablaSystem, "rollout": RolloutSystem}
+
+
+def aPixeles(puntos, escala, alto):
+    """
+    Convierte un array (n, 2) de puntos del mundo a coordenadas (columna, fila) de la imagen.
+    """
+    puntos = np.asarray(puntos, dtype=float).reshape(-1, 2)
+    return puntos[:, 0] * escala, alto - puntos[:, 1] * escala
+
+def pintar(imagen, columnas, filas, color, grosor=1):
+    """
+    Pinta los pixeles (columnas, filas), cada uno ampliado a un cuadrado de lado `grosor`.
+    Los que quedan fuera de la imagen se descartan.
+    """
+    alto, ancho = imagen.shape[0:2]
+    columnas = np.round(columnas).astype(int)
+    filas = np.round(filas).astype(int)
+    dc, df = np.meshgrid(np.arange(grosor) - grosor // 2, np.arange(grosor) - grosor // 2)
+    columnas = (columnas[:, None] + dc.ravel()[None, :]).ravel()
+    filas = (filas[:, None] + df.ravel()[None, :]).ravel()
+    dentro = (columnas >= 0) & (columnas < ancho) & (filas >= 0) & (filas < alto)
+    imagen[filas[dentro], columnas[dentro]] = color
+
+def dibujarPolilinea(imagen, puntos, escala, color, grosor=1):
+    """
+    Rasteriza una polilinea muestreando cada tramo cada medio pixel, todos los tramos a la vez.
+    """
+    x, y = aPixeles(puntos, escala, imagen.shape[0])
+    if len(x) < 2:
+        pintar(imagen, x, y, color, grosor)
+        return
+    longitudes = np.hypot(np.diff(x), np.diff(y))
+    muestras = np.ceil(longitudes * 2).astype(int) + 1
+    tramo = np.repeat(np.arange(len(longitudes)), muestras)
+    # Fraccion de cada muestra dentro de su tramo, de 0 a 1
+    fraccion = (np.arange(muestras.sum()) - np.repeat(np.cumsum(muestras) - muestras, muestras)) / np.repeat(np.maximum(muestras - 1, 1), muestras)
+    pintar(imagen, x[tramo] + fraccion * (x[tramo + 1] - x[tramo]), y[tramo] + fraccion * (y[tramo + 1] - y[tramo]), color, grosor)
+
+def dibujarCirculo(imagen, centro, escala, radio, color):
+    """
+    Rellena un circulo de `radio` pixeles centrado en el punto `centro` del mundo.
+    """
+    x, y = aPixeles(centro, escala, imagen.shape[0])
+    r = int(math.ceil(radio))
+    dx, dy = np.meshgrid(np.arange(-r, r + 1), np.arange(-r, r + 1))
+    dentro = dx * dx + dy * dy <= radio * radio
+    pintar(imagen, x[0] + dx[dentro], y[0] + dy[dentro], color)
+
+def dibujarTriangulo(imagen, objetivo, escala, color):
+    """
+    Rellena el triangulo de un objetivo probando todos los pixeles de su caja envolvente a la vez.
+    """
+    vertices = np.array([objetivo.getInicio(), objetivo.getMedio(), objetivo.getFin()], dtype=float)
+    columnas, filas = aPixeles(vertices, escala, imagen.shape[0])
+    c0, c1 = max(int(columnas.min()), 0), min(int(columnas.max()) + 1, imagen.shape[1])
+    f0, f1 = max(int(filas.min()), 0), min(int(filas.max()) + 1, imagen.shape[0])
+    if c0 >= c1 or f0 >= f1:
+        return
+    cs, fs = np.meshgrid(np.arange(c0, c1), np.arange(f0, f1))
+    # Se prueba el centro de cada pixel en coordenadas del mundo
+    x = (cs + 0.5) / escala
+    y = (imagen.shape[0] - fs - 0.5) / escala
+    dentro = inTriangleVectorizado(vertices[0], vertices[1], vertices[2], x, y)
+    imagen[fs[dentro], cs[dentro]] = color
+
+def rasterizar(objectiveSet, puntos, ancho=ANCHO_MINIATURA):
+    """
+    Dibuja el circuito y una trayectoria en una imagen RGB sin abrir ninguna ventana.
+
+    Parámetros:
+        objectiveSet: Lista de objetivos del circuito
+        puntos: Puntos (x, y, ...) de la trayectoria
+        ancho: Ancho de la imagen en pixeles
+
+    Retorna:
+        np.array: Imagen (alto, ancho, 3) de tipo uint8
+    """
+    escala = ancho / MUNDO[0]
+    alto = int(round(MUNDO[1] * escala))
+    imagen = np.empty((alto, ancho, 3), dtype=np.uint8)
+    imagen[:] = COLOR_FONDO
+    radio = max(ancho / 256, 1.0)
+
+    for objetivo in objectiveSet:
+        if objetivo.getType() == 2:
+            dibujarTriangulo(imagen, objetivo, escala, COLOR_TRIANGULO)
+        else:
+            dibujarPolilinea(imagen, [objetivo.getInicio(), objetivo.getFin()], escala, COLOR_SEGMENTO, max(int(radio), 1))
+    for objetivo in objectiveSet:
+        dibujarCirculo(imagen, objetivo.getInicio(), escala, radio, COLOR_INICIO)
+        dibujarCirculo(imagen, objetivo.getFin(), escala, radio, COLOR_FIN)
+
+    puntos = [(p[0], p[1]) for p in puntos]
+    if puntos:
+        dibujarPolilinea(imagen, puntos, escala, COLOR_TRAYECTORIA)
+    return imagen
+
+def leerTrayectoria(ruta):
+    """
+    Lee los puntos de un CSV exportado con `main.py --exportar` (columnas indice, x, y).
+    """
+    datos = np.loadtxt(ruta, delimiter=",", skiprows=1, ndmin=2)
+    return datos[:, 1:3]
+
+def guardarPNG(imagen, ruta):
+    """
+    Guarda una imagen RGB con pygame, que no necesita ninguna ventana para esto.
+    """
+    import pygame
+    pygame.image.save(pygame.surfarray.make_surface(imagen.swapaxes(0, 1)), ruta)
+
+def leerCircuito(rutaTrayectoria, rutaCircuitoComun=None):
+    """
+    Circuito con el que se dibuja una trayectoria: el de `rutaCircuitoComun` si se indica, si no el que
+    se exporto junto a la trayectoria y, para los CSV antiguos que no lo tienen, el de circuito.py.
+    """
+    if rutaCircuitoComun is not None:
+        return cargarCircuito(rutaCircuitoComun)
+    if os.path.exists(rutaCircuito(rutaTrayectoria)):
+        return cargarCircuito(rutaCircuito(rutaTrayectoria))
+    return crearCircuito()
+
+def exportarSimulacion(experto, ruta, objectiveSet=None, poseInicial=POSE_INICIAL, timeLapse=PASO_NOMINAL, tiempoMaximo=600):
+    """
+    Simula sin ventana, como `Simulacion.ejecutar`, y exporta la trayectoria simplificada a un CSV
+    igual que `main.py --exportar`, con el circuito al lado.
+
+    Parámetros:
+        experto: Sistema experto que conduce el robot
+        ruta: CSV de salida
+        objectiveSet: Circuito; por defecto el de circuito.py
+        poseInicial: Pose inicial del robot
+        timeLapse: Paso de simulacion (ms)
+        tiempoMaximo: Segundos simulados como maximo
+
+    Retorna:
+        Simulacion: La simulacion ejecutada, para consultar su puntuacion
+    """
+    if objectiveSet is None:
+        objectiveSet = crearCircuito()
+    # La trayectoria se va pasando al simplificador, asi que la simulacion no necesita guardarla entera
+    simulacion = Simulacion(experto, objectiveSet, poseInicial, maxTrayectoria=1)
+    simplificador = SimplificadorTrayectoria()
+    while not simulacion.terminado and simulacion.tiempoSimulado < tiempoMaximo:
+        simulacion.paso(timeLapse)
+        simplificador.agregar(simulacion.trayectoriaTotal[-1])
+    simplificador.exportar(ruta, objectiveSet)
+    return simulacion
+
+def simularModo(argumentos):
+    """
+    Trabajo de cada proceso: simula el sistema `modo` con su configuracion por defecto y exporta su
+    trayectoria a `ruta`.
+
+    Retorna:
+        float: La puntuacion total
+    """
+    modo, ruta = argumentos
+    return exportarSimulacion(SISTEMAS[modo](), ruta).totalScore
+
+def miniaturaDeFichero(argumentos):
+    """
+    Trabajo de cada proceso: rasteriza la trayectoria de un CSV y, si se indica un directorio de
+    salida, la guarda como PNG con el mismo nombre.
+    """
+    ruta, ancho, directorioSalida, rutaCircuitoComun = argumentos
+    imagen = rasterizar(leerCircuito(ruta, rutaCircuitoComun), leerTrayectoria(ruta), ancho)
+    if directorioSalida is not None:
+        nombre = os.path.splitext(os.path.basename(ruta))[0] + ".png"
+        guardarPNG(imagen, os.path.join(directorioSalida, nombre))
+    return imagen
+
+def hojaDeContactos(imagenes, columnas=COLUMNAS_HOJA, separacion=SEPARACION_HOJA):
+    """
+    Junta imagenes del mismo tamaño en una rejilla de `columnas` columnas, por filas y en orden.
+    """
+    alto, ancho = imagenes[0].shape[0:2]
+    filas = math.ceil(len(imagenes) / columnas)
+    hoja = np.zeros((filas * (alto + separacion) + separacion, min(columnas, len(imagenes)) * (ancho + separacion) + separacion, 3),
+                    dtype=np.uint8)
+    for numero, imagen in enumerate(imagenes):
+        fila, columna = divmod(numero, columnas)
+        y = separacion + fila * (alto + separacion)
+        x = separacion + columna * (ancho + separacion)
+        hoja[y:y + alto, x:x + ancho] = imagen
+    return hoja
+
+def generarMiniaturas(rutas, directorioSalida=None, rutaHoja=None, ancho=ANCHO_MINIATURA, procesos=None, rutaCircuitoComun=None):
+    """
+    Rasteriza en paralelo las trayectorias de `rutas` y guarda un PNG por trayectoria en
+    `directorioSalida` y/o una hoja de contactos en `rutaHoja` (en el orden de `rutas`). Cada una se
+    dibuja sobre su circuito (ver `leerCircuito`).
+    """
+    if directorioSalida is not None:
+        os.makedirs(directorioSalida, exist_ok=True)
+    with Pool(procesos) as pool:
+        imagenes = pool.map(miniaturaDeFichero, [(ruta, ancho, directorioSalida, rutaCircuitoComun) for ruta in rutas])
+    if rutaHoja is not None and imagenes:
+        guardarPNG(hojaDeContactos(imagenes), rutaHoja)
+    return imagenes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="./miniaturas.py [TRAYECTORIA.csv...] [--simular MODO... [--trayectorias DIR]] [--circuito RUTA] [--salida DIR] [--hoja RUTA] [--ancho PX] [--procesos N]")
+    parser.add_argument("rutas", nargs="*", help="CSV exportados con main.py --exportar")
+    parser.add_argument("--simular", nargs="+", choices=tuple(SISTEMAS), default=(), metavar="MODO",
+                        help="simula sin ventana estos sistemas y añade sus trayectorias")
+    parser.add_argument("--trayectorias", metavar="DIR", default="trayectorias",
+                        help="directorio donde se exportan las trayectorias simuladas con --simular")
+    parser.add_argument("--circuito", metavar="RUTA",
+                        help="JSON del circuito de todas las trayectorias (por defecto el exportado con cada una)")
+    parser.add_argument("--salida", metavar="DIR", help="directorio donde guardar un PNG por trayectoria")
+    parser.add_argument("--hoja", metavar="RUTA", help="PNG con todas las miniaturas en una rejilla")
+    parser.add_argument("--ancho", type=int, default=ANCHO_MINIATURA, help="ancho de cada miniatura en pixeles")
+    parser.add_argument("--procesos", type=int, help="procesos en paralelo (por defecto uno por nucleo)")
+    args = parser.parse_args()
+    if args.salida is None and args.hoja is None:
+        parser.error("hay que indicar --salida, --hoja o ambos")
+    if not args.rutas and not args.simular:
+        parser.error("hay que indicar trayectorias, --simular o ambos")
+    rutas = sorted(args.rutas)
+    if args.simular:
+        os.makedirs(args.trayectorias, exist_ok=True)
+        simuladas = [os.path.join(args.trayectorias, f"{modo}.csv") for modo in args.simular]
+        with Pool(args.procesos) as pool:
+            puntuaciones = pool.map(simularModo, list(zip(args.simular, simuladas)))
+        for modo, ruta, puntuacion in zip(args.simular, simuladas, puntuaciones):
+            print(f"{modo}: {puntuacion:.3f} puntos, trayectoria en {ruta}")
+        rutas += simuladas
+    generarMiniaturas(rutas, args.salida, args.hoja, args.ancho, args.procesos, args.circuito)
+    if args.hoja is not None:
+        print(f"Hoja de contactos con {len(rutas)} miniaturas en {args.hoja}")
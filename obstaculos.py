@@ -0,0 +1,144 @@
+import json
+import math
+import numpy as np
+
+LIMITES_MAPA = (0.0, 0.0, 102.4, 72.0) # Zona del mundo que cubre el mapa (xMin, yMin, xMax, yMax), la de la ventana de main.py
+RESOLUCION_MAPA = 0.1 # Lado de cada celda de la rejilla (m)
+ALCANCE_SENSOR = 10.0 # Distancia maxima que mide un sensor de distancia (m)
+
+
+class MapaObstaculos:
+    """
+    Obstaculos estaticos del circuito rasterizados una sola vez en una rejilla.
+
+    Al crearlo se calcula en cada nodo de la rejilla la distancia con signo al obstaculo mas cercano
+    (negativa dentro) y, a partir de ella, la rejilla de ocupacion. Despues, comprobar colisiones o
+    medir distancias es interpolar en la rejilla, sin recorrer los obstaculos, y se hace para arrays
+    de puntos a la vez (por ejemplo muchos robots o muchos rayos).
+
+    Los rayos se lanzan con una marcha sobre el campo de distancias (sphere tracing): en cada
+    iteracion todos los rayos que no han chocado avanzan la distancia libre que indica el campo en su
+    punto, que es lo maximo que pueden avanzar sin atravesar nada.
+    """
+
+    def __init__(self, circulos=(), poligonos=(), limites=LIMITES_MAPA, resolucion=RESOLUCION_MAPA):
+        """
+        Parámetros:
+            circulos: Lista de ((x, y), radio)
+            poligonos: Lista de listas de vertices (x, y), en cualquier sentido
+            limites: (xMin, yMin, xMax, yMax) de la zona que cubre la rejilla
+            resolucion: Separacion entre nodos de la rejilla (m)
+        """
+        self.circulos = [(tuple(centro), float(radio)) for centro, radio in circulos]
+        self.poligonos = [np.array(vertices, dtype=float) for vertices in poligonos]
+        self.limites = limites
+        self.resolucion = resolucion
+
+        self.ejeX = np.arange(limites[0], limites[2] + resolucion / 2, resolucion)
+        self.ejeY = np.arange(limites[1], limites[3] + resolucion / 2, resolucion)
+        self.distancias = self.calcularDistancias() # Campo de distancias con signo, indexado [ix, iy]
+        self.ocupacion = self.distancias <= 0
+
+    def calcularDistancias(self):
+        """
+        Distancia con signo de cada nodo de la rejilla al obstaculo mas cercano, como mucho la diagonal
+        del mapa (tambien sin obstaculos, para que la interpolacion no tenga que tratar infinitos).
+        """
+        x, y = np.meshgrid(self.ejeX, self.ejeY, indexing="ij")
+        distancias = np.full(x.shape, np.inf)
+        for centro, radio in self.circulos:
+            distancias = np.minimum(distancias, np.hypot(x - centro[0], y - centro[1]) - radio)
+        for vertices in self.poligonos:
+            distancias = np.minimum(distancias, distanciaPoligono(vertices, x, y))
+        return np.minimum(distancias, math.hypot(self.limites[2] - self.limites[0], self.limites[3] - self.limites[1]))
+
+    def distancia(self, x, y):
+        """
+        Distancia con signo al obstaculo mas cercano en los puntos (x, y), interpolada bilinealmente.
+        Fuera del mapa se usa el valor del borde.
+        """
+        u = np.clip((np.asarray(x, dtype=float) - self.limites[0]) / self.resolucion, 0.0, len(self.ejeX) - 1.0)
+        v = np.clip((np.asarray(y, dtype=float) - self.limites[1]) / self.resolucion, 0.0, len(self.ejeY) - 1.0)
+        i = np.minimum(u.astype(int), len(self.ejeX) - 2)
+        j = np.minimum(v.astype(int), len(self.ejeY) - 2)
+        fu = u - i
+        fv = v - j
+        d = self.distancias
+        return ((1 - fu) * ((1 - fv) * d[i, j] + fv * d[i, j + 1])
+                + fu * ((1 - fv) * d[i + 1, j] + fv * d[i + 1, j + 1]))
+
+    def ocupado(self, x, y):
+        """
+        Indica si los puntos (x, y) caen en una celda ocupada de la rejilla.
+        """
+        i = np.clip(np.rint((np.asarray(x, dtype=float) - self.limites[0]) / self.resolucion).astype(int), 0, len(self.ejeX) - 1)
+        j = np.clip(np.rint((np.asarray(y, dtype=float) - self.limites[1]) / self.resolucion).astype(int), 0, len(self.ejeY) - 1)
+        return self.ocupacion[i, j]
+
+    def colision(self, x, y, radio):
+        """
+        Indica si un circulo de `radio` centrado en cada punto (x, y) toca algun obstaculo.
+        """
+        return self.distancia(x, y) < radio
+
+    def lanzarRayos(self, x, y, angulos, alcance=ALCANCE_SENSOR):
+        """
+        Mide la distancia al primer obstaculo a lo largo de varios rayos a la vez.
+
+        Parámetros:
+            x, y: Origen de los rayos
+            angulos: Direccion de cada rayo (rad); se combina con x e y por broadcasting, por ejemplo
+                     x e y de forma (robots, 1) y angulos de forma (robots, rayos)
+            alcance: Distancia maxima medida (m)
+
+        Retorna:
+            np.array: Distancia medida por cada rayo, `alcance` si no encuentra nada
+        """
+        x, y, angulos = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+                                            np.asarray(angulos, dtype=float))
+        x, y = x.ravel(), y.ravel()
+        dx, dy = np.cos(angulos).ravel(), np.sin(angulos).ravel()
+        t = np.zeros(x.shape)
+        activos = np.arange(len(t)) # Rayos que todavia no han chocado ni llegado al alcance
+        umbral = self.resolucion / 2 # Por debajo de esta distancia se considera que el rayo ha chocado
+        # Cada iteracion avanza al menos `umbral`, asi que con estas todos los rayos terminan aunque
+        # pasen rozando un obstaculo; con menos, un rayo rasante se quedaria a medias y mediria un choque
+        for _ in range(int(math.ceil(alcance / umbral)) + 1):
+            d = self.distancia(x[activos] + t[activos] * dx[activos], y[activos] + t[activos] * dy[activos])
+            sigue = d >= umbral
+            activos = activos[sigue]
+            t[activos] += d[sigue]
+            activos = activos[t[activos] < alcance]
+            if len(activos) == 0:
+                break
+        return np.minimum(t, alcance).reshape(angulos.shape)
+
+    @classmethod
+    def cargar(cls, ruta, **kwargs):
+        """
+        Lee los obstaculos de un JSON {"circulos": [[x, y, radio], ...], "poligonos": [[[x, y], ...], ...]}.
+        """
+        with open(ruta) as fichero:
+            datos = json.load(fichero)
+        circulos = [((x, y), radio) for x, y, radio in datos.get("circulos", [])]
+        return cls(circulos, datos.get("poligonos", []), **kwargs)
+
+
+def distanciaPoligono(vertices, x, y):
+    """
+    Distancia con signo de los puntos (x, y) a un poligono: la distancia al lado mas cercano,
+    negativa si el punto esta dentro (regla par-impar).
+    """
+    distancia = np.full(np.shape(x), np.inf)
+    dentro = np.zeros(np.shape(x), dtype=bool)
+    for a, b in zip(vertices, np.roll(vertices, -1, axis=0)):
+        ab = b - a
+        longitud2 = max(float(ab @ ab), 1e-12)
+        k = np.clip(((x - a[0]) * ab[0] + (y - a[1]) * ab[1]) / longitud2, 0.0, 1.0)
+        distancia = np.minimum(distancia, np.hypot(x - a[0] - k * ab[0], y - a[1] - k * ab[1]))
+        # El lado cruza la horizontal del punto a su derecha
+        cruza = (a[1] > y) != (b[1] > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corte = a[0] + (y - a[1]) * ab[0] / ab[1]
+        dentro ^= cruza & (x < corte)
+    return np.where(dentro, -distancia, distancia)
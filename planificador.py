@@ -0,0 +1,251 @@
+import os
+import math
+import hashlib
+import zipfile
+import numpy as np
+
+from configuracion import ConfiguracionPlanificador
+
+DIRECTORIO_PERFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfiles") # Cache de perfiles planificados
+TOLERANCIA_COMPROBACION = 1e-6 # Margen numerico al comprobar que el perfil respeta los limites
+
+
+def formaGiro(angulo, config):
+    """
+    Forma del giro mas rapido posible de `angulo` radianes con los limites angulares del robot,
+    recorrido a velocidad lineal 1 m/s.
+
+    Explicación:
+        La velocidad angular sube a WACC hasta WMAX (o hasta donde de tiempo), se mantiene y baja
+        igual, de forma que el giro dura lo mismo a cualquier velocidad lineal y su forma simplemente
+        escala con ella. Se integra una vez a 1 m/s y se mide la distancia antes de la esquina a la
+        que hay que empezar a girar, que a 1 m/s coincide con el tiempo de anticipacion en segundos.
+
+    Retorna:
+        tuple: (duracion del giro (s), anticipacion (s))
+    """
+    angulo = min(abs(angulo), math.pi - 1e-3) # Un giro de 180 grados no tiene esquina
+    if angulo < 1e-9:
+        return 0.0, 0.0
+
+    if angulo <= config.WMAX ** 2 / config.WACC:
+        pico = math.sqrt(angulo * config.WACC)
+        rampa, meseta = pico / config.WACC, 0.0
+    else:
+        pico = config.WMAX
+        rampa = config.WMAX / config.WACC
+        meseta = (angulo - pico * rampa) / pico
+    duracion = 2 * rampa + meseta
+
+    t = np.linspace(0.0, duracion, config.MUESTRAS_GIRO + 1)
+    w = np.minimum(np.minimum(t, duracion - t) * config.WACC, pico)
+    dt = duracion / config.MUESTRAS_GIRO
+    rumbo = np.concatenate(([0.0], np.cumsum((w[:-1] + w[1:]) / 2 * dt)))
+    rumbo *= angulo / rumbo[-1] # Corrige el error de integracion para girar exactamente `angulo`
+    x = np.concatenate(([0.0], np.cumsum((np.cos(rumbo[:-1]) + np.cos(rumbo[1:])) / 2 * dt)))
+    y = np.concatenate(([0.0], np.cumsum((np.sin(rumbo[:-1]) + np.sin(rumbo[1:])) / 2 * dt)))
+
+    # Esquina: corte de la recta de entrada (eje x) con la de salida, que pasa por el final del giro
+    esquina = x[-1] - y[-1] / math.tan(angulo)
+    return duracion, esquina
+
+
+class PerfilVelocidad:
+    """
+    Perfil de velocidad lineal y de anticipacion al giro a lo largo de un `CaminoReferencia`.
+
+    Se calcula una vez por circuito a partir de su geometria y de los limites del robot, en lugar de
+    ajustar VMAX_TRIANGULO y los factores de anticipacion de cada segmento a mano:
+        - En cada esquina del camino se limita la velocidad para que el giro mas rapido posible no se
+          salga de los tramos que la forman (ver `limiteEsquina`).
+        - Una pasada hacia delante y otra hacia atras limitan la aceleracion y la frenada a VACC.
+        - La anticipacion de cada punto es la de la siguiente esquina, en segundos: multiplicada por la
+          velocidad da la distancia a la que hay que empezar a girar, y nunca baja de ANTICIPACION_MINIMA
+          para que el punto adelantado no quede tan cerca que el robot corrija a golpes.
+
+    Las dos curvas se guardan muestreadas cada PASO metros, por lo que consultarlas en cada tick es un
+    acceso directo a un array. Los perfiles se guardan en DIRECTORIO_PERFILES con un nombre que
+    depende del camino y de la configuracion.
+    """
+
+    def __init__(self, camino, config=None, directorioPerfiles=DIRECTORIO_PERFILES):
+        """
+        Carga el perfil de `camino` de la cache o lo planifica, lo comprueba y lo guarda.
+
+        Parámetros:
+            camino: CaminoReferencia del circuito completo
+            config: ConfiguracionPlanificador; por defecto la de configuracion.py
+            directorioPerfiles: Directorio de la cache de perfiles, o None para no usarla
+        """
+        self.camino = camino
+        self.config = config if config is not None else ConfiguracionPlanificador()
+        self.paso = self.config.PASO
+
+        ruta = None
+        if directorioPerfiles is not None:
+            ruta = os.path.join(directorioPerfiles, f"perfil_{self.clavePerfil()}.npz")
+        # "cargado" de la cache, "nuevo" si se ha planificado o "ilegible" si se ha vuelto a planificar
+        # porque el guardado no se podia leer; no se escribe nada por pantalla y quien lo crea decide si avisar
+        self.estado = self.cargar(ruta) if ruta is not None else "nuevo"
+        if self.estado != "cargado":
+            self.velocidades, self.anticipaciones = self.planificar()
+        self.comprobar()
+        if ruta is not None and self.estado != "cargado":
+            os.makedirs(directorioPerfiles, exist_ok=True)
+            # Se escribe en un fichero temporal y se renombra, asi otro proceso nunca lee un perfil a medias
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, "wb") as fichero:
+                np.savez(fichero, velocidades=self.velocidades, anticipaciones=self.anticipaciones)
+            os.replace(temporal, ruta)
+
+    def cargar(self, ruta):
+        """
+        Carga el perfil guardado en `ruta`.
+
+        Retorna:
+            str: "cargado", "nuevo" si no existe o "ilegible" si no se puede leer (en los dos ultimos
+                 hay que planificarlo)
+        """
+        try:
+            with np.load(ruta) as datos:
+                self.velocidades, self.anticipaciones = datos["velocidades"], datos["anticipaciones"]
+        except FileNotFoundError:
+            return "nuevo"
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile): # Fichero corrupto o incompleto
+            return "ilegible"
+        return "cargado"
+
+    def clavePerfil(self):
+        """
+        Resumen sha256 de todo lo que determina un perfil: los vertices del camino y la configuracion.
+        """
+        resumen = hashlib.sha256()
+        resumen.update(np.ascontiguousarray(self.camino.puntos, dtype=float).tobytes())
+        resumen.update(repr(self.config).encode())
+        return resumen.hexdigest()[:16]
+
+    def esquinas(self):
+        """
+        Esquinas del camino: los vertices en los que cambia la direccion.
+
+        Retorna:
+            list: (longitud de arco, angulo de giro, longitud del tramo anterior, longitud del tramo siguiente)
+        """
+        camino = self.camino
+        validos = np.flatnonzero(camino.longitudes > 1e-9) # Los tramos de longitud 0 no tienen direccion
+        cerrado = np.allclose(camino.puntos[0], camino.puntos[-1])
+        pares = list(zip(validos[:-1], validos[1:]))
+        if cerrado and len(validos) > 1:
+            pares.append((validos[-1], validos[0]))
+
+        esquinas = []
+        for anterior, siguiente in pares:
+            t1, t2 = camino.tangentes[anterior], camino.tangentes[siguiente]
+            angulo = math.atan2(t1[0] * t2[1] - t1[1] * t2[0], t1[0] * t2[0] + t1[1] * t2[1])
+            s = camino.s[siguiente] if siguiente > anterior else camino.longitud
+            esquinas.append((float(s), abs(angulo), camino.longitudes[anterior], camino.longitudes[siguiente]))
+        return esquinas
+
+    def limiteEsquina(self, angulo, anterior, posterior):
+        """
+        Velocidad maxima con la que se puede girar una esquina: el giro empieza `anticipacion * v`
+        antes de la esquina y acaba lo mismo despues, asi que no puede salirse de los tramos que la
+        forman.
+
+        Explicación:
+            No se frena para pasar mas cerca de la esquina. La puntuacion de cada segmento suma 1/dist
+            por pose pero se divide por (1 + tiempo)³, y frenar en un giro cuesta mas por el tiempo de
+            lo que se gana por la distancia: limitando la separacion del giro a la esquina (unos 0.6 m
+            por cada m/s en un giro de 90 grados) a 1.5, 1 o 0.3 m, el sistema
+            experto baja de 42.1 a 38.9, 36.2 y 7.4 puntos, el difuso de 61.3 a 56.3, 44.9 y 32.6 y
+            `fuzzy-tabla` de 64.9 a 18.3, 10.2 y 7.2.
+
+        Retorna:
+            tuple: (velocidad maxima (m/s), anticipacion (s)), o None si la esquina no obliga a girar
+        """
+        duracion, anticipacion = formaGiro(angulo, self.config)
+        if duracion == 0:
+            return None
+        return min(self.config.VMAX, min(anterior, posterior) / anticipacion), anticipacion
+
+    def planificar(self):
+        """
+        Calcula el perfil de velocidad y el de anticipacion.
+
+        Retorna:
+            tuple: (velocidades (m/s), anticipaciones (s)), muestreadas cada PASO metros
+        """
+        config = self.config
+        muestras = int(math.ceil(self.camino.longitud / self.paso)) + 1
+        s = np.arange(muestras) * self.paso
+        limite = np.full(muestras, float(config.VMAX))
+        anticipaciones = np.full(muestras, np.nan)
+
+        for sEsquina, angulo, anterior, posterior in self.esquinas():
+            giro = self.limiteEsquina(angulo, anterior, posterior)
+            if giro is None:
+                continue
+            v, anticipacion = giro
+            dentro = np.abs(s - sEsquina) <= anticipacion * v
+            limite[dentro] = np.minimum(limite[dentro], v)
+            # Todo el tramo que llega a la esquina se prepara para ella
+            anticipaciones[(s > sEsquina - anterior) & (s <= sEsquina)] = anticipacion
+
+        # Los tramos que no llegan a ninguna esquina (rectos o el final de un camino abierto) usan la
+        # anticipacion de la esquina siguiente o, si no la hay, la de la anterior
+        for i in range(muestras - 2, -1, -1):
+            if np.isnan(anticipaciones[i]):
+                anticipaciones[i] = anticipaciones[i + 1]
+        for i in range(1, muestras):
+            if np.isnan(anticipaciones[i]):
+                anticipaciones[i] = anticipaciones[i - 1]
+        anticipaciones = np.maximum(np.nan_to_num(anticipaciones), config.ANTICIPACION_MINIMA)
+
+        velocidades = limite.copy()
+        incremento = 2 * config.VACC * self.paso # v² cambia como mucho 2·VACC·ds entre muestras
+        for i in range(1, muestras):
+            velocidades[i] = min(velocidades[i], math.sqrt(velocidades[i - 1] ** 2 + incremento))
+        for i in range(muestras - 2, -1, -1):
+            velocidades[i] = min(velocidades[i], math.sqrt(velocidades[i + 1] ** 2 + incremento))
+        return velocidades, anticipaciones
+
+    def comprobar(self):
+        """
+        Comprueba que el perfil se puede seguir con los limites del robot: velocidad entre 0 y VMAX,
+        cambios de velocidad entre muestras que no superen VACC y cada esquina a una velocidad a la
+        que se puede girar con WMAX y WACC. Lanza ValueError si no.
+        """
+        config = self.config
+        muestras = int(math.ceil(self.camino.longitud / self.paso)) + 1
+        if self.velocidades.shape != (muestras,) or self.anticipaciones.shape != (muestras,):
+            raise ValueError(f"El perfil tiene {len(self.velocidades)} muestras y el camino necesita {muestras}")
+        if np.any(self.velocidades < 0) or np.any(self.velocidades > config.VMAX + TOLERANCIA_COMPROBACION):
+            raise ValueError("El perfil se sale del rango de velocidades del robot")
+        aceleraciones = np.abs(np.diff(self.velocidades ** 2)) / (2 * self.paso)
+        if np.any(aceleraciones > config.VACC + TOLERANCIA_COMPROBACION):
+            peor = int(np.argmax(aceleraciones))
+            raise ValueError(f"El perfil necesita {aceleraciones[peor]:.3f} m/s² en s = {peor * self.paso:.2f} m (VACC = {config.VACC})")
+        for sEsquina, angulo, anterior, posterior in self.esquinas():
+            giro = self.limiteEsquina(angulo, anterior, posterior)
+            if giro is not None and self.velocidadEn(sEsquina) > giro[0] + TOLERANCIA_COMPROBACION:
+                raise ValueError(f"El perfil llega a {self.velocidadEn(sEsquina):.3f} m/s a la esquina de s = {sEsquina:.2f} m, "
+                                 f"que solo se puede girar a {giro[0]:.3f} m/s")
+
+    def indice(self, s):
+        """
+        Muestra del perfil que corresponde a la longitud de arco `s`.
+        """
+        return min(max(int(s / self.paso), 0), len(self.velocidades) - 1)
+
+    def velocidadEn(self, s):
+        """
+        Velocidad lineal planificada en la longitud de arco `s` (m/s).
+        """
+        return float(self.velocidades[self.indice(s)])
+
+    def anticipacionEn(self, s):
+        """
+        Anticipacion al giro planificada en la longitud de arco `s` (s): el tiempo antes de la
+        siguiente esquina al que hay que empezar a girar.
+        """
+        return float(self.anticipaciones[self.indice(s)])
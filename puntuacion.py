@@ -0,0 +1,210 @@
+import math
+import numpy as np
+
+MUESTRAS_POR_SEGUNDO = 60 # Frecuencia a la que la puntuacion original suma una muestra; la continua se escala a ella
+
+
+def straightToPointDistance(p1, p2, p3):
+    m1 = p2[1]-p1[1]
+    m2 = p2[0]-p1[0]
+    return m1*p3[0] - m2*p3[1] - p1[0]*m1 + p1[1]*m2
+
+def straightToPointDistanceNorm(p1, p2, p3):
+    m1 = p2[1]-p1[1]
+    m2 = p2[0]-p1[0]
+    norm = math.sqrt(m1*m1+m2*m2)
+    return (m1*p3[0] - m2*p3[1] - p1[0]*m1 + p1[1]*m2)/norm
+
+def inTriangle(triangulo, punto):
+    inicio = np.array(triangulo.getInicio())
+    medio = np.array(triangulo.getMedio())
+    fin = np.array(triangulo.getFin())
+
+    d1 =straightToPointDistance(inicio, medio, np.array(punto))
+    d2 =straightToPointDistance(medio, fin, np.array(punto))
+    d3 =straightToPointDistance(fin, inicio, np.array(punto))
+
+    tieneNegativo =  d1<0 or d2<0 or d3<0
+    tienePositivo = d1>0 or d2>0 or d3>0
+
+    return not(tieneNegativo and tienePositivo)
+
+    
+
+def getSegmentScore(segmento, posiciones, tiempo=1):
+    inicio = np.array(segmento.getInicio())
+    fin = np.array(segmento.getFin())
+    score = 0
+    for pos in posiciones:
+        dist = np.abs(straightToPointDistanceNorm(inicio, fin, np.array(pos[0:2])))
+        if dist<3:
+            if dist < 0.01:
+                score += 100
+            else:
+                score += 1 / dist
+    return (score/((1+tiempo)*(1+tiempo)*(1+tiempo)), score, tiempo)
+
+def getTriangleScore(triangulo, posiciones, tiempo=1):
+    inicio = np.array(triangulo.getInicio())
+    medio = np.array(triangulo.getMedio())
+    fin = np.array(triangulo.getFin())
+    score = 500
+    penalizacion = 0
+    factor = -1
+    altura = np.abs(straightToPointDistanceNorm(inicio, fin, medio))
+    for pos in posiciones:
+        if inTriangle(triangulo, pos[0:2]):
+            penalizacion += 1
+        m1 = medio[0]-pos[0]
+        m2 = medio[1]-pos[1]
+        norm = math.sqrt(m1*m1+m2*m2)
+        if factor<1 and norm<altura:
+            factor = 1
+    score = (score-penalizacion)*factor
+    return (score/((1+tiempo)*(1+tiempo)), score, tiempo)
+
+
+def puntuacionDistanciaVectorizada(inicio, fin, x, y):
+    """
+    Version vectorizada de la puntuacion por muestra de `getSegmentScore`.
+
+    Devuelve, para cada posicion (x, y), lo que esa muestra sumaria a la puntuacion de
+    distancia del segmento: 100 si esta a menos de 0.01, 1/dist si esta a menos de 3 y 0 en
+    otro caso. `x` e `y` pueden tener cualquier forma (por ejemplo candidatos x pasos).
+    """
+    dist = np.abs(straightToPointDistanceNorm(inicio, fin, (x, y)))
+    return np.where(dist < 0.01, 100.0, np.where(dist < 3, 1.0 / np.maximum(dist, 0.01), 0.0))
+
+def inTriangleVectorizado(inicio, medio, fin, x, y):
+    """
+    Version vectorizada de `inTriangle` para arrays de coordenadas.
+    """
+    d1 = straightToPointDistance(inicio, medio, (x, y))
+    d2 = straightToPointDistance(medio, fin, (x, y))
+    d3 = straightToPointDistance(fin, inicio, (x, y))
+
+    tieneNegativo = (d1 < 0) | (d2 < 0) | (d3 < 0)
+    tienePositivo = (d1 > 0) | (d2 > 0) | (d3 > 0)
+
+    return ~(tieneNegativo & tienePositivo)
+
+
+def primitivaDistancia(s):
+    """
+    Primitiva, respecto a la distancia con signo `s` a la recta del segmento, de la puntuacion por
+    muestra de `getSegmentScore` (100 a menos de 0.01, 1/dist a menos de 3 y 0 mas lejos). Es
+    impar y continua: 100*s cerca de la recta, 1 + ln(|s|/0.01) despues y constante a partir de 3.
+    """
+    u = np.minimum(np.abs(s), 3.0)
+    return np.sign(s) * np.where(u < 0.01, 100.0 * u, 1.0 + np.log(np.maximum(u, 0.01) / 0.01))
+
+def integralDistancia(inicio, fin, x, y, t):
+    """
+    Integral en el tiempo de la puntuacion por muestra de `getSegmentScore` a lo largo del camino
+    que une las posiciones (x, y) en los instantes `t` (s), en forma cerrada en cada tramo.
+
+    Dentro de un tramo el robot se mueve en linea recta a velocidad constante, asi que su distancia
+    con signo a la recta del segmento varia linealmente de `a` a `b`, y la integral del tramo es
+    dt * (G(b) - G(a)) / (b - a) con G la primitiva de `primitivaDistancia`. Si `a` y `b` casi
+    coinciden se usa dt por la puntuacion en el punto medio.
+
+    Retorna:
+        np.array: La integral de cada tramo (una menos que posiciones)
+    """
+    s = straightToPointDistanceNorm(inicio, fin, (x, y))
+    a, b, dt = s[:-1], s[1:], np.diff(t)
+    diferencia = b - a
+    constante = np.abs(diferencia) < 1e-9
+    medio = np.abs(a + b) / 2
+    puntoMedio = np.where(medio < 0.01, 100.0, np.where(medio < 3, 1.0 / np.maximum(medio, 0.01), 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pendiente = (primitivaDistancia(b) - primitivaDistancia(a)) / diferencia
+    return dt * np.where(constante, puntoMedio, pendiente)
+
+def tiempoDentroTriangulo(inicio, medio, fin, x, y, t):
+    """
+    Tiempo que el camino que une las posiciones (x, y) en los instantes `t` pasa dentro del
+    triangulo, en forma cerrada en cada tramo: las tres distancias con signo a los lados varian
+    linealmente en el tramo, y cada una limita la fraccion del tramo que queda en su lado.
+
+    Retorna:
+        np.array: Segundos dentro del triangulo de cada tramo
+    """
+    # Con vertices en orden horario las tres distancias son negativas dentro; se cambia el signo
+    # para que dentro siempre sean positivas
+    orientacion = 1.0 if straightToPointDistance(inicio, medio, fin) >= 0 else -1.0
+    desde = np.zeros(len(x) - 1)
+    hasta = np.ones(len(x) - 1)
+    for p, q in ((inicio, medio), (medio, fin), (fin, inicio)):
+        d = orientacion * straightToPointDistance(p, q, (x, y))
+        d0, cambio = d[:-1], np.diff(d)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corte = -d0 / cambio
+        desde = np.where(cambio > 0, np.maximum(desde, corte), desde)
+        hasta = np.where(cambio < 0, np.minimum(hasta, corte), hasta)
+        hasta = np.where((cambio == 0) & (d0 < 0), 0.0, hasta)
+    return np.diff(t) * np.maximum(hasta - desde, 0.0)
+
+def distanciaMinimaCamino(punto, x, y):
+    """
+    Distancia minima de `punto` al camino que une las posiciones (x, y), tramo a tramo.
+    """
+    px, py = punto[0], punto[1]
+    minima = np.min(np.hypot(x - px, y - py))
+    if len(x) > 1:
+        vx, vy = np.diff(x), np.diff(y)
+        longitud2 = vx * vx + vy * vy
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tau = np.clip(((px - x[:-1]) * vx + (py - y[:-1]) * vy) / longitud2, 0.0, 1.0)
+        tau = np.where(longitud2 > 0, tau, 0.0)
+        minima = min(minima, np.min(np.hypot(x[:-1] + tau * vx - px, y[:-1] + tau * vy - py)))
+    return float(minima)
+
+def getSegmentScoreContinuo(segmento, posiciones, tiempos, tiempo=1):
+    """
+    Version de `getSegmentScore` que no depende del paso de simulacion: en lugar de sumar 1/dist por
+    cada muestra integra la puntuacion a lo largo del camino entre muestras y la multiplica por
+    MUESTRAS_POR_SEGUNDO, de forma que a 60 fps da practicamente lo mismo que la original.
+
+    Parámetros:
+        segmento: Objetivo de tipo segmento
+        posiciones: Poses (x, y, ...) del robot durante el objetivo
+        tiempos: Instante simulado (s) de cada pose
+        tiempo: Tiempo empleado en el objetivo (s)
+    """
+    puntos = np.asarray([pos[0:2] for pos in posiciones], dtype=float).reshape(-1, 2)
+    score = 0.0
+    if len(puntos) > 1:
+        integral = integralDistancia(np.array(segmento.getInicio()), np.array(segmento.getFin()),
+                                     puntos[:, 0], puntos[:, 1], np.asarray(tiempos, dtype=float))
+        score = MUESTRAS_POR_SEGUNDO * float(integral.sum())
+    return (score/((1+tiempo)*(1+tiempo)*(1+tiempo)), score, tiempo)
+
+def getTriangleScoreContinuo(triangulo, posiciones, tiempos, tiempo=1):
+    """
+    Version de `getTriangleScore` que no depende del paso de simulacion: la penalizacion es el
+    tiempo que el camino entre muestras pasa dentro del triangulo por MUESTRAS_POR_SEGUNDO, y el
+    punto medio cuenta como alcanzado si algun tramo del camino pasa a menos de la altura.
+
+    Parámetros:
+        triangulo: Objetivo de tipo triangulo
+        posiciones: Poses (x, y, ...) del robot durante el objetivo
+        tiempos: Instante simulado (s) de cada pose
+        tiempo: Tiempo empleado en el objetivo (s)
+    """
+    inicio = np.array(triangulo.getInicio())
+    medio = np.array(triangulo.getMedio())
+    fin = np.array(triangulo.getFin())
+    puntos = np.asarray([pos[0:2] for pos in posiciones], dtype=float).reshape(-1, 2)
+    score = 500
+    penalizacion = 0
+    factor = -1
+    if len(puntos) > 0:
+        altura = np.abs(straightToPointDistanceNorm(inicio, fin, medio))
+        if len(puntos) > 1:
+            dentro = tiempoDentroTriangulo(inicio, medio, fin, puntos[:, 0], puntos[:, 1], np.asarray(tiempos, dtype=float))
+            penalizacion = MUESTRAS_POR_SEGUNDO * float(dentro.sum())
+        if distanciaMinimaCamino(medio, puntos[:, 0], puntos[:, 1]) < altura:
+            factor = 1
+    score = (score-penalizacion)*factor
+    return (score/((1+tiempo)*(1+tiempo)), score, tiempo)
@@ -0,0 +1,130 @@
+import sys
+import time
+import atexit
+import datetime
+import threading
+import numpy as np
+
+CAPACIDAD_REGISTRO = 4096 # Registros que caben en la cola antes de empezar a descartar
+INTERVALO_VACIADO = 0.1 # Cada cuanto escribe el hilo de fondo lo acumulado (s)
+
+class RegistroAsincrono:
+    """
+    Registro de los logs en tiempo real que no bloquea el bucle de control.
+
+    El bucle de control solo guarda cuatro numeros (instante, distancia al segmento, V y W) en una
+    cola circular preasignada. Un hilo de fondo da formato a los registros acumulados y los escribe
+    por lotes cada INTERVALO_VACIADO segundos. Hay un unico productor (el bucle de control) y un
+    unico consumidor (el hilo), asi que basta con los dos contadores para repartirse la cola.
+
+    Se puede registrar solo uno de cada `muestreo` registros y limitar el numero de registros por
+    segundo; lo que no cabe en la cola o supera el limite se descarta y se cuenta.
+    """
+
+    def __init__(self, salida=None, muestreo=1, maxPorSegundo=None, capacidad=CAPACIDAD_REGISTRO,
+                 intervalo=INTERVALO_VACIADO):
+        if muestreo < 1:
+            raise ValueError(f"El muestreo tiene que ser al menos 1 (uno de cada N registros): {muestreo}")
+        if maxPorSegundo is not None and maxPorSegundo <= 0:
+            raise ValueError(f"El limite de registros por segundo tiene que ser positivo: {maxPorSegundo}")
+        self.salida = salida if salida is not None else sys.stdout
+        self.muestreo = muestreo
+        self.maxPorSegundo = maxPorSegundo
+        self.intervalo = intervalo
+
+        self.datos = np.empty((capacidad, 4))
+        self.escritos = 0 # Registros guardados por el productor
+        self.leidos = 0 # Registros ya escritos por el consumidor
+        self.llamadas = 0
+        self.descartados = 0 # Por cola llena
+        self.limitados = 0 # Por el limite de registros por segundo
+        # El cubo guarda al menos una ficha: con menos de un registro por segundo nunca llegaria a una
+        self.maxFichas = max(1.0, maxPorSegundo) if maxPorSegundo is not None else 0.0
+        self.fichas = self.maxFichas
+        self.ultimaRecarga = time.monotonic()
+
+        self.parar = threading.Event()
+        self.hilo = threading.Thread(target=self.vaciarPeriodicamente, name="RegistroAsincrono", daemon=True)
+        self.hilo.start()
+
+    def registrar(self, dist, velocidad_lineal, velocidad_angular):
+        """
+        Guarda un registro en la cola sin formatear ni escribir nada. Es lo unico que se ejecuta en el bucle de control.
+        """
+        self.llamadas += 1
+        if self.llamadas % self.muestreo:
+            return
+
+        if self.maxPorSegundo is not None:
+            ahora = time.monotonic()
+            self.fichas = min(self.fichas + (ahora - self.ultimaRecarga) * self.maxPorSegundo, self.maxFichas)
+            self.ultimaRecarga = ahora
+            if self.fichas < 1:
+                self.limitados += 1
+                return
+            self.fichas -= 1
+
+        if self.escritos - self.leidos >= len(self.datos):
+            self.descartados += 1
+            return
+        self.datos[self.escritos % len(self.datos)] = (time.time(), dist, velocidad_lineal, velocidad_angular)
+        self.escritos += 1
+
+    def vaciar(self):
+        """
+        Da formato a los registros pendientes y los escribe de una vez.
+        """
+        escritos = self.escritos
+        if escritos == self.leidos:
+            return
+        lineas = []
+        for i in range(self.leidos, escritos):
+            instante, dist, velocidad_lineal, velocidad_angular = self.datos[i % len(self.datos)]
+            timestamp = datetime.datetime.fromtimestamp(instante).strftime("%Y-%m-%d %H:%M:%S")
+            lineas.append(
+                f"[{timestamp}] Distancia al segmento: {dist:.4f} m, "
+                f"Velocidad Lineal: {velocidad_lineal:.4f} m/s, "
+                f"Velocidad Angular: {velocidad_angular:.4f} rad/s, \n"
+            )
+        self.leidos = escritos
+        self.salida.write("".join(lineas))
+        self.salida.flush()
+
+    def vaciarPeriodicamente(self):
+        while not self.parar.wait(self.intervalo):
+            self.vaciar()
+        self.vaciar()
+
+    def cerrar(self):
+        """
+        Detiene el hilo de fondo tras escribir lo que quede en la cola.
+        """
+        self.parar.set()
+        self.hilo.join()
+
+
+registroGlobal = None
+
+def obtenerRegistro():
+    """
+    Devuelve el registro compartido por los sistemas expertos, creandolo la primera vez.
+    """
+    global registroGlobal
+    if registroGlobal is None:
+        configurarRegistro()
+    return registroGlobal
+
+def configurarRegistro(salida=None, muestreo=1, maxPorSegundo=None):
+    """
+    Sustituye el registro compartido por uno nuevo con la configuracion indicada.
+    """
+    global registroGlobal
+    if registroGlobal is not None:
+        registroGlobal.cerrar()
+    registroGlobal = RegistroAsincrono(salida, muestreo, maxPorSegundo)
+    return registroGlobal
+
+@atexit.register
+def cerrarRegistro():
+    if registroGlobal is not None:
+        registroGlobal.cerrar()
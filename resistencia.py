@@ -0,0 +1,223 @@
+import os
+import csv
+import math
+import time
+import argparse
+import numpy as np
+
+from circuito import crearCircuito, POSE_INICIAL
+from simulacion import Simulacion, PASO_NOMINAL
+from expertSystem import ExpertSystem
+from fuzzyExpert import FuzzySystem
+from fuzzyTabla import FuzzyTablaSystem
+from rolloutExpert import RolloutSystem
+
+INTERVALO_VENTANA = 10.0 # Segundos simulados que resume cada ventana de latencia y memoria
+MAX_VENTANAS = 512 # Ventanas guardadas como maximo; al pasarse se fusionan de dos en dos
+FRACCION_VENTANA_FINAL = 0.5 # La ultima ventana, si tiene menos de esta fraccion de los ticks de una completa, se fusiona con la anterior
+MAX_TRAYECTORIA = 3600 # Poses de trayectoriaTotal que se conservan (un minuto a 60 fps)
+TIEMPO_MAXIMO_VUELTA = 600 # Segundos simulados por vuelta si no se indica la duracion, como en Simulacion.ejecutar
+SEGUNDOS_HORA = 3600.0
+
+EXPERTOS = {"expert": ExpertSystem, "fuzzy": FuzzySystem, "fuzzy-tabla": FuzzyTablaSystem, "rollout": RolloutSystem}
+
+
+def memoriaResidente():
+    """
+    Memoria residente (RSS) actual del proceso en bytes. En Linux se lee de /proc; en otros sistemas
+    se usa el maximo que da `resource`, que solo puede crecer.
+    """
+    try:
+        with open("/proc/self/statm") as fichero:
+            return int(fichero.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo if os.uname().sysname == "Darwin" else maximo * 1024
+
+
+def pendiente(x, y):
+    """
+    Pendiente de la recta de minimos cuadrados de y frente a x, o nan si hay menos de dos puntos.
+    """
+    if len(x) < 2:
+        return math.nan
+    return float(np.polyfit(np.asarray(x, dtype=float), np.asarray(y, dtype=float), 1)[0])
+
+
+class PruebaResistencia:
+    """
+    Ejecuta una Simulacion durante muchas vueltas al circuito o un tiempo simulado fijo y mide como
+    evolucionan la puntuacion y el tiempo de cada vuelta, la latencia de cada paso y la memoria del
+    proceso.
+
+    La latencia de los pasos se guarda en un array de una ventana (INTERVALO_VENTANA segundos
+    simulados) y al cerrarla se resume en media, percentil 99 y maximo, junto con la memoria
+    residente en ese momento. Cuando hay mas de `maxVentanas` ventanas se fusionan de dos en dos,
+    asi que la memoria que usa la propia medida no crece con la duracion: la serie pierde resolucion
+    pero sigue cubriendo toda la ejecucion. Al fusionar, el percentil 99 pasa a ser el mayor de los
+    dos, que es una cota superior. La ventana que queda a medias al terminar se fusiona con la
+    anterior si es corta (puede ser de un solo tick), para que no entre en las derivas como si
+    fuese una ventana completa.
+    """
+
+    def __init__(self, experto, objectiveSet, poseInicial=POSE_INICIAL, vueltas=None, duracion=None,
+                 timeLapse=PASO_NOMINAL, intervalo=INTERVALO_VENTANA, maxVentanas=MAX_VENTANAS):
+        """
+        Parámetros:
+            experto: Sistema experto que controla el robot
+            objectiveSet: Circuito (cerrado)
+            poseInicial: Pose de salida del robot
+            vueltas: Vueltas que se dan; None para dar vueltas hasta agotar `duracion`
+            duracion: Segundos simulados como maximo; por defecto TIEMPO_MAXIMO_VUELTA por vuelta, para
+                      que un robot que no consigue cerrar una vuelta no deje la prueba colgada
+            timeLapse: Paso de simulacion (ms)
+            intervalo: Segundos simulados de cada ventana
+            maxVentanas: Ventanas que se guardan como maximo
+        """
+        if vueltas is None and duracion is None:
+            raise ValueError("Hay que indicar las vueltas, la duracion o ambas")
+        self.simulacion = Simulacion(experto, objectiveSet, poseInicial, vueltas=vueltas, maxTrayectoria=MAX_TRAYECTORIA)
+        self.duracion = duracion if duracion is not None else vueltas * TIEMPO_MAXIMO_VUELTA
+        self.timeLapse = timeLapse
+        self.maxVentanas = maxVentanas
+
+        self.latencias = np.empty(max(1, math.ceil(intervalo * 1000.0 / timeLapse))) # Latencia (s) de los pasos de la ventana actual
+        self.ticksVentana = 0
+        self.ventanas = [] # [tiempo simulado al cerrar, ticks, media ms, p99 ms, maximo ms, memoria en bytes]
+        self.memoriaInicial = memoriaResidente()
+        self.tiempoReal = 0.0
+
+    def ejecutar(self):
+        """
+        Ejecuta la simulacion hasta terminar las vueltas o agotar la duracion.
+
+        Retorna:
+            dict: El resumen de `resumen`
+        """
+        simulacion = self.simulacion
+        inicio = time.perf_counter()
+        while not simulacion.terminado and simulacion.tiempoSimulado < self.duracion:
+            t0 = time.perf_counter()
+            simulacion.paso(self.timeLapse)
+            self.latencias[self.ticksVentana] = time.perf_counter() - t0
+            self.ticksVentana += 1
+            if self.ticksVentana == len(self.latencias):
+                self.cerrarVentana()
+        if self.ticksVentana > 0:
+            self.cerrarVentana(final=True)
+        self.tiempoReal = time.perf_counter() - inicio
+        return self.resumen()
+
+    @staticmethod
+    def fusionarVentanas(a, b):
+        """
+        Une dos ventanas consecutivas en una: la media se pondera con los ticks y el percentil 99 y el
+        maximo pasan a ser los mayores de las dos.
+        """
+        ticks = a[1] + b[1]
+        return [b[0], ticks, (a[2] * a[1] + b[2] * b[1]) / ticks, max(a[3], b[3]), max(a[4], b[4]), b[5]]
+
+    def cerrarVentana(self, final=False):
+        """
+        Resume la ventana actual y, si hay demasiadas, fusiona las guardadas de dos en dos.
+
+        Parámetros:
+            final: La ventana es la que queda a medias al terminar; si es corta se fusiona con la anterior
+        """
+        latencias = self.latencias[:self.ticksVentana] * 1000.0
+        ventana = [self.simulacion.tiempoSimulado, self.ticksVentana, float(latencias.mean()),
+                   float(np.percentile(latencias, 99)), float(latencias.max()), memoriaResidente()]
+        self.ticksVentana = 0
+        if final and self.ventanas and ventana[1] < FRACCION_VENTANA_FINAL * len(self.latencias):
+            self.ventanas[-1] = self.fusionarVentanas(self.ventanas[-1], ventana)
+            return
+        self.ventanas.append(ventana)
+        if len(self.ventanas) > self.maxVentanas:
+            fusionadas = [self.fusionarVentanas(a, b) for a, b in zip(self.ventanas[0::2], self.ventanas[1::2])]
+            if len(self.ventanas) % 2:
+                fusionadas.append(self.ventanas[-1])
+            self.ventanas = fusionadas
+
+    def resumen(self):
+        """
+        Resume la ejecucion.
+
+        Retorna:
+            dict: "vueltas" (puntuacion, tiempo) de cada vuelta, "ventanas" de latencia y memoria, y las
+                  derivas: del tiempo y la puntuacion por vuelta (sin la primera, que sale de la pose
+                  inicial y no del principio del circuito), de la latencia media y el p99 en ms por hora
+                  simulada y de la memoria en MiB por hora simulada
+        """
+        simulacion = self.simulacion
+        vueltas = list(simulacion.vueltasCompletadas)
+        regulares = vueltas[1:]
+        tiempos = np.array([ventana[0] for ventana in self.ventanas]) / SEGUNDOS_HORA
+        return {
+            "vueltas": vueltas,
+            "ventanas": self.ventanas,
+            "tiempoSimulado": simulacion.tiempoSimulado,
+            "tiempoReal": self.tiempoReal,
+            "puntuacion": simulacion.totalScore,
+            "terminado": simulacion.terminado,
+            "objetivoActual": simulacion.numPath, # Donde se ha quedado la vuelta sin terminar, si la hay
+            "derivaTiempoVuelta": pendiente(range(len(regulares)), [tiempo for _, tiempo in regulares]),
+            "derivaPuntuacionVuelta": pendiente(range(len(regulares)), [puntuacion for puntuacion, _ in regulares]),
+            "derivaLatenciaMedia": pendiente(tiempos, [ventana[2] for ventana in self.ventanas]),
+            "derivaLatenciaP99": pendiente(tiempos, [ventana[3] for ventana in self.ventanas]),
+            "derivaMemoria": pendiente(tiempos, [ventana[5] / 2**20 for ventana in self.ventanas]),
+            "memoriaInicial": self.memoriaInicial,
+            "memoriaFinal": self.ventanas[-1][5] if self.ventanas else self.memoriaInicial,
+        }
+
+
+def imprimirResumen(resumen):
+    vueltas = resumen["vueltas"]
+    referencia = vueltas[1][1] if len(vueltas) > 1 else None
+    print(f"{'vuelta':>6} {'puntuacion':>11} {'tiempo (s)':>11} {'diferencia':>11}")
+    for numero, (puntuacion, tiempo) in enumerate(vueltas, start=1):
+        diferencia = f"{tiempo - referencia:+11.3f}" if referencia is not None and numero > 1 else f"{'':>11}"
+        print(f"{numero:>6} {puntuacion:11.3f} {tiempo:11.3f} {diferencia}")
+    if not resumen["terminado"]:
+        print(f"Vuelta {len(vueltas) + 1} sin terminar, en el objetivo {resumen['objetivoActual']}")
+    print(f"{len(vueltas)} vueltas, {resumen['tiempoSimulado']:.1f} s simulados en {resumen['tiempoReal']:.1f} s, "
+          f"puntuacion total {resumen['puntuacion']:.3f}")
+    print(f"Deriva por vuelta: {resumen['derivaTiempoVuelta']:+.4f} s, {resumen['derivaPuntuacionVuelta']:+.4f} puntos")
+    ventanas = resumen["ventanas"]
+    if ventanas:
+        primera, ultima = ventanas[0], ventanas[-1]
+        print(f"Latencia por paso (media/p99/max ms): primera ventana {primera[2]:.3f}/{primera[3]:.3f}/{primera[4]:.3f}, "
+              f"ultima {ultima[2]:.3f}/{ultima[3]:.3f}/{ultima[4]:.3f}; "
+              f"deriva {resumen['derivaLatenciaMedia']:+.4f} ms (media) y {resumen['derivaLatenciaP99']:+.4f} ms (p99) por hora simulada")
+    print(f"Memoria residente: {resumen['memoriaInicial'] / 2**20:.1f} MiB al empezar, {resumen['memoriaFinal'] / 2**20:.1f} MiB al terminar, "
+          f"deriva {resumen['derivaMemoria']:+.2f} MiB por hora simulada")
+
+
+def exportarVentanas(resumen, ruta):
+    """
+    Guarda la serie de ventanas en un CSV.
+    """
+    with open(ruta, "w", newline="") as fichero:
+        escritor = csv.writer(fichero)
+        escritor.writerow(["tiempo", "ticks", "latenciaMediaMs", "latenciaP99Ms", "latenciaMaximaMs", "memoriaBytes"])
+        escritor.writerows(resumen["ventanas"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="./resistencia.py [expert|fuzzy|fuzzy-tabla|rollout] [--vueltas N] [--duracion S] [--csv RUTA]")
+    parser.add_argument("modo", choices=tuple(EXPERTOS))
+    parser.add_argument("--vueltas", type=int, help="vueltas al circuito")
+    parser.add_argument("--duracion", type=float, metavar="S", help="segundos simulados como maximo")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_VENTANA, metavar="S",
+                        help="segundos simulados de cada ventana de latencia y memoria")
+    parser.add_argument("--csv", metavar="RUTA", help="guarda la serie de latencia y memoria en un CSV")
+    args = parser.parse_args()
+    if args.vueltas is None and args.duracion is None:
+        parser.error("hay que indicar --vueltas, --duracion o ambas")
+
+    prueba = PruebaResistencia(EXPERTOS[args.modo](), crearCircuito(), vueltas=args.vueltas, duracion=args.duracion,
+                               intervalo=args.intervalo)
+    resumen = prueba.ejecutar()
+    imprimirResumen(resumen)
+    if args.csv:
+        exportarVentanas(resumen, args.csv)
@@ -4,12 +4,16 @@
 import numpy as np
 import math
 
+from obstaculos import ALCANCE_SENSOR
+
 RADIOROBOT = 0.15
 BGCOLOR = "black"
 VMAX = 3 #m/s
 WMAX = 1 #rad/s
 VACC = 1 #m/s2
 WACC = 0.5 #rad/s2
+NUM_RAYOS = 32 # Sensores de distancia repartidos alrededor del robot
+ANGULOS_SENSORES = np.arange(NUM_RAYOS) * (2 * math.pi / NUM_RAYOS) # Direccion de cada sensor respecto al heading (rad)
 
 
 class Robot:
@@ -23,6 +27,16 @@ class Robot:
         self.angularVel = 0 
         self.actualLinearVel = 0
         self.actualAngularVel = 0
+
+        self.mapa = None # MapaObstaculos opcional con el que se comprueban colisiones y se leen los sensores
+        self.colisiones = 0
+
+    def setMapa(self, mapa):
+        self.mapa = mapa
+
+    # Distancia al primer obstaculo en la direccion de cada sensor (ANGULOS_SENSORES), como mucho ALCANCE_SENSOR
+    def leerSensores(self):
+        return leerSensoresVectorizado(self.coordX, self.coordY, self.heading, self.mapa)
     
     def setPose(self, pose):
         self.coordX = pose[0]
@@ -32,6 +46,15 @@ class Robot:
     def getPose(self):
         return (self.coordX, self.coordY, self.heading, self.actualLinearVel, self.actualAngularVel)
 
+    # Estado completo del robot (pose, velocidades pedidas y reales y colisiones contadas) para poder restaurarlo con setEstado
+    def getEstado(self):
+        return (self.coordX, self.coordY, self.heading, self.linearVel, self.angularVel, self.actualLinearVel, self.actualAngularVel,
+                self.colisiones)
+
+    def setEstado(self, estado):
+        (self.coordX, self.coordY, self.heading, self.linearVel, self.angularVel, self.actualLinearVel, self.actualAngularVel,
+         self.colisiones) = estado
+
     def setVel(self, velocidades):
 
         self.linearVel = velocidades[0]
@@ -48,6 +71,30 @@ class Robot:
 
     #
     def updateDynamics(self, timelapse):
+        poseAnterior = (self.coordX, self.coordY, self.heading)
+        self.moverse(timelapse)
+        # Si el robot (un circulo de RADIOROBOT) toca un obstaculo en algun punto del recorrido del paso
+        # se queda donde estaba y se para
+        if self.mapa is not None and np.any(self.mapa.colision(*self.barrido(poseAnterior, timelapse), RADIOROBOT)):
+            self.coordX, self.coordY, self.heading = poseAnterior
+            self.actualLinearVel = 0
+            self.actualAngularVel = 0
+            self.colisiones += 1
+
+    # Puntos del arco recorrido desde poseAnterior en el ultimo paso, separados como mucho RADIOROBOT,
+    # para que con pasos largos el robot no atraviese obstaculos mas finos que lo que avanza en un paso.
+    # Durante el paso V y W reales son constantes, asi que cada punto se obtiene con la misma cuerda que
+    # usa updateDynamicsVectorizado; el ultimo es la pose nueva
+    def barrido(self, poseAnterior, timelapse):
+        timeSeconds = timelapse / 1000.0
+        muestras = max(int(math.ceil(abs(self.actualLinearVel) * timeSeconds / RADIOROBOT)), 1)
+        fracciones = np.arange(1, muestras + 1) / muestras
+        angulo = self.actualAngularVel * timeSeconds * fracciones if abs(self.actualAngularVel) > 0.000001 else np.zeros(muestras)
+        cuerda = self.actualLinearVel * timeSeconds * fracciones * np.sinc(angulo / (2 * math.pi))
+        direccionMedia = poseAnterior[2] * math.pi / 180 + angulo / 2
+        return poseAnterior[0] + cuerda * np.cos(direccionMedia), poseAnterior[1] + cuerda * np.sin(direccionMedia)
+
+    def moverse(self, timelapse):
         # Partimos de V y W
         # Actualizamos las velocidades si todavía no se ha llegado a la velocidad deseada!!!!!!
         timeSeconds = timelapse / 1000.0
@@ -107,3 +154,50 @@ class Robot:
             self.coordX = self.coordX + dist*math.cos(angleRad)
             self.coordY = self.coordY + dist*math.sin(angleRad)
 
+
+
+# Misma cinematica que Robot.updateDynamics pero aplicada a la vez sobre arrays de robots
+# (un elemento por candidato). Devuelve el nuevo estado (x, y, heading, V real, W real).
+def updateDynamicsVectorizado(coordX, coordY, heading, actualLinearVel, actualAngularVel, linearVel, angularVel, timelapse):
+    timeSeconds = timelapse / 1000.0
+
+    linearVel = np.clip(linearVel, -VMAX, VMAX)
+    angularVel = np.clip(angularVel, -WMAX, WMAX)
+
+    #Actualizamos velocidades (mismo orden de comprobaciones que la version escalar)
+    changeV = VACC * timeSeconds
+    changeW = WACC * timeSeconds
+    v = actualLinearVel
+    v = np.where(v < linearVel, np.minimum(v + changeV, VMAX), v)
+    v = np.where(v > linearVel, np.maximum(v - changeV, -VMAX), v)
+    v = np.where((linearVel == 0) & (np.abs(v) < changeV), 0.0, v)
+
+    w = actualAngularVel
+    w = np.where(w < angularVel, np.minimum(w + changeW, WMAX), w)
+    w = np.where(w > angularVel, np.maximum(w - changeW, -WMAX), w)
+    w = np.where((angularVel == 0) & (np.abs(w) < changeW), 0.0, w)
+
+    # Giro alrededor del ICC para los que tienen W y linea recta para el resto. La rotacion alrededor
+    # del ICC equivale a avanzar la cuerda del arco en la direccion media del giro, lo que permite
+    # tratar los dos casos con las mismas operaciones (con W = 0 la cuerda es la linea recta)
+    angulo = np.where(np.abs(w) > 0.000001, w * timeSeconds, 0.0)
+    cuerda = v * timeSeconds * np.sinc(angulo / (2 * math.pi))
+    direccionMedia = heading * math.pi / 180 + angulo / 2
+
+    nuevoX = coordX + cuerda * np.cos(direccionMedia)
+    nuevoY = coordY + cuerda * np.sin(direccionMedia)
+    nuevoHeading = heading + angulo * 180 / math.pi
+
+    return nuevoX, nuevoY, nuevoHeading, v, w
+
+
+# Lecturas de los sensores de distancia de varios robots a la vez: coordX, coordY y heading (en grados)
+# pueden ser arrays de n robots y el resultado tiene forma (n, NUM_RAYOS). Todos los rayos avanzan
+# juntos sobre el campo de distancias del mapa.
+def leerSensoresVectorizado(coordX, coordY, heading, mapa):
+    coordX = np.asarray(coordX, dtype=float)[..., None]
+    coordY = np.asarray(coordY, dtype=float)[..., None]
+    angulos = np.radians(np.asarray(heading, dtype=float))[..., None] + ANGULOS_SENSORES
+    if mapa is None:
+        return np.full(angulos.shape, ALCANCE_SENSOR)
+    return mapa.lanzarRayos(coordX, coordY, angulos, ALCANCE_SENSOR)
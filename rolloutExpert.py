@@ -0,0 +1,256 @@
+import numpy as np
+
+from robot import updateDynamicsVectorizado
+from puntuacion import puntuacionDistanciaVectorizada, inTriangleVectorizado, straightToPointDistanceNorm
+from seguimiento import SeguimientoObjetivos
+from registro import obtenerRegistro
+from configuracion import ConfiguracionRollout
+
+class RolloutSystem(SeguimientoObjetivos):
+    """
+    Sistema de control por simulacion anticipada (rollouts) para el robot.
+    En cada decision genera muchas secuencias candidatas de comandos (V, W), las simula todas a la vez
+    con la cinematica vectorizada del robot y elige la que mejor puntua segun la misma metrica que
+    `getSegmentScore` (y la penalizacion de `getTriangleScore` en los triangulos).
+    """
+
+    def __init__(self, config=None):
+        """
+        Inicializa el estado del controlador y precalcula la tabla de secuencias candidatas,
+        que es la misma en todas las decisiones.
+
+        Parámetros:
+            config: ConfiguracionRollout con los parametros de ajuste; por defecto la de configuracion.py
+        """
+        self.config = config if config is not None else ConfiguracionRollout()
+        self.objetivoAlcanzado = False
+        self.segmentoObjetivo = None
+        self.medioAlcanzado = False
+        self.segmento = 0 # Indica en que segmento se hubica, 0,5 ; 1,5 y 2,5 segmentos lineales -- 1;2;3 triangulos
+        self.indiceObjetivo = None # Posicion del objetivo actual en el circuito, la que indica Simulacion
+        self.posePrevia = None # Posicion (x, y) en la decision anterior, para comprobar las tolerancias sobre el tramo recorrido
+        self.fraccionCruce = None # Fraccion del ultimo tramo en la que se entro en la tolerancia del punto final
+        self.fraccionCruceMedio = None # Igual para el punto medio del triangulo
+
+        self.comandosV, self.comandosW = self.generarCandidatos()
+
+    def generarCandidatos(self):
+        """
+        Genera las secuencias candidatas de comandos.
+
+        Retorna:
+            tuple: dos arrays de forma (candidatos, HORIZONTE) con la fraccion de V maxima y la W de cada paso.
+
+        Explicación:
+            Cada candidato mantiene una W durante la primera mitad del horizonte y otra durante la segunda,
+            lo que permite representar giros que se enderezan (o que empiezan tarde). La W inicial, que es la
+            que se aplica, se reparte de forma cuadratica para tener mas resolucion cerca de 0. La V se guarda como
+            fraccion para poder aplicarla tanto a VMAX como a VMAX_TRIANGULO.
+        """
+        mitad = self.config.HORIZONTE // 2
+        # Rejilla mas densa cerca de W = 0 para poder hacer correcciones finas sobre la linea
+        u = np.linspace(-1.0, 1.0, self.config.NUM_W_INICIAL)
+        wInicial = self.config.WMAX * np.sign(u) * u * u
+        wFinal = np.linspace(-self.config.WMAX, self.config.WMAX, self.config.NUM_W_FINAL)
+        w1, w2, reducida = np.meshgrid(wInicial, wFinal, [False, True], indexing="ij")
+        w1, w2, reducida = w1.ravel(), w2.ravel(), reducida.ravel()
+
+        comandosW = np.empty((w1.size, self.config.HORIZONTE))
+        comandosW[:, :mitad] = w1[:, None]
+        comandosW[:, mitad:] = w2[:, None]
+        comandosV = np.repeat(reducida[:, None], self.config.HORIZONTE, axis=1)
+        return comandosV, comandosW
+
+    def setObjetivo(self, segmento, indice=None):
+        """
+        Establece un nuevo objetivo para el robot.
+
+        Parámetros:
+            segmento: Objetivo (segmento o triangulo)
+            indice: Posicion del objetivo en el circuito. Si no se indica se supone que los objetivos se
+                    fijan en orden y sin saltarse ninguno, y se deduce del numero de llamadas
+        """
+        self.objetivoAlcanzado = False
+        self.segmentoObjetivo = segmento
+        self.medioAlcanzado = False
+        if indice is None:
+            indice = int(self.segmento * 2)
+        self.indiceObjetivo = indice
+        self.segmento = (indice + 1) / 2 # 0.5, 1, 1.5... segun la posicion en el circuito
+        self.fraccionCruce = None
+        self.fraccionCruceMedio = None
+
+    def simularCandidatos(self, poseRobot, V):
+        """
+        Simula a la vez todas las secuencias candidatas partiendo de la pose actual.
+
+        Retorna:
+            tuple: arrays (candidatos, HORIZONTE) con las coordenadas x e y tras cada paso.
+        """
+        numCandidatos = self.comandosW.shape[0]
+        x = np.full(numCandidatos, float(poseRobot[0]))
+        y = np.full(numCandidatos, float(poseRobot[1]))
+        heading = np.full(numCandidatos, float(poseRobot[2]))
+        v = np.full(numCandidatos, float(poseRobot[3]))
+        w = np.full(numCandidatos, float(poseRobot[4]))
+        comandosV = np.where(self.comandosV, V - self.config.REDUCCION_V, V)
+
+        xs = np.empty((numCandidatos, self.config.HORIZONTE))
+        ys = np.empty((numCandidatos, self.config.HORIZONTE))
+        for paso in range(self.config.HORIZONTE):
+            x, y, heading, v, w = updateDynamicsVectorizado(
+                x, y, heading, v, w, comandosV[:, paso], self.comandosW[:, paso], self.config.PASO_ROLLOUT)
+            xs[:, paso] = x
+            ys[:, paso] = y
+        return xs, ys
+
+    def evaluarCandidatos(self, xs, ys, inicio, fin, tolerancia, esTriangulo, V):
+        """
+        Puntua las trayectorias simuladas respecto a la linea de referencia `inicio`-`fin`.
+
+        Parámetros:
+            xs, ys: Posiciones simuladas de cada candidato, de forma (candidatos, HORIZONTE)
+            inicio, fin: Extremos de la linea de referencia
+            tolerancia: Distancia a `fin` a partir de la cual se considera alcanzado
+            esTriangulo: Si la referencia es uno de los lados de un triangulo
+            V: Velocidad lineal con la que se valora el tiempo que queda tras alcanzar `fin`
+
+        Retorna:
+            np.array: Beneficio estimado de cada candidato (mayor es mejor)
+
+        Explicación:
+            - **Metrica de distancia**: en los segmentos cada paso suma lo mismo que sumaria una muestra en
+              `getSegmentScore`, escalado por el numero de frames que dura un paso simulado.
+            - **Avance**: lo que se acerca el candidato a `fin`, para premiar llegar antes (la puntuacion real se
+              divide por el tiempo). Los pasos posteriores a alcanzar `fin` cuentan como avance a velocidad maxima,
+              ya que el robot pasaria al siguiente objetivo.
+            - **Distancia lateral**: termino suave que acerca al robot a la linea cuando la metrica vale 0 (a mas de 3).
+            - **Triangulo**: cada muestra dentro del area resta, como en `getTriangleScore`.
+        """
+        framesPorPaso = self.config.PASO_ROLLOUT / 1000.0 * 60
+        pesoProgreso = self.config.PESO_PROGRESO_TRIANGULO if esTriangulo else self.config.PESO_PROGRESO
+
+        distanciaFin = np.hypot(xs - fin[0], ys - fin[1])
+        completado = np.logical_or.accumulate(distanciaFin <= tolerancia, axis=1)
+        activo = ~completado
+        # El paso en el que se alcanza el objetivo todavia cuenta como muestra
+        activo[:, 1:] |= completado[:, 1:] & ~completado[:, :-1]
+        activo[:, 0] = True
+
+        # Distancia al segmento (no a la recta), para no premiar seguir la prolongacion mas alla de `fin`
+        vector = fin - inicio
+        k = np.clip(((xs - inicio[0]) * vector[0] + (ys - inicio[1]) * vector[1]) / vector.dot(vector), 0.0, 1.0)
+        lateral = np.hypot(xs - (inicio[0] + k * vector[0]), ys - (inicio[1] + k * vector[1]))
+
+        distanciaFinal = np.where(completado[:, -1], 0.0, distanciaFin[:, -1])
+        pasosRestantes = (~activo).sum(axis=1)
+        avance = pasosRestantes * V * self.config.PASO_ROLLOUT / 1000.0 - distanciaFinal
+
+        beneficio = pesoProgreso * (avance - self.config.PESO_LATERAL * (lateral * activo).sum(axis=1))
+
+        if esTriangulo:
+            dentro = inTriangleVectorizado(np.array(self.segmentoObjetivo.getInicio()),
+                                           np.array(self.segmentoObjetivo.getMedio()),
+                                           np.array(self.segmentoObjetivo.getFin()), xs, ys)
+            beneficio -= self.config.PESO_TRIANGULO * (dentro & activo).sum(axis=1) * framesPorPaso
+        else:
+            metrica = puntuacionDistanciaVectorizada(inicio, fin, xs, ys)
+            beneficio += (metrica * activo).sum(axis=1) * framesPorPaso
+
+        return beneficio
+
+    def tomarDecision(self, poseRobot):
+        """
+        Toma una decisión sobre las velocidades de control simulando todas las secuencias candidatas.
+
+        Parámetros:
+            poseRobot: Pose actual del robot (x, y, theta en grados, V real, W real).
+
+        Retorna:
+            tuple: Primer comando (V, W) de la mejor secuencia candidata.
+        """
+        if self.segmentoObjetivo is None:
+            return (0, 0)
+
+        fin = np.array(self.segmentoObjetivo.getFin())
+        inicio = np.array(self.segmentoObjetivo.getInicio())
+
+        self.actualizarEstado(poseRobot, fin)
+
+        esTriangulo = self.segmentoObjetivo.getType() == 2
+        tolerancia = self.config.TOLERACION_FIN_SEGMENTO
+        if esTriangulo:
+            V = self.config.VMAX_TRIANGULO
+            medio = np.array(self.segmentoObjetivo.getMedio())
+            if not self.medioAlcanzado:
+                self.fraccionCruceMedio = self.comprobarCruce(poseRobot, medio, self.config.TOLERANCIA_MEDIO)
+                self.medioAlcanzado = self.fraccionCruceMedio is not None
+            # En los triangulos la referencia es primero el lado inicio-medio y despues medio-fin
+            if self.medioAlcanzado:
+                inicio = medio
+            else:
+                fin = medio
+                tolerancia = self.config.TOLERANCIA_MEDIO
+        else:
+            V = self.config.VMAX
+
+        self.posePrevia = (poseRobot[0], poseRobot[1])
+        xs, ys = self.simularCandidatos(poseRobot, V)
+        beneficio = self.evaluarCandidatos(xs, ys, inicio, fin, tolerancia, esTriangulo, V)
+        mejor = int(np.argmax(beneficio))
+
+        velocidad_lineal = V - self.config.REDUCCION_V if self.comandosV[mejor, 0] else V
+        velocidad_angular = float(self.comandosW[mejor, 0])
+        # Con horizontes cortos ningun candidato llega a la tolerancia y el mejor puede ser girar alrededor de `fin`
+        velocidad_lineal, velocidad_angular = self.limitarGiro(velocidad_lineal, velocidad_angular, poseRobot, fin, tolerancia)
+
+        if self.config.LOGS_TIEMPO_REAL:
+            dist = abs(straightToPointDistanceNorm(inicio, fin, poseRobot))
+            self.imprimirPuntuacion(dist, velocidad_lineal, velocidad_angular)
+
+        return velocidad_lineal, velocidad_angular
+
+    def imprimirPuntuacion(self, dist, velocidad_lineal, velocidad_angular):
+        """
+        Registra la distancia a la que esta el robot del segmento y las velocidades que se aplican.
+        El formato y la escritura se hacen en el hilo de fondo de `registro.py` para no frenar el bucle de control.
+        """
+        obtenerRegistro().registrar(dist, velocidad_lineal, velocidad_angular)
+
+    def sincronizar(self, poseRobot, comando, medioAlcanzado=False):
+        """
+        Registra la pose de un tick que ha decidido otro experto (ver SupervisorTiempoReal), para
+        que la comprobacion de cruce parta de la pose anterior. El comando no se guarda porque este
+        controlador no limita la aceleracion. `medioAlcanzado` indica si ese experto ya ha pasado por
+        el punto medio del triangulo (ver `sincronizarMedio`).
+        """
+        if self.segmentoObjetivo.getType() == 2:
+            self.sincronizarMedio(poseRobot, self.segmentoObjetivo.getMedio(), medioAlcanzado)
+        self.posePrevia = (poseRobot[0], poseRobot[1])
+
+    def getEstado(self):
+        """
+        Devuelve una tupla con el estado mutable del controlador para poder restaurarlo con `setEstado`.
+        La tabla de candidatos es constante y no se incluye.
+        """
+        return (self.objetivoAlcanzado, self.segmentoObjetivo, self.medioAlcanzado, self.segmento,
+                self.posePrevia, self.fraccionCruce, self.fraccionCruceMedio, self.indiceObjetivo)
+
+    def setEstado(self, estado):
+        """
+        Restaura un estado obtenido con `getEstado`.
+        """
+        (self.objetivoAlcanzado, self.segmentoObjetivo, self.medioAlcanzado, self.segmento,
+         self.posePrevia, self.fraccionCruce, self.fraccionCruceMedio, self.indiceObjetivo) = estado
+
+    def esObjetivoAlcanzado(self):
+        """
+        Devuelve si se ha alcanzado el objetivo.
+        """
+        return self.objetivoAlcanzado
+
+    def hayParteOptativa(self):
+        """
+        Indica si hay una parte optativa implementada.
+        """
+        return True
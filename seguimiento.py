@@ -0,0 +1,103 @@
+import math
+
+from geometria import cruceSegmentoCirculo
+
+class SeguimientoObjetivos:
+    """
+    Comportamiento comun de los sistemas expertos que recorren los objetivos del circuito uno tras
+    otro: la comprobacion de las tolerancias sobre el tramo recorrido en el ultimo paso, el reinicio
+    al empezar otra vuelta y la limitacion que evita quedarse dando vueltas alrededor del punto de
+    llegada.
+
+    La clase que lo usa tiene que definir `config` (con TOLERACION_FIN_SEGMENTO, TOLERANCIA_MEDIO y,
+    si usa `limitarGiro`, ANGULO_GIRO_CERRADO), `posePrevia`, `objetivoAlcanzado`, `fraccionCruce`,
+    `medioAlcanzado`, `segmento` e `indiceObjetivo`.
+    """
+
+    def reiniciarVuelta(self):
+        """
+        Prepara el experto para dar otra vuelta al circuito: el contador de segmento y las
+        proyecciones sobre el camino, que dependen de la posicion del objetivo en el circuito, vuelven
+        al principio. Se llama antes de fijar el primer objetivo de la nueva vuelta. Los sistemas
+        sin camino ni perfil no usan las proyecciones y se quedan en None.
+        """
+        self.segmento = 0
+        self.indiceObjetivo = None
+        self.sCamino = None
+        self.sPerfil = None
+
+    def comprobarCruce(self, poseRobot, centro, radio):
+        """
+        Comprueba si el tramo recorrido desde la decision anterior hasta `poseRobot` entra en el circulo de
+        centro `centro` y radio `radio`. Con pasos de simulacion largos el robot puede saltarse el circulo
+        entero entre dos poses, por eso no basta con mirar la pose actual.
+
+        Retorna:
+            float: Fraccion del tramo en la que se entra en el circulo, o None si no se alcanza
+        """
+        posicion = (poseRobot[0], poseRobot[1])
+        return cruceSegmentoCirculo(self.posePrevia or posicion, posicion, centro, radio)
+
+    def actualizarEstado(self, poseRobot, puntoFin):
+        """
+        Actualiza el estado del robot comprobando si el tramo recorrido desde la pose anterior pasa a menos de
+        la tolerancia del punto final del segmento.
+        """
+        fraccion = self.comprobarCruce(poseRobot, puntoFin, self.config.TOLERACION_FIN_SEGMENTO)
+        if fraccion is not None:
+            self.objetivoAlcanzado = True
+            self.fraccionCruce = fraccion
+
+    def esMedioAlcanzado(self):
+        """
+        Devuelve si se ha pasado ya por el punto medio del triangulo del objetivo actual.
+        """
+        return self.medioAlcanzado
+
+    def sincronizarMedio(self, poseRobot, medio, medioAlcanzado):
+        """
+        En un tick que ha decidido otro experto, da por alcanzado el punto medio del triangulo si ese
+        experto ya lo habia alcanzado o si el tramo recorrido pasa por `medio`, el punto medio que usa
+        este sistema. Los expertos no usan el mismo punto medio (el difuso lo extiende hacia fuera) y,
+        sin esto, al volver a decidir se daria la vuelta a buscar uno que ya ha quedado atras.
+        Se llama antes de actualizar `posePrevia`.
+        """
+        if not self.medioAlcanzado:
+            self.medioAlcanzado = medioAlcanzado or self.comprobarCruce(poseRobot, medio, self.config.TOLERANCIA_MEDIO) is not None
+
+    def limitarGiro(self, V, W, poseRobot, llegada, tolerancia, wGiro=None):
+        """
+        Evita que el robot se quede dando vueltas alrededor del punto de llegada.
+
+        Explicación:
+            Con una V y una W constantes el robot recorre una circunferencia de radio V/|W| tangente a su
+            rumbo. Si el punto de llegada queda dentro de ella, mas lejos del borde que la tolerancia,
+            el robot gira alrededor del punto sin alcanzarlo nunca: pasa si no llega alineado al final
+            del objetivo, con pasos de simulacion largos o al empezar otra vuelta. Mientras el punto
+            quede por delante (menos de ANGULO_GIRO_CERRADO) el robot se esta acercando y no se toca
+            nada; si queda a un lado o detras y dentro del giro se frena, manteniendo W, hasta que la
+            circunferencia pase por el punto: la tangente al rumbo que pasa por el tiene radio
+            d / (2 |sin(alfa)|), con d la distancia y alfa el angulo hasta el punto.
+
+        Parámetros:
+            wGiro: Velocidad angular con la que se mide el giro, si es mayor que |W|. Un sistema que
+                   todavia esta cerrando el giro (el experto sube W hasta WMAX) pasa la que va a
+                   alcanzar, para no frenar por un punto que el giro mas cerrado ya alcanza
+
+        Retorna:
+            tuple: (V, W) corregidas
+        """
+        x, y, theta = poseRobot[0], poseRobot[1], math.radians(poseRobot[2])
+        dx, dy = llegada[0] - x, llegada[1] - y
+        alfa = (math.atan2(dy, dx) - theta + math.pi) % (2 * math.pi) - math.pi
+        giro = abs(W) if wGiro is None else max(abs(W), wGiro)
+        if giro < 1e-6 or abs(alfa) < math.radians(self.config.ANGULO_GIRO_CERRADO):
+            return V, W
+        radio = V / giro
+        sentido = W if abs(W) >= 1e-6 else alfa # Sin giro todavia, el robot girara hacia el punto
+        centroX = x - math.copysign(radio, sentido) * math.sin(theta)
+        centroY = y + math.copysign(radio, sentido) * math.cos(theta)
+        if math.hypot(llegada[0] - centroX, llegada[1] - centroY) >= radio - tolerancia:
+            return V, W
+        radioNecesario = math.hypot(dx, dy) / (2 * abs(math.sin(alfa)))
+        return min(V, giro * radioNecesario), W
@@ -0,0 +1,131 @@
+import os
+import numpy as np
+
+from circuito import guardarCircuito
+
+TOLERANCIA_TRAYECTORIA = 0.05 # Desviacion maxima de la polilinea simplificada (m), medio pixel a escala 10
+MAX_PENDIENTES = 512 # Puntos que se acumulan como maximo antes de fijar un vertice
+
+
+def distanciaPuntosSegmento(puntos, a, b):
+    """
+    Distancia de cada fila de `puntos` al segmento `a`-`b` (no a la recta que lo contiene).
+    """
+    ab = b - a
+    longitud2 = ab.dot(ab)
+    if longitud2 == 0:
+        return np.hypot(puntos[:, 0] - a[0], puntos[:, 1] - a[1])
+    k = np.clip(((puntos[:, 0] - a[0]) * ab[0] + (puntos[:, 1] - a[1]) * ab[1]) / longitud2, 0.0, 1.0)
+    return np.hypot(puntos[:, 0] - (a[0] + k * ab[0]), puntos[:, 1] - (a[1] + k * ab[1]))
+
+
+def douglasPeucker(puntos, tolerancia=TOLERANCIA_TRAYECTORIA):
+    """
+    Simplifica una polilinea completa con el algoritmo de Douglas-Peucker.
+
+    Parámetros:
+        puntos: Array (n, 2) con los puntos de la polilinea
+        tolerancia: Distancia maxima permitida entre un punto eliminado y la polilinea resultante
+
+    Retorna:
+        np.array: Indices de los puntos que se conservan (siempre incluye el primero y el ultimo)
+    """
+    puntos = np.asarray(puntos, dtype=float)[:, 0:2]
+    if len(puntos) < 3:
+        return np.arange(len(puntos))
+
+    conservar = np.zeros(len(puntos), dtype=bool)
+    conservar[0] = conservar[-1] = True
+    pila = [(0, len(puntos) - 1)]
+    while pila:
+        inicio, fin = pila.pop()
+        if fin - inicio < 2:
+            continue
+        distancias = distanciaPuntosSegmento(puntos[inicio + 1:fin], puntos[inicio], puntos[fin])
+        peor = int(np.argmax(distancias))
+        if distancias[peor] > tolerancia:
+            indice = inicio + 1 + peor
+            conservar[indice] = True
+            pila.append((inicio, indice))
+            pila.append((indice, fin))
+    return np.flatnonzero(conservar)
+
+
+def rutaCircuito(rutaTrayectoria):
+    """
+    Fichero con el circuito de una trayectoria exportada: el mismo nombre con extension .circuito.json.
+    """
+    return os.path.splitext(rutaTrayectoria)[0] + ".circuito.json"
+
+
+class SimplificadorTrayectoria:
+    """
+    Simplificador incremental de la trayectoria del robot.
+
+    Recibe las poses según se van generando y mantiene una polilinea reducida en la que ningún
+    punto recibido se separa más de `tolerancia` de la polilinea. Usa una ventana abierta: los
+    puntos desde el último vértice fijado quedan pendientes mientras todos estén a menos de
+    `tolerancia` de la cuerda entre ese vértice y el punto nuevo; cuando alguno se sale, el punto
+    anterior pasa a ser vértice.
+    """
+
+    def __init__(self, tolerancia=TOLERANCIA_TRAYECTORIA, maxPendientes=MAX_PENDIENTES):
+        self.tolerancia = tolerancia
+        self.vertices = [] # Puntos (x, y) fijados de la polilinea
+        self.indices = [] # Posicion en la trayectoria original de cada vertice
+        self.pendientes = np.empty((maxPendientes, 2))
+        self.numPendientes = 0
+        self.numPuntos = 0
+
+    def agregar(self, punto):
+        """
+        Añade un punto (x, y, ...) de la trayectoria.
+        """
+        punto = (float(punto[0]), float(punto[1]))
+        indice = self.numPuntos
+        self.numPuntos += 1
+
+        if not self.vertices:
+            self.vertices.append(punto)
+            self.indices.append(indice)
+            return
+
+        if self.numPendientes > 0:
+            ancla = np.array(self.vertices[-1])
+            distancias = distanciaPuntosSegmento(self.pendientes[:self.numPendientes], ancla, np.array(punto))
+            if self.numPendientes == len(self.pendientes) or distancias.max() > self.tolerancia:
+                # El ultimo punto pendiente pasa a ser vertice y la ventana vuelve a empezar en el
+                self.vertices.append(tuple(self.pendientes[self.numPendientes - 1]))
+                self.indices.append(indice - 1)
+                self.numPendientes = 0
+
+        self.pendientes[self.numPendientes] = punto
+        self.numPendientes += 1
+
+    def getPuntos(self, hasta=None):
+        """
+        Devuelve la polilinea simplificada terminada en el último punto recibido.
+
+        Si se indica `hasta`, devuelve solo la parte que cubre los primeros `hasta` puntos de la
+        trayectoria original, terminada en el último vértice anterior.
+        """
+        if hasta is not None and hasta < self.numPuntos:
+            numVertices = np.searchsorted(self.indices, hasta)
+            return self.vertices[:numVertices]
+        if self.numPendientes > 0:
+            return self.vertices + [tuple(self.pendientes[self.numPendientes - 1])]
+        return list(self.vertices)
+
+    def exportar(self, ruta, objectiveSet=None):
+        """
+        Guarda la polilinea simplificada en un CSV con el índice original y las coordenadas de cada punto.
+        Si se indica `objectiveSet`, el circuito recorrido se guarda al lado (ver `rutaCircuito`).
+        """
+        if objectiveSet is not None:
+            guardarCircuito(objectiveSet, rutaCircuito(ruta))
+        puntos = self.getPuntos()
+        indices = self.indices + ([self.numPuntos - 1] if self.numPendientes > 0 else [])
+        with open(ruta, "w") as fichero:
+            fichero.write("indice,x,y\n")
+            for indice, (x, y) in zip(indices, puntos):
+                fichero.write(f"{indice},{x:.4f},{y:.4f}\n")
@@ -0,0 +1,225 @@
+import time
+from collections import namedtuple
+
+from robot import Robot
+from circuito import POSE_INICIAL
+from puntuacion import getSegmentScore, getTriangleScore, getSegmentScoreContinuo, getTriangleScoreContinuo, straightToPointDistanceNorm
+
+PASO_NOMINAL = 1000.0 / 60 # Duracion de un paso de simulacion a 60 fps (ms)
+
+# Foto del estado completo de una Simulacion (ver Simulacion.getEstado)
+EstadoSimulacion = namedtuple("EstadoSimulacion", [
+    "robot", "experto", "numPath", "trayectoria", "longitudTrayectoriaTotal",
+    "tiempoSimulado", "inicioObjetivo", "puntuaciones", "totalScore", "terminado",
+    "vueltasCompletadas", "inicioVuelta", "puntuacionInicioVuelta", "tiemposTrayectoria",
+])
+
+class Simulacion:
+    """
+    Bucle de control y fisica del robot separado del dibujado.
+
+    Cada llamada a `paso` hace lo mismo que una iteracion del bucle original de main.py: guarda la
+    pose, avanza la dinamica del robot, puntua el objetivo si se ha alcanzado y si no pide al
+    experto las nuevas velocidades. El tiempo de cada objetivo se mide con el reloj simulado (la
+    suma de los pasos), de forma que la puntuacion no depende de a que velocidad se ejecute.
+
+    El circuito es cerrado, asi que se pueden dar varias vueltas seguidas. Al terminar cada vuelta se
+    guardan su puntuacion y su tiempo en `vueltasCompletadas`, se vacian las puntuaciones de sus
+    objetivos y el experto vuelve a empezar por el primer objetivo. En ejecuciones largas
+    `maxTrayectoria` limita las poses que se guardan en `trayectoriaTotal`.
+
+    La puntuacion original suma una cantidad por cada pose guardada, asi que depende de cuantos pasos
+    se den por segundo. Con `puntuacionContinua` los objetivos se puntuan con las versiones continuas
+    de puntuacion.py, que integran a lo largo del camino entre poses con el instante de cada una, y
+    la puntuacion es practicamente la misma con pasos de 1/60 s que con pasos mas largos.
+    """
+
+    def __init__(self, experto, objectiveSet, poseInicial=POSE_INICIAL, telemetria=None, vueltas=1, maxTrayectoria=None,
+                 puntuacionContinua=False):
+        """
+        Parámetros:
+            experto: Sistema experto que controla el robot
+            objectiveSet: Lista de objetivos del circuito
+            poseInicial: Pose (x, y, heading) de salida del robot
+            telemetria: EmisorTelemetria opcional al que se publica cada paso
+            vueltas: Vueltas al circuito antes de terminar; None para no terminar nunca
+            maxTrayectoria: Poses que se conservan como minimo en `trayectoriaTotal` (las mas
+                            recientes); None las guarda todas
+            puntuacionContinua: Puntuar integrando entre poses en lugar de sumar una cantidad por pose
+        """
+        self.robot = Robot()
+        self.robot.setPose(poseInicial)
+        self.experto = experto
+        self.objectiveSet = objectiveSet
+        self.numPath = 0
+        self.optativo = experto.hayParteOptativa()
+        self.experto.setObjetivo(objectiveSet[self.numPath], self.numPath)
+
+        self.trayectoria = [] # Poses del objetivo actual, se vacia al puntuarlo
+        self.tiemposTrayectoria = [] # Instante simulado (s) de cada pose de `trayectoria`
+        self.puntuacionContinua = puntuacionContinua
+        self.trayectoriaTotal = []
+        self.maxTrayectoria = maxTrayectoria
+        self.posesRecortadas = 0 # Poses borradas del principio de trayectoriaTotal
+        self.tiempoSimulado = 0.0 # Segundos simulados desde el inicio
+        self.inicioObjetivo = 0.0 # Instante simulado en el que empezo el objetivo actual
+        self.puntuaciones = [] # (puntuacion, puntuacion de distancia, tiempo) de cada objetivo
+        self.totalScore = 0
+        self.terminado = False
+        self.telemetria = telemetria
+        self.tiemposFase = [0.0, 0.0, 0.0] # Duracion (ms) de control, fisica y puntuacion en el ultimo paso
+        self.vueltas = vueltas
+        self.vueltasCompletadas = [] # (puntuacion, tiempo) de cada vuelta terminada
+        self.inicioVuelta = 0.0 # Instante simulado en el que empezo la vuelta actual
+        self.puntuacionInicioVuelta = 0.0 # Puntuacion total al empezar la vuelta actual
+
+    def paso(self, timeLapse):
+        """
+        Avanza la simulacion `timeLapse` milisegundos.
+
+        Retorna:
+            tuple: La puntuacion del objetivo si se ha completado en este paso, None en otro caso
+        """
+        if self.terminado:
+            return None
+
+        poseActual = self.robot.getPose()
+        self.trayectoria.append(poseActual)
+        self.tiemposTrayectoria.append(self.tiempoSimulado)
+        self.trayectoriaTotal.append(poseActual)
+        if self.maxTrayectoria is not None and len(self.trayectoriaTotal) >= 2 * self.maxTrayectoria:
+            # Se recorta de golpe la mitad para que el coste por paso sea constante
+            self.posesRecortadas += len(self.trayectoriaTotal) - self.maxTrayectoria
+            del self.trayectoriaTotal[:-self.maxTrayectoria]
+
+        t0 = time.perf_counter()
+        self.robot.updateDynamics(timeLapse)
+        self.tiempoSimulado += timeLapse / 1000.0
+        t1 = time.perf_counter()
+
+        segmentScore = None
+        tControl = 0.0
+        if self.experto.esObjetivoAlcanzado():
+            if self.numPath >= len(self.objectiveSet):
+                self.robot.setVel((0, 0))
+                self.terminado = True
+            else:
+                segmentScore = self.puntuarObjetivo()
+                self.numPath += 1
+                if self.numPath < len(self.objectiveSet) and self.objectiveSet[self.numPath].getType() == 2 and not self.optativo:
+                    self.numPath += 1
+                if self.numPath >= len(self.objectiveSet):
+                    self.cerrarVuelta()
+                if self.numPath < len(self.objectiveSet):
+                    self.experto.setObjetivo(self.objectiveSet[self.numPath], self.numPath)
+            tPuntuacion = time.perf_counter() - t1
+        else:
+            velocidades = self.experto.tomarDecision(self.robot.getPose())
+            self.robot.setVel(velocidades)
+            tControl = time.perf_counter() - t1
+            tPuntuacion = 0.0
+        self.tiemposFase[:] = (tControl * 1000.0, (t1 - t0) * 1000.0, tPuntuacion * 1000.0)
+
+        if self.telemetria is not None:
+            self.publicarTelemetria()
+        return segmentScore
+
+    def publicarTelemetria(self):
+        """
+        Publica el estado tras el ultimo paso: pose, comando, distancia al segmento del objetivo
+        actual, puntuacion acumulada y tiempos de las fases.
+        """
+        pose = self.robot.getPose()
+        objetivo = self.objectiveSet[min(self.numPath, len(self.objectiveSet) - 1)]
+        distancia = abs(straightToPointDistanceNorm(objetivo.getInicio(), objetivo.getFin(), pose))
+        self.telemetria.publicar(self.tiempoSimulado, self.numPath, pose, (self.robot.linearVel, self.robot.angularVel),
+                                 distancia, self.totalScore, self.tiemposFase)
+
+    def puntuarObjetivo(self):
+        """
+        Puntua el objetivo actual con las poses recorridas desde que empezo y reinicia el contador.
+        """
+        elapsedTime = self.tiempoSimulado - self.inicioObjetivo
+        objetivo = self.objectiveSet[self.numPath]
+        if self.puntuacionContinua:
+            # El camino se cierra con la pose actual, asi que cubre todo el tiempo del objetivo
+            posiciones = self.trayectoria + [self.robot.getPose()]
+            tiempos = self.tiemposTrayectoria + [self.tiempoSimulado]
+            if objetivo.getType() == 1:
+                segmentScore = getSegmentScoreContinuo(objetivo, posiciones, tiempos, elapsedTime)
+            else:
+                segmentScore = getTriangleScoreContinuo(objetivo, posiciones, tiempos, elapsedTime)
+        elif objetivo.getType() == 1:
+            segmentScore = getSegmentScore(objetivo, self.trayectoria, elapsedTime)
+        else:
+            segmentScore = getTriangleScore(objetivo, self.trayectoria, elapsedTime)
+        self.trayectoria.clear()
+        self.tiemposTrayectoria.clear()
+        self.totalScore += segmentScore[0]
+        self.puntuaciones.append(segmentScore)
+        self.inicioObjetivo = self.tiempoSimulado
+        return segmentScore
+
+    def cerrarVuelta(self):
+        """
+        Guarda la puntuacion y el tiempo de la vuelta que acaba de terminar y, si quedan vueltas,
+        vuelve al primer objetivo. Las puntuaciones por objetivo de la vuelta se descartan para que la
+        memoria no crezca con el numero de vueltas.
+        """
+        self.vueltasCompletadas.append((self.totalScore - self.puntuacionInicioVuelta, self.tiempoSimulado - self.inicioVuelta))
+        self.inicioVuelta = self.tiempoSimulado
+        self.puntuacionInicioVuelta = self.totalScore
+        if self.vueltas is None or len(self.vueltasCompletadas) < self.vueltas:
+            self.numPath = 0
+            self.puntuaciones.clear()
+            self.experto.reiniciarVuelta()
+
+    def getEstado(self):
+        """
+        Devuelve una foto inmutable del estado de la simulacion: robot, experto, objetivo actual y
+        acumuladores de puntuacion. Sirve para volver a un punto del recorrido (por ejemplo antes de
+        un triangulo) y probar alternativas sin empezar desde el principio.
+
+        Las poses son tuplas, asi que guardar la trayectoria del objetivo actual solo copia referencias.
+        De `trayectoriaTotal`, que solo se usa para dibujar, se guarda la longitud (contando las
+        poses recortadas).
+        """
+        return EstadoSimulacion(
+            self.robot.getEstado(), self.experto.getEstado(), self.numPath, tuple(self.trayectoria),
+            self.posesRecortadas + len(self.trayectoriaTotal), self.tiempoSimulado, self.inicioObjetivo,
+            tuple(self.puntuaciones), self.totalScore, self.terminado,
+            tuple(self.vueltasCompletadas), self.inicioVuelta, self.puntuacionInicioVuelta,
+            tuple(self.tiemposTrayectoria),
+        )
+
+    def setEstado(self, estado):
+        """
+        Restaura un estado obtenido con `getEstado`. La trayectoria total se recorta a la longitud
+        que tenia en ese momento.
+        """
+        self.robot.setEstado(estado.robot)
+        self.experto.setEstado(estado.experto)
+        self.numPath = estado.numPath
+        self.trayectoria[:] = estado.trayectoria
+        del self.trayectoriaTotal[max(estado.longitudTrayectoriaTotal - self.posesRecortadas, 0):]
+        self.tiempoSimulado = estado.tiempoSimulado
+        self.inicioObjetivo = estado.inicioObjetivo
+        self.puntuaciones[:] = estado.puntuaciones
+        self.totalScore = estado.totalScore
+        self.terminado = estado.terminado
+        self.vueltasCompletadas[:] = estado.vueltasCompletadas
+        self.inicioVuelta = estado.inicioVuelta
+        self.puntuacionInicioVuelta = estado.puntuacionInicioVuelta
+        self.tiemposTrayectoria[:] = estado.tiemposTrayectoria
+
+    def ejecutar(self, timeLapse=PASO_NOMINAL, tiempoMaximo=600):
+        """
+        Ejecuta la simulacion sin ventana, con pasos fijos, hasta terminar las vueltas al circuito o
+        agotar `tiempoMaximo` segundos simulados.
+
+        Retorna:
+            float: La puntuacion total
+        """
+        while not self.terminado and self.tiempoSimulado < tiempoMaximo:
+            self.paso(timeLapse)
+        return self.totalScore
@@ -0,0 +1,238 @@
+import math
+import random
+import argparse
+import dataclasses
+import numpy as np
+from multiprocessing import Pool
+
+from circuito import crearCircuito, POSE_INICIAL
+from simulacion import Simulacion, PASO_NOMINAL
+from cacheResultados import CacheResultados, TIEMPO_MAXIMO, DIRECTORIO_CACHE
+from expertSystem import ExpertSystem
+from fuzzyExpert import FuzzySystem
+from fuzzyTabla import FuzzyTablaSystem
+
+CANDIDATOS = 27 # Configuraciones que se prueban en la primera ronda, contando la de por defecto
+ETA = 3 # En cada ronda pasa 1/ETA de los candidatos y el prefijo del circuito se multiplica por ETA
+RONDAS = 3 # Rondas de la eliminacion; la ultima siempre recorre el circuito entero
+DECIMALES = 3 # Los valores muestreados se redondean para que las configuraciones se lean bien
+
+# Rangos (minimo, maximo) de los parametros que se ajustan en cada sistema. En los parametros que son
+# tuplas de pares (segmento, valor), como FACTORES_ANTICIPACION, se muestrea cada valor por separado.
+RANGOS_EXPERTO = {
+    "VMAX": (2.5, 3.0),
+    "VMAX_TRIANGULO": (2.5, 3.0),
+    "FACTORES_ANTICIPACION": (1.2, 2.0),
+    "FACT_ANTICIPACION_OTROS": (1.0, 2.0),
+    "TOLERACION_FIN_SEGMENTO": (0.3, 1.0),
+    "TOLERANCIA_MEDIO": (0.5, 2.0),
+}
+RANGOS_FUZZY = {
+    "VMAX": (2.5, 3.0),
+    "VMAX_TRIANGULO": (2.5, 3.0),
+    "WMAX": (0.6, 1.0),
+    "TOLERACION_FIN_SEGMENTO": (0.3, 1.0),
+    "TOLERANCIA_MEDIO": (1.0, 4.0),
+}
+
+SISTEMAS = {
+    "expert": (ExpertSystem, RANGOS_EXPERTO),
+    "fuzzy": (FuzzySystem, RANGOS_FUZZY),
+    "fuzzy-tabla": (FuzzyTablaSystem, RANGOS_FUZZY),
+}
+
+
+def muestrear(configBase, rangos, rng):
+    """
+    Configuracion aleatoria: cada parametro de `rangos` se muestrea uniformemente en su rango y el
+    resto se queda como en `configBase`.
+    """
+    cambios = {}
+    for nombre, (minimo, maximo) in rangos.items():
+        actual = getattr(configBase, nombre)
+        if isinstance(actual, tuple):
+            cambios[nombre] = tuple((clave, round(float(rng.uniform(minimo, maximo)), DECIMALES)) for clave, _ in actual)
+        else:
+            cambios[nombre] = round(float(rng.uniform(minimo, maximo)), DECIMALES)
+    return dataclasses.replace(configBase, **cambios)
+
+
+def nivelesFidelidad(numObjetivos, rondas=RONDAS, eta=ETA):
+    """
+    Numero de objetivos del circuito que se recorren en cada ronda: el circuito entero en la ultima
+    y ETA veces menos en cada una de las anteriores, con un objetivo como minimo.
+
+    Con 6 objetivos, 3 rondas y ETA=3 da (1, 2, 6).
+    """
+    niveles = sorted({max(1, round(numObjetivos / eta ** i)) for i in range(rondas)})
+    return tuple(niveles)
+
+
+def avanzarCandidato(argumentos):
+    """
+    Trabajo de cada proceso: sigue la simulacion de un candidato hasta puntuar los primeros
+    `objetivos` objetivos del circuito. Si el candidato es nuevo se crea la simulacion con su
+    configuracion; si ya habia pasado una ronda se continua la simulacion que devolvio esa ronda,
+    asi que los objetivos ya recorridos no se vuelven a simular.
+
+    Retorna:
+        tuple: (puntuacion acumulada, segundos simulados en esta llamada, simulacion)
+    """
+    claseExperto, config, simulacion, objetivos, semilla = argumentos
+    if simulacion is None:
+        random.seed(semilla)
+        np.random.seed(semilla)
+        simulacion = Simulacion(claseExperto(config), crearCircuito(), POSE_INICIAL, maxTrayectoria=1)
+    objectiveSet = simulacion.objectiveSet
+    # Mismo tiempo por objetivo que una evaluacion completa, para no cortar antes a los candidatos lentos
+    tiempoMaximo = TIEMPO_MAXIMO * objetivos / len(objectiveSet)
+    inicio = simulacion.tiempoSimulado
+    while len(simulacion.puntuaciones) < objetivos and not simulacion.terminado and simulacion.tiempoSimulado < tiempoMaximo:
+        simulacion.paso(PASO_NOMINAL)
+    return simulacion.totalScore, simulacion.tiempoSimulado - inicio, simulacion
+
+
+def evaluarCandidato(argumentos):
+    """
+    Trabajo de cada proceso en la busqueda exhaustiva: recorre el circuito entero con un candidato a
+    traves de CacheResultados, asi que si esa configuracion ya se habia evaluado (en otra busqueda o
+    con cacheResultados.py) se lee en lugar de simularla.
+
+    Retorna:
+        tuple: (resultado de CacheResultados.evaluar, True si se ha leido de la cache)
+    """
+    claseExperto, config, semilla, directorioCache = argumentos
+    cache = CacheResultados(directorioCache)
+    resultado = cache.evaluar(claseExperto, config, semilla=semilla)
+    return resultado, cache.aciertos > 0
+
+
+class Sintonizador:
+    """
+    Busca una configuracion de un sistema experto por eliminacion sucesiva (successive halving).
+
+    En lugar de recorrer el circuito entero con cada candidato, la primera ronda lleva todos los
+    candidatos solo hasta los primeros objetivos, y en cada ronda siguiente la fraccion 1/ETA mejor
+    continua su simulacion hasta un prefijo ETA veces mas largo, hasta que los que quedan terminan
+    el circuito. Un candidato malo suele notarse ya en el primer segmento, asi que casi todo el
+    tiempo de simulacion se dedica a los buenos, y como los promocionados continuan donde se
+    quedaron, ningun objetivo se simula dos veces. Los candidatos de cada ronda se simulan en
+    paralelo con un Pool; las simulaciones viajan entre rondas serializadas con pickle.
+
+    La puntuacion en un prefijo es la suma de las puntuaciones de sus objetivos, la misma que
+    llevaria acumulada el candidato en el circuito entero al terminar esos objetivos.
+    """
+
+    def __init__(self, claseExperto, rangos, candidatos=CANDIDATOS, eta=ETA, rondas=RONDAS, semilla=0, procesos=None,
+                 directorioCache=DIRECTORIO_CACHE):
+        """
+        Parámetros:
+            claseExperto: Clase del sistema experto (ExpertSystem, FuzzySystem...)
+            rangos: Diccionario {parametro: (minimo, maximo)} de los parametros que se ajustan
+            candidatos: Configuraciones de la primera ronda; la primera es la de por defecto
+            eta: Factor de eliminacion y de alargamiento del prefijo entre rondas
+            rondas: Numero de rondas
+            semilla: Semilla del muestreo de candidatos y de las simulaciones
+            procesos: Procesos en paralelo (por defecto uno por nucleo)
+            directorioCache: Directorio de CacheResultados para las evaluaciones del circuito entero
+        """
+        self.claseExperto = claseExperto
+        self.configBase = claseExperto().config
+        self.rangos = rangos
+        self.eta = eta
+        self.semilla = semilla
+        self.procesos = procesos
+        self.directorioCache = directorioCache
+        self.numObjetivos = len(crearCircuito())
+        self.niveles = nivelesFidelidad(self.numObjetivos, rondas, eta)
+
+        rng = np.random.default_rng(semilla)
+        self.candidatos = [self.configBase] + [muestrear(self.configBase, rangos, rng) for _ in range(candidatos - 1)]
+        self.rondas = [] # (objetivos, candidatos simulados, mejor puntuacion, segundos simulados)
+        self.tiempoSimulado = 0.0 # Segundos simulados en total entre todas las rondas
+
+    def avanzar(self, pool, candidatos, simulaciones, objetivos):
+        """
+        Lleva en paralelo cada candidato hasta los primeros `objetivos` objetivos, continuando su
+        simulacion si ya tenia una (None si no).
+
+        Retorna:
+            list: (puntuacion, segundos simulados, simulacion) de cada candidato, en el mismo orden
+        """
+        return pool.map(avanzarCandidato, [(self.claseExperto, config, simulacion, objetivos, self.semilla)
+                                           for config, simulacion in zip(candidatos, simulaciones)])
+
+    def ejecutar(self):
+        """
+        Ejecuta todas las rondas.
+
+        Retorna:
+            tuple: (mejor configuracion, su puntuacion en el circuito entero)
+        """
+        supervivientes = list(self.candidatos)
+        simulaciones = [None] * len(supervivientes)
+        with Pool(self.procesos) as pool:
+            for numero, objetivos in enumerate(self.niveles):
+                resultados = self.avanzar(pool, supervivientes, simulaciones, objetivos)
+                tiempo = sum(resultado[1] for resultado in resultados)
+                self.tiempoSimulado += tiempo
+                # Orden estable: a igualdad de puntuacion se queda el que se muestreo antes
+                orden = sorted(range(len(supervivientes)), key=lambda i: -resultados[i][0])
+                self.rondas.append((objetivos, len(supervivientes), resultados[orden[0]][0], tiempo))
+                if numero == len(self.niveles) - 1:
+                    return supervivientes[orden[0]], resultados[orden[0]][0]
+                orden = orden[:max(1, math.ceil(len(supervivientes) / self.eta))]
+                supervivientes = [supervivientes[i] for i in orden]
+                simulaciones = [resultados[i][2] for i in orden]
+
+    def exhaustivo(self):
+        """
+        Recorre el circuito entero con todos los candidatos, como referencia para comparar. Cada
+        evaluacion pasa por CacheResultados, asi que repetir la comparacion no vuelve a simular.
+
+        Retorna:
+            tuple: (mejor configuracion, su puntuacion, segundos de simulacion que cuesta la busqueda
+                    aunque se lean de la cache, candidatos leidos de la cache)
+        """
+        with Pool(self.procesos) as pool:
+            resultados = pool.map(evaluarCandidato, [(self.claseExperto, config, self.semilla, self.directorioCache)
+                                                     for config in self.candidatos])
+        mejor = max(range(len(resultados)), key=lambda i: (resultados[i][0]["puntuacion"], -i))
+        return (self.candidatos[mejor], resultados[mejor][0]["puntuacion"], sum(resultado["tiempo"] for resultado, _ in resultados),
+                sum(enCache for _, enCache in resultados))
+
+    def cambios(self, config):
+        """
+        Parametros de `config` que son distintos de los de la configuracion por defecto.
+        """
+        return {campo.name: getattr(config, campo.name) for campo in dataclasses.fields(config)
+                if getattr(config, campo.name) != getattr(self.configBase, campo.name)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="./sintonizador.py [expert|fuzzy|fuzzy-tabla] [--candidatos N] [--eta N] [--rondas N] [--comparar]")
+    parser.add_argument("modo", choices=tuple(SISTEMAS))
+    parser.add_argument("--candidatos", type=int, default=CANDIDATOS, help="configuraciones de la primera ronda")
+    parser.add_argument("--eta", type=int, default=ETA, help="factor de eliminacion entre rondas")
+    parser.add_argument("--rondas", type=int, default=RONDAS, help="numero de rondas")
+    parser.add_argument("--semilla", type=int, default=0, help="semilla del muestreo de candidatos")
+    parser.add_argument("--procesos", type=int, help="procesos en paralelo (por defecto uno por nucleo)")
+    parser.add_argument("--comparar", action="store_true",
+                        help="evalua tambien todos los candidatos en el circuito entero para comparar")
+    args = parser.parse_args()
+
+    claseExperto, rangos = SISTEMAS[args.modo]
+    sintonizador = Sintonizador(claseExperto, rangos, max(args.candidatos, 1), max(args.eta, 2), max(args.rondas, 1),
+                                args.semilla, args.procesos)
+    mejor, puntuacion = sintonizador.ejecutar()
+    for numero, (objetivos, evaluados, mejorRonda, tiempo) in enumerate(sintonizador.rondas, start=1):
+        print(f"Ronda {numero}: {evaluados} candidatos hasta el objetivo {objetivos} de {sintonizador.numObjetivos}, "
+              f"mejor {mejorRonda:.3f}, {tiempo:.0f} s simulados")
+    print(f"Mejor configuracion: {puntuacion:.3f} puntos, cambios {sintonizador.cambios(mejor)}")
+    print(f"Tiempo simulado: {sintonizador.tiempoSimulado:.0f} s")
+    if args.comparar:
+        mejorExhaustivo, puntuacionExhaustiva, tiempoExhaustivo, enCache = sintonizador.exhaustivo()
+        print(f"Exhaustivo: {puntuacionExhaustiva:.3f} puntos con {tiempoExhaustivo:.0f} s simulados "
+              f"({sintonizador.tiempoSimulado / tiempoExhaustivo:.0%} de tiempo con la eliminacion sucesiva, "
+              f"{enCache} de {len(sintonizador.candidatos)} candidatos leidos de la cache), "
+              f"cambios {sintonizador.cambios(mejorExhaustivo)}")
@@ -0,0 +1,211 @@
+import time
+
+from configuracion import ConfiguracionSupervisor
+
+class SupervisorTiempoReal:
+    """
+    Supervisor de plazos alrededor de un sistema experto.
+
+    Mide la latencia de cada decision del experto (media movil exponencial y desviacion) y, cuando
+    la estimacion pesimista supera el presupuesto de tiempo por tick, resuelve los ticks siguientes
+    con una politica mas barata: el comando anterior o un sistema experto de respaldo. Mientras esta
+    degradado vuelve a probar el experto principal cada INTERVALO_SONDEO ticks, y se recupera cuando
+    han pasado al menos TICKS_MINIMOS_DEGRADADO ticks y los ultimos SONDEOS_RECUPERACION sondeos han
+    quedado con margen por debajo del presupuesto. Tiene la misma interfaz que los sistemas expertos,
+    asi que se puede usar en su lugar en main.py o en una Simulacion.
+
+    Cada cambio de un experto a otro a mitad de objetivo cuesta puntos: los dos siguen trayectorias
+    distintas y el que entra tiene que corregir lo que ha hecho el otro. Por eso, con un experto de
+    respaldo, este conduce hasta el final del objetivo en el que se ha degradado (los sondeos solo
+    miden al principal) y la vuelta al principal se hace en `setObjetivo`. Repitiendo el comando
+    anterior no se puede esperar tanto, y el comando del sondeo se aplica y la recuperacion es inmediata.
+    """
+
+    def __init__(self, experto, respaldo=None, presupuestoMs=None, config=None):
+        """
+        Parámetros:
+            experto: Sistema experto principal
+            respaldo: Sistema experto barato para los ticks degradados; si es None se repite el comando anterior
+            presupuestoMs: Presupuesto por tick en milisegundos (PRESUPUESTO_MS de la configuracion si no se indica)
+            config: ConfiguracionSupervisor; por defecto la de configuracion.py
+        """
+        self.config = config if config is not None else ConfiguracionSupervisor()
+        self.experto = experto
+        self.respaldo = respaldo
+        self.presupuesto = (presupuestoMs if presupuestoMs is not None else self.config.PRESUPUESTO_MS) / 1000.0
+
+        self.latenciaMedia = 0.0  # Latencia media del experto principal (s)
+        self.latenciaDesviacion = 0.0  # Desviacion media de la latencia del experto principal (s)
+        self.latenciaRespaldo = 0.0  # Latencia media de la politica de respaldo (s)
+        self.degradado = False
+        self.ticksDesdeSondeo = 0
+        self.ticksEnDegradado = 0  # Ticks desde la ultima degradacion
+        self.sondeosBajoPresupuesto = 0  # Sondeos seguidos por debajo de FACTOR_RECUPERACION del presupuesto
+        self.ultimoComando = (0, 0)
+
+        self.ticks = 0
+        self.ticksDegradados = 0
+        self.degradaciones = 0  # Veces que se ha pasado de modo normal a degradado
+        self.recuperaciones = 0
+
+    def setObjetivo(self, segmento, indice=None):
+        """
+        Establece el nuevo objetivo, que ocupa la posicion `indice` del circuito, en el experto
+        principal y en el de respaldo. Es el momento en que el experto de respaldo devuelve el
+        control al principal, si este ya puede recuperarse.
+        """
+        if self.puedeRecuperarse():
+            self.recuperar()
+        self.experto.setObjetivo(segmento, indice)
+        if self.respaldo is not None:
+            self.respaldo.setObjetivo(segmento, indice)
+
+    def reiniciarVuelta(self):
+        """
+        Prepara el experto principal y el de respaldo para dar otra vuelta al circuito.
+        """
+        self.experto.reiniciarVuelta()
+        if self.respaldo is not None:
+            self.respaldo.reiniciarVuelta()
+
+    def enRiesgo(self):
+        """
+        Indica si la latencia estimada del experto principal (media mas FACTOR_DESVIACION desviaciones)
+        supera el presupuesto.
+        """
+        return self.latenciaMedia + self.config.FACTOR_DESVIACION * self.latenciaDesviacion > self.presupuesto
+
+    def puedeRecuperarse(self):
+        """
+        Indica si, estando degradado, ya se puede volver al experto principal: han pasado
+        TICKS_MINIMOS_DEGRADADO ticks y los ultimos SONDEOS_RECUPERACION sondeos han ido bien.
+        """
+        return (self.degradado and self.ticksEnDegradado >= self.config.TICKS_MINIMOS_DEGRADADO
+                and self.sondeosBajoPresupuesto >= self.config.SONDEOS_RECUPERACION)
+
+    def recuperar(self):
+        """
+        Vuelve al experto principal.
+        """
+        self.degradado = False
+        self.recuperaciones += 1
+
+    def medirLatencia(self, latencia):
+        """
+        Actualiza la media movil y la desviacion de la latencia del experto principal y, si no hay
+        experto de respaldo, el modo del supervisor.
+        """
+        alfa = self.config.ALFA_LATENCIA
+        error = abs(latencia - self.latenciaMedia)
+        self.latenciaMedia += alfa * (latencia - self.latenciaMedia)
+        self.latenciaDesviacion += alfa * (error - self.latenciaDesviacion)
+
+        if not self.degradado:
+            if self.enRiesgo():
+                self.degradado = True
+                self.degradaciones += 1
+                self.ticksEnDegradado = 0
+                self.sondeosBajoPresupuesto = 0
+            return
+        if latencia < self.presupuesto * self.config.FACTOR_RECUPERACION:
+            self.sondeosBajoPresupuesto += 1
+        else:
+            self.sondeosBajoPresupuesto = 0
+        if self.respaldo is None and self.puedeRecuperarse():
+            self.recuperar()
+
+    def tomarDecision(self, poseRobot):
+        """
+        Devuelve las velocidades del experto principal o, si el plazo esta en riesgo, las de la politica de respaldo.
+        """
+        self.ticks += 1
+        if self.degradado:
+            self.ticksEnDegradado += 1
+        sondeo = self.ticksDesdeSondeo >= self.config.INTERVALO_SONDEO
+        if self.degradado and sondeo and self.respaldo is not None:
+            # Sondeo sin ceder el control: el principal decide para medirlo y conduce el respaldo
+            self.ticksDegradados += 1
+            self.ticksDesdeSondeo = 0
+            inicio = time.perf_counter()
+            self.experto.tomarDecision(poseRobot)
+            self.medirLatencia(time.perf_counter() - inicio)
+            comando = self.respaldo.tomarDecision(poseRobot)
+            self.experto.sincronizar(poseRobot, comando, self.respaldo.esMedioAlcanzado())
+        elif self.degradado and not sondeo:
+            self.ticksDegradados += 1
+            self.ticksDesdeSondeo += 1
+            inicio = time.perf_counter()
+            comando = self.decisionRespaldo(poseRobot)
+            self.latenciaRespaldo += self.config.ALFA_LATENCIA * (time.perf_counter() - inicio - self.latenciaRespaldo)
+            # El experto principal no ha decidido este tick: se le pasa lo que se ha hecho
+            self.experto.sincronizar(poseRobot, comando, self.respaldo is not None and self.respaldo.esMedioAlcanzado())
+        else:
+            self.ticksDesdeSondeo = 0
+            inicio = time.perf_counter()
+            comando = self.experto.tomarDecision(poseRobot)
+            self.medirLatencia(time.perf_counter() - inicio)
+            if self.respaldo is not None:
+                self.respaldo.sincronizar(poseRobot, comando, self.experto.esMedioAlcanzado())
+
+        self.ultimoComando = comando
+        return comando
+
+    def decisionRespaldo(self, poseRobot):
+        """
+        Politica barata para un tick degradado. El experto principal no se ejecuta, pero se le sigue
+        actualizando la comprobacion de objetivo alcanzado, que es barata.
+
+        Los dos expertos reciben en cada tick la pose y el comando aplicado, lo haya decidido cualquiera
+        de ellos (ver `sincronizar`). Si no, al volver a usarse uno de ellos limitaria la aceleracion
+        partiendo de un comando antiguo y comprobaria los cruces sobre un tramo de muchos ticks.
+        """
+        self.experto.actualizarEstado(poseRobot, self.experto.segmentoObjetivo.getFin())
+        if self.respaldo is None:
+            return self.ultimoComando
+        return self.respaldo.tomarDecision(poseRobot)
+
+    def resumen(self):
+        """
+        Devuelve un diccionario con las estadisticas de degradacion y latencia.
+        """
+        return {
+            "ticks": self.ticks,
+            "ticksDegradados": self.ticksDegradados,
+            "degradaciones": self.degradaciones,
+            "recuperaciones": self.recuperaciones,
+            "latenciaMediaMs": self.latenciaMedia * 1000,
+            "latenciaRespaldoMs": self.latenciaRespaldo * 1000,
+            "presupuestoMs": self.presupuesto * 1000,
+        }
+
+    def getEstado(self):
+        """
+        Devuelve una tupla con el estado del supervisor y de los expertos que supervisa.
+        """
+        return (self.experto.getEstado(), self.respaldo.getEstado() if self.respaldo is not None else None,
+                self.latenciaMedia, self.latenciaDesviacion, self.latenciaRespaldo, self.degradado,
+                self.ticksDesdeSondeo, self.ticksEnDegradado, self.sondeosBajoPresupuesto, self.ultimoComando,
+                self.ticks, self.ticksDegradados, self.degradaciones, self.recuperaciones)
+
+    def setEstado(self, estado):
+        """
+        Restaura un estado obtenido con `getEstado`.
+        """
+        (estadoExperto, estadoRespaldo, self.latenciaMedia, self.latenciaDesviacion, self.latenciaRespaldo,
+         self.degradado, self.ticksDesdeSondeo, self.ticksEnDegradado, self.sondeosBajoPresupuesto, self.ultimoComando,
+         self.ticks, self.ticksDegradados, self.degradaciones, self.recuperaciones) = estado
+        self.experto.setEstado(estadoExperto)
+        if self.respaldo is not None:
+            self.respaldo.setEstado(estadoRespaldo)
+
+    def esObjetivoAlcanzado(self):
+        """
+        Devuelve si se ha alcanzado el objetivo segun el experto principal o el de respaldo.
+        """
+        return self.experto.esObjetivoAlcanzado() or (self.respaldo is not None and self.respaldo.esObjetivoAlcanzado())
+
+    def hayParteOptativa(self):
+        """
+        Indica si hay una parte optativa implementada.
+        """
+        return self.experto.hayParteOptativa()
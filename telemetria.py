@@ -0,0 +1,219 @@
+import os
+import time
+import socket
+import struct
+import argparse
+import itertools
+from collections import namedtuple
+
+DIRECCION_TELEMETRIA = ("127.0.0.1", 47800) # Direccion por defecto a la que se envia y en la que escucha el receptor
+REGISTROS_POR_PAQUETE = 28 # Con 28 registros un paquete cabe en una trama Ethernet (1500 bytes)
+INTERVALO_ENVIO = 0.1 # Tiempo maximo que un registro espera en el lote antes de enviarse (s)
+INTERVALO_RESUMEN = 1.0 # Cada cuanto muestra el receptor el estado de las ejecuciones (s)
+
+MAGIA = b"RTLM"
+VERSION = 1
+# Cabecera: magia, version, id de la ejecucion, numero de paquete y registros que lleva
+CABECERA = struct.Struct("<4sBIIH")
+# Registro: tiempo simulado, objetivo, pose (x, y, heading), comando (V, W), distancia al segmento,
+# puntuacion y tiempos de las fases del paso en ms (control, fisica, puntuacion, dibujo)
+REGISTRO = struct.Struct("<fH11f")
+
+RegistroTelemetria = namedtuple("RegistroTelemetria", [
+    "tiempo", "numPath", "x", "y", "heading", "V", "W", "distancia", "puntuacion",
+    "tControl", "tFisica", "tPuntuacion", "tDibujo",
+])
+
+contadorEjecuciones = itertools.count()
+
+
+class EmisorTelemetria:
+    """
+    Publica la telemetria de cada paso de una Simulacion por UDP en local.
+
+    Cada registro se empaqueta con struct directamente en un buffer preasignado y se envia por lotes
+    de REGISTROS_POR_PAQUETE registros (o cuando el primero lleva INTERVALO_ENVIO esperando). El
+    socket no es bloqueante: si el sistema no puede aceptar el paquete, o no hay nadie escuchando,
+    el lote se descarta y se cuenta, pero el bucle de control nunca espera. Cada paquete lleva el id
+    de la ejecucion y su numero de secuencia para que el receptor separe varias ejecuciones y cuente
+    los paquetes perdidos.
+    """
+
+    def __init__(self, direccion=DIRECCION_TELEMETRIA, idEjecucion=None, registrosPorPaquete=REGISTROS_POR_PAQUETE,
+                 intervalo=INTERVALO_ENVIO):
+        """
+        Parámetros:
+            direccion: (host, puerto) al que se envian los paquetes
+            idEjecucion: Identificador de esta ejecucion; por defecto se deriva del pid del proceso
+            registrosPorPaquete: Registros que se acumulan antes de enviar un paquete
+            intervalo: Tiempo maximo que un registro espera antes de enviarse (s)
+        """
+        self.direccion = direccion
+        if idEjecucion is None:
+            idEjecucion = ((os.getpid() << 8) | (next(contadorEjecuciones) & 0xFF)) & 0xFFFFFFFF
+        self.idEjecucion = idEjecucion
+        self.registrosPorPaquete = registrosPorPaquete
+        self.intervalo = intervalo
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.paquete = bytearray(CABECERA.size + registrosPorPaquete * REGISTRO.size)
+        self.pendientes = 0 # Registros en el lote actual
+        self.inicioLote = 0.0 # Instante en el que entro el primer registro del lote
+        self.secuencia = 0
+        self.tiempoDibujo = 0.0 # Duracion del ultimo frame dibujado (ms); la fija quien dibuja
+
+        self.enviados = 0 # Registros enviados
+        self.descartados = 0 # Registros de lotes que no se han podido enviar
+
+    def setTiempoDibujo(self, ms):
+        """
+        Guarda lo que ha tardado en dibujarse el ultimo frame, que se envia con los registros siguientes.
+        """
+        self.tiempoDibujo = ms
+
+    def publicar(self, tiempo, numPath, pose, comando, distancia, puntuacion, tiemposFase):
+        """
+        Añade un registro al lote y lo envia si esta lleno o si ya ha esperado demasiado.
+
+        Parámetros:
+            tiempo: Tiempo simulado (s)
+            numPath: Indice del objetivo actual
+            pose: (x, y, heading) del robot
+            comando: (V, W) pedidas al robot
+            distancia: Distancia del robot al segmento del objetivo (m)
+            puntuacion: Puntuacion acumulada
+            tiemposFase: Duracion (ms) de las fases control, fisica y puntuacion del paso
+        """
+        if self.pendientes == 0:
+            self.inicioLote = time.monotonic()
+        REGISTRO.pack_into(self.paquete, CABECERA.size + self.pendientes * REGISTRO.size,
+                           tiempo, numPath, pose[0], pose[1], pose[2], comando[0], comando[1], distancia, puntuacion,
+                           tiemposFase[0], tiemposFase[1], tiemposFase[2], self.tiempoDibujo)
+        self.pendientes += 1
+        if self.pendientes == self.registrosPorPaquete or time.monotonic() - self.inicioLote >= self.intervalo:
+            self.enviar()
+
+    def enviar(self):
+        """
+        Envia el lote actual sin esperar; si no se puede, lo descarta.
+        """
+        if self.pendientes == 0:
+            return
+        CABECERA.pack_into(self.paquete, 0, MAGIA, VERSION, self.idEjecucion, self.secuencia, self.pendientes)
+        self.secuencia = (self.secuencia + 1) & 0xFFFFFFFF
+        try:
+            self.socket.sendto(memoryview(self.paquete)[:CABECERA.size + self.pendientes * REGISTRO.size], self.direccion)
+            self.enviados += self.pendientes
+        except OSError: # BlockingIOError con el buffer lleno, ConnectionRefusedError sin receptor...
+            self.descartados += self.pendientes
+        self.pendientes = 0
+
+    def cerrar(self):
+        """
+        Envia lo que quede en el lote y cierra el socket.
+        """
+        self.enviar()
+        self.socket.close()
+
+
+def decodificarPaquete(datos):
+    """
+    Decodifica un paquete de telemetria.
+
+    Retorna:
+        tuple: (id de la ejecucion, numero de secuencia, lista de RegistroTelemetria), o None si no es un paquete valido
+    """
+    if len(datos) < CABECERA.size:
+        return None
+    magia, version, idEjecucion, secuencia, numRegistros = CABECERA.unpack_from(datos, 0)
+    if magia != MAGIA or version != VERSION or len(datos) != CABECERA.size + numRegistros * REGISTRO.size:
+        return None
+    registros = [RegistroTelemetria(*campos) for campos in REGISTRO.iter_unpack(memoryview(datos)[CABECERA.size:])]
+    return idEjecucion, secuencia, registros
+
+
+class ReceptorTelemetria:
+    """
+    Escucha los paquetes de una o varias ejecuciones y guarda el ultimo registro de cada una junto
+    con los paquetes recibidos y perdidos (huecos en la secuencia).
+    """
+
+    def __init__(self, direccion=DIRECCION_TELEMETRIA):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(direccion)
+        self.ejecuciones = {} # id -> {"ultimo", "siguiente", "paquetes", "perdidos", "registros"}
+
+    def recibir(self, espera=None):
+        """
+        Espera como mucho `espera` segundos a un paquete y lo procesa. Con `espera` 0 solo mira si ya
+        hay uno esperando, y con None espera hasta que llegue.
+
+        Retorna:
+            tuple: Lo mismo que `decodificarPaquete`, o None si no llega nada valido
+        """
+        self.socket.settimeout(espera)
+        try:
+            datos = self.socket.recv(65536)
+        except (socket.timeout, BlockingIOError): # settimeout(0) deja el socket no bloqueante, que no lanza timeout
+            return None
+        paquete = decodificarPaquete(datos)
+        if paquete is None:
+            return None
+
+        idEjecucion, secuencia, registros = paquete
+        ejecucion = self.ejecuciones.setdefault(idEjecucion, {"siguiente": secuencia, "paquetes": 0, "perdidos": 0, "registros": 0})
+        hueco = (secuencia - ejecucion["siguiente"]) & 0xFFFFFFFF
+        if hueco < 0x80000000: # Si no, es un paquete atrasado que ya se conto como perdido
+            ejecucion["perdidos"] += hueco
+            ejecucion["siguiente"] = (secuencia + 1) & 0xFFFFFFFF
+        ejecucion["paquetes"] += 1
+        ejecucion["registros"] += len(registros)
+        ejecucion["ultimo"] = registros[-1]
+        return paquete
+
+    def resumen(self):
+        """
+        Una linea por ejecucion con su ultimo registro y los paquetes perdidos.
+        """
+        lineas = []
+        for idEjecucion, ejecucion in sorted(self.ejecuciones.items()):
+            r = ejecucion["ultimo"]
+            lineas.append(
+                f"{idEjecucion:>10} t={r.tiempo:7.2f} s obj={r.numPath:<3} ({r.x:6.2f}, {r.y:6.2f}, {r.heading:7.1f}) "
+                f"V={r.V:5.2f} W={r.W:6.3f} dist={r.distancia:6.3f} punt={r.puntuacion:7.2f} "
+                f"ms control/fisica/punt/dibujo={r.tControl:.3f}/{r.tFisica:.3f}/{r.tPuntuacion:.3f}/{r.tDibujo:.2f} "
+                f"paquetes={ejecucion['paquetes']} perdidos={ejecucion['perdidos']}"
+            )
+        return "\n".join(lineas)
+
+    def cerrar(self):
+        self.socket.close()
+
+
+def leerDireccion(texto):
+    """
+    Convierte "PUERTO" o "HOST:PUERTO" en una direccion (host, puerto).
+    """
+    host, _, puerto = texto.rpartition(":")
+    return (host or DIRECCION_TELEMETRIA[0], int(puerto))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="./telemetria.py [[HOST:]PUERTO]")
+    parser.add_argument("direccion", nargs="?", type=leerDireccion, default=DIRECCION_TELEMETRIA,
+                        help=f"direccion en la que escuchar (por defecto {DIRECCION_TELEMETRIA[0]}:{DIRECCION_TELEMETRIA[1]})")
+    args = parser.parse_args()
+
+    receptor = ReceptorTelemetria(args.direccion)
+    print(f"Escuchando telemetria en {args.direccion[0]}:{args.direccion[1]}")
+    ultimoResumen = time.monotonic()
+    try:
+        while True:
+            receptor.recibir(INTERVALO_RESUMEN)
+            if receptor.ejecuciones and time.monotonic() - ultimoResumen >= INTERVALO_RESUMEN:
+                print(receptor.resumen(), end="\n\n", flush=True)
+                ultimoResumen = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    receptor.cerrar()
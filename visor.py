@@ -0,0 +1,55 @@
+import sys
+import pygame
+
+from dibujo import *
+from camara import Camara, crearIndiceObjetivos
+from memoriaCompartida import BufferPoses
+
+AppTitle = "RRDC P1 2024 - visor"
+
+def ejecutarVisor(nombre):
+    """
+    Ventana que dibuja el circuito y el robot leyendo de un BufferPoses en memoria compartida.
+
+    Se puede abrir y cerrar en cualquier momento sin afectar a la simulacion, que sigue escribiendo
+    en el buffer a su ritmo: `python visor.py <nombre del bloque>`.
+    """
+    buffer = BufferPoses.conectar(nombre)
+    objectiveSet = buffer.getObjetivos()
+
+    pygame.init()
+    screen = pygame.display.set_mode(SIZE)
+    pygame.display.set_caption(AppTitle)
+    clock = pygame.time.Clock()
+    robotIimage = cargarImagenRobot()
+    camara = Camara(SIZE)
+    indiceObjetivos = crearIndiceObjetivos(objectiveSet)
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            else:
+                camara.procesarEvento(event)
+
+        registro = buffer.leerUltimo()
+        screen.fill("blue")
+        numPath = registro[3] if registro is not None else 0
+        if registro is not None:
+            camara.actualizar(registro[0:3])
+        drawObjectives(screen, objectiveSet, indiceObjetivos, None if buffer.estaTerminado() else numPath, camara)
+        if registro is not None:
+            drawRobot(screen, robotIimage, registro[0:3], camara)
+            pygame.display.set_caption(f"{AppTitle} - {registro[4]:.1f} s")
+        pygame.display.flip()
+        clock.tick(60)
+
+    pygame.quit()
+    buffer.cerrar()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: ./visor.py <nombre del bloque de memoria compartida>")
+        sys.exit(1)
+    ejecutarVisor(sys.argv[1])